@@ -3,54 +3,36 @@ from ferramentas import dashboard, speedtest_module, traceroute_dev, chat, visua
 
 st.set_page_config(page_title="Ferramentas de Rede", layout="centered")
 
-def reset_speedtest_state():
-    if "dados" in st.session_state:
-        del st.session_state.dados
-    if "monitorando" in st.session_state:
-        del st.session_state.monitorando
-    if "ultimo_teste" in st.session_state:
-        del st.session_state.ultimo_teste
-    if "proximo_teste" in st.session_state:
-        del st.session_state.proximo_teste
-
 def homepage():
-    reset_speedtest_state()
     st.title("Bem-vindo às Ferramentas de Rede")
     st.write("Explore ferramentas para monitoramento de rede, como SpeedTest, Traceroute e Chat em tempo real.")
     
     visualizador_ip.ip_viewer()
 
 def dashboard_page():
-    reset_speedtest_state()
     dashboard.render_dashboard() 
 
 def speedtest_page():
     speedtest_module.speedtest_teste()
 
 def traceroute_page():
-    reset_speedtest_state()
     traceroute_dev.traceroute_dev()
 
 def chat_page():
-    reset_speedtest_state()
     chat.chat_dev()
 
 def postman_page():
-    reset_speedtest_state()
     postman.postman_interface()
 
 
 def whois_page():
-    reset_speedtest_state()
     whois_module.whois_lookup()
 
 def port_scanner_page():
-    reset_speedtest_state()
     port_scanner.port_scanner()
 
 
 def about_page():
-    reset_speedtest_state()
     st.title("👨‍💻 Sobre o Projeto")
     st.write("""
         Ferramentas de Rede é uma aplicação web interativa desenvolvida com Python e Streamlit, que reúne diversas ferramentas úteis para análise, teste e visualização de redes em um só lugar.
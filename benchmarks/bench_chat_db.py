@@ -0,0 +1,161 @@
+"""
+Teste de carga do banco do chat com N sessões simuladas.
+
+Cada sessão é uma thread que repete o que um rerun da página do chat faz no
+banco: heartbeat do usuário, limpeza de inativos, lista de online, mensagens
+novas depois do cursor e a verificação do maior id; de vez em quando envia
+uma mensagem. Compara:
+
+* legado: uma conexão por sessão, journal padrão, commit a cada escrita e
+  limpeza linha a linha (o código anterior do chat);
+* store: o ChatStore de ferramentas/chat_store.py (WAL, pool de leitura e
+  uma thread de escrita que agrupa as escritas em transações).
+
+Os bancos são criados num diretório temporário; o chat.db do projeto não é
+tocado.
+
+Uso:
+    python benchmarks/bench_chat_db.py --sessoes 50 --segundos 5
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ferramentas.chat_store import ChatStore  # noqa: E402
+
+
+class Legado:
+    """As consultas do chat como eram antes do ChatStore, com uma conexão por sessão."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        conn = self.conectar()
+        conn.execute("CREATE TABLE IF NOT EXISTS messages (id INTEGER PRIMARY KEY AUTOINCREMENT, user TEXT, "
+                     "message TEXT, timestamp TEXT, is_system BOOLEAN)")
+        conn.execute("CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, last_active TIMESTAMP)")
+        conn.commit()
+        conn.close()
+
+    def conectar(self):
+        return sqlite3.connect(self.caminho, check_same_thread=False)
+
+    def sessao(self, usuario):
+        conn = self.conectar()
+        self.escrever(conn, "INSERT OR IGNORE INTO users (username, last_active) VALUES (?, ?)",
+                      (usuario, datetime.now().isoformat(" ")))
+        return conn
+
+    def escrever(self, conn, sql, params):
+        conn.execute(sql, params)
+        conn.commit()
+
+    def rerun(self, conn, usuario, cursor, mensagem):
+        agora = datetime.now()
+        self.escrever(conn, "UPDATE users SET last_active = ? WHERE username = ?", (agora.isoformat(" "), usuario))
+        limite = (agora - timedelta(minutes=5)).isoformat(" ")
+        for (inativo,) in conn.execute("SELECT username FROM users WHERE last_active < ?", (limite,)).fetchall():
+            conn.execute("DELETE FROM users WHERE username = ?", (inativo,))
+            self.escrever(conn, "INSERT INTO messages (user, message, timestamp, is_system) VALUES (?, ?, ?, ?)",
+                          ("Sistema", f"{inativo} saiu do chat.", agora.strftime("%H:%M"), True))
+        conn.commit()
+        conn.execute("SELECT username FROM users WHERE last_active >= ?", (limite,)).fetchall()
+        novas = conn.execute("SELECT id, user, message, timestamp, is_system FROM messages WHERE id > ? "
+                             "ORDER BY id DESC LIMIT 50", (cursor,)).fetchall()
+        if mensagem:
+            self.escrever(conn, "INSERT INTO messages (user, message, timestamp, is_system) VALUES (?, ?, ?, ?)",
+                          (usuario, mensagem, agora.strftime("%H:%M"), False))
+        conn.execute("SELECT MAX(id) FROM messages").fetchone()
+        return novas[0][0] if novas else cursor
+
+
+class Store:
+    """O mesmo rerun sobre o ChatStore, como a página do chat faz agora."""
+
+    def __init__(self, caminho):
+        self.store = ChatStore(caminho)
+
+    def sessao(self, usuario):
+        self.store.add_user(usuario).result()
+        return self.store
+
+    def rerun(self, store, usuario, cursor, mensagem):
+        store.touch_user(usuario)
+        store.cleanup()
+        store.active_users()
+        novas = store.messages_after(cursor)
+        if mensagem:
+            store.add_message(usuario, mensagem).result()
+        store.last_message_id()
+        return novas[-1][0] if novas else cursor
+
+
+def carga(modelo, args):
+    latencias = []
+    erros = []
+    lock = threading.Lock()
+    fim = time.perf_counter() + args.segundos
+    pronto = threading.Barrier(args.sessoes)
+
+    def sessao(i):
+        usuario = f"usuario{i}"
+        rng = random.Random(i)
+        conn = modelo.sessao(usuario)
+        cursor = 0
+        minhas = []
+        meus_erros = 0
+        pronto.wait()
+        while time.perf_counter() < fim:
+            mensagem = f"mensagem de {usuario}" if rng.random() < args.envio else None
+            inicio = time.perf_counter()
+            try:
+                cursor = modelo.rerun(conn, usuario, cursor, mensagem)
+            except sqlite3.OperationalError:
+                meus_erros += 1 # "database is locked"
+            minhas.append(time.perf_counter() - inicio)
+        with lock:
+            latencias.extend(minhas)
+            erros.append(meus_erros)
+
+    threads = [threading.Thread(target=sessao, args=(i,)) for i in range(args.sessoes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencias, sum(erros)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessoes", type=int, default=50, help="Sessões simultâneas")
+    parser.add_argument("--segundos", type=float, default=5.0, help="Duração de cada rodada")
+    parser.add_argument("--envio", type=float, default=0.1, help="Fração dos reruns que envia uma mensagem")
+    args = parser.parse_args()
+
+    print(f"{args.sessoes} sessões, {args.segundos:.0f} s por rodada, {args.envio:.0%} dos reruns enviam mensagem")
+    with tempfile.TemporaryDirectory() as pasta:
+        referencia = None
+        for nome, classe in [("legado", Legado), ("store", Store)]:
+            modelo = classe(os.path.join(pasta, f"{nome}.db"))
+            latencias, erros = carga(modelo, args)
+            taxa = len(latencias) / args.segundos
+            referencia = referencia or taxa
+            q = statistics.quantiles(latencias, n=100)
+            extra = ""
+            if isinstance(modelo, Store):
+                extra = f"  transações: {modelo.store.batches} para {modelo.store.writes} escritas"
+                modelo.store.close()
+            print(f"{nome:7s} {taxa:9.0f} reruns/s ({taxa / referencia:4.1f}x)  p50 {q[49] * 1000:6.2f} ms  "
+                  f"p95 {q[94] * 1000:7.2f} ms  p99 {q[98] * 1000:7.2f} ms  erros: {erros}{extra}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Gerador de carga do backend do chat, sem navegador.
+
+Simula N usuários contra um banco temporário. Cada usuário entra no chat
+(a uma taxa de entradas por segundo), renova a presença a cada --heartbeat s
+(heartbeat + limpeza de inativos + lista de online, como um rerun da
+página), busca mensagens novas a cada --poll s e envia mensagens a uma taxa
+média de --envios por minuto (intervalos exponenciais). No fim sai do chat.
+
+Relata, por operação: quantidade, vazão, erros e latência p50/p95/p99; e
+quantas vezes e por quanto tempo as escritas esperaram pelo lock do SQLite.
+
+Backends:
+* store: as funções de ferramentas/chat.py (init_db, manage_user,
+  add_message, get_messages, get_users, cleanup_users) sobre um ChatStore,
+  exatamente como a página as chama;
+* legado: o acesso anterior ao ChatStore (uma conexão por sessão, commit a
+  cada escrita, limpeza linha a linha), com a espera pelo lock feita no
+  laço do gerador para poder ser contada.
+
+Uso:
+    python benchmarks/bench_chat_load.py --usuarios 200 --segundos 20
+    python benchmarks/bench_chat_load.py --backend store --poll 0.2 --envios 10
+"""
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit as st  # noqa: E402
+
+from ferramentas import chat  # noqa: E402
+from ferramentas.chat_store import ChatStore  # noqa: E402
+
+# Fora do `streamlit run` o st.session_state é um só para o processo, o que
+# basta aqui: as funções do chat só leem dele o store compartilhado
+for logger in ("streamlit.runtime.scriptrunner_utils.script_run_context", "streamlit.runtime.state.session_state_proxy"):
+    logging.getLogger(logger).setLevel(logging.ERROR)
+
+
+class Store:
+    nome = "store"
+
+    def __init__(self, caminho):
+        st.session_state.db = self.store = ChatStore(caminho)
+
+    def sessao(self, usuario):
+        return None
+
+    def entrar(self, _, usuario):
+        chat.manage_user(usuario, "add")
+        chat.add_message("Sistema", f"{usuario} entrou no chat.", is_system=True)
+
+    def heartbeat(self, _, usuario):
+        chat.manage_user(usuario, "update")
+        chat.cleanup_users()
+        return chat.get_users()
+
+    def enviar(self, _, usuario, texto):
+        chat.add_message(usuario, texto)
+
+    def buscar(self, _, cursor):
+        novas = chat.get_messages(cursor)
+        return novas[-1][0] if novas else cursor
+
+    def sair(self, _, usuario):
+        chat.manage_user(usuario, "remove")
+        chat.add_message("Sistema", f"{usuario} saiu do chat.", is_system=True)
+
+    def esperas(self):
+        return self.store.lock_waits, self.store.lock_wait_time
+
+    def fechar(self):
+        print(f"        transações: {self.store.batches} para {self.store.writes} escritas")
+        self.store.close()
+
+
+class Legado:
+    """As consultas do chat antes do ChatStore. A espera pelo lock imita o busy handler do SQLite, contando as esperas."""
+
+    nome = "legado"
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.lock = threading.Lock()
+        self.n_esperas = 0
+        self.tempo_esperas = 0.0
+        conn = self.sessao(None)
+        conn.execute("CREATE TABLE IF NOT EXISTS messages (id INTEGER PRIMARY KEY AUTOINCREMENT, user TEXT, "
+                     "message TEXT, timestamp TEXT, is_system BOOLEAN)")
+        conn.execute("CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, last_active TIMESTAMP)")
+        conn.commit()
+        conn.close()
+
+    def sessao(self, usuario):
+        return sqlite3.connect(self.caminho, check_same_thread=False, timeout=0)
+
+    def _com_espera(self, funcao):
+        inicio = time.perf_counter()
+        pausa = 0.001
+        try:
+            while True:
+                try:
+                    return funcao()
+                except sqlite3.OperationalError as e:
+                    if "locked" not in str(e) or time.perf_counter() - inicio > 5: # 5 s: o timeout padrão do sqlite3
+                        raise
+                time.sleep(pausa)
+                pausa = min(pausa * 2, 0.1)
+        finally:
+            if pausa > 0.001:
+                with self.lock:
+                    self.n_esperas += 1
+                    self.tempo_esperas += time.perf_counter() - inicio
+
+    def _escrever(self, conn, sql, params):
+        def escrever():
+            try:
+                conn.execute(sql, params)
+                conn.commit()
+            except sqlite3.OperationalError:
+                conn.rollback()
+                raise
+        self._com_espera(escrever)
+
+    def _mensagem(self, conn, usuario, texto, sistema=False):
+        self._escrever(conn, "INSERT INTO messages (user, message, timestamp, is_system) VALUES (?, ?, ?, ?)",
+                       (usuario, texto, datetime.now().strftime("%H:%M"), sistema))
+
+    def entrar(self, conn, usuario):
+        self._escrever(conn, "INSERT OR IGNORE INTO users (username, last_active) VALUES (?, ?)",
+                       (usuario, datetime.now().isoformat(" ")))
+        self._mensagem(conn, "Sistema", f"{usuario} entrou no chat.", True)
+
+    def heartbeat(self, conn, usuario):
+        agora = datetime.now()
+        self._escrever(conn, "UPDATE users SET last_active = ? WHERE username = ?", (agora.isoformat(" "), usuario))
+        limite = (agora - timedelta(minutes=5)).isoformat(" ")
+        inativos = self._com_espera(
+            lambda: conn.execute("SELECT username FROM users WHERE last_active < ?", (limite,)).fetchall())
+        for (inativo,) in inativos:
+            self._escrever(conn, "DELETE FROM users WHERE username = ?", (inativo,))
+            self._mensagem(conn, "Sistema", f"{inativo} saiu do chat.", True)
+        return [row[0] for row in self._com_espera(
+            lambda: conn.execute("SELECT username FROM users WHERE last_active >= ?", (limite,)).fetchall())]
+
+    def enviar(self, conn, usuario, texto):
+        self._mensagem(conn, usuario, texto)
+
+    def buscar(self, conn, cursor):
+        novas = self._com_espera(lambda: conn.execute(
+            "SELECT id, user, message, timestamp, is_system FROM messages WHERE id > ? ORDER BY id DESC LIMIT 50",
+            (cursor,)).fetchall())
+        return novas[0][0] if novas else cursor
+
+    def sair(self, conn, usuario):
+        self._escrever(conn, "DELETE FROM users WHERE username = ?", (usuario,))
+        self._mensagem(conn, "Sistema", f"{usuario} saiu do chat.", True)
+        conn.close()
+
+    def esperas(self):
+        return self.n_esperas, self.tempo_esperas
+
+    def fechar(self):
+        pass
+
+
+def usuario_simulado(backend, i, args, fim, registro):
+    rng = random.Random(i)
+    usuario = f"usuario{i}"
+    latencias = defaultdict(list)
+    erros = defaultdict(int)
+
+    def medir(op, funcao, *params):
+        inicio = time.perf_counter()
+        try:
+            resultado = funcao(*params)
+        except sqlite3.Error:
+            erros[op] += 1
+            resultado = None
+        latencias[op].append(time.perf_counter() - inicio)
+        return resultado
+
+    time.sleep(i / args.entradas) # Entradas espalhadas a `entradas` por segundo
+    conn = backend.sessao(usuario)
+    medir("entrar", backend.entrar, conn, usuario)
+    cursor = 0
+    agora = time.perf_counter()
+    proximo = {
+        "heartbeat": agora + rng.uniform(0, args.heartbeat),
+        "buscar": agora + rng.uniform(0, args.poll),
+        "enviar": agora + rng.expovariate(args.envios / 60) if args.envios else float("inf"),
+    }
+    while True:
+        op = min(proximo, key=proximo.get)
+        espera = proximo[op] - time.perf_counter()
+        if proximo[op] >= fim:
+            break
+        if espera > 0:
+            time.sleep(espera)
+        if op == "heartbeat":
+            medir(op, backend.heartbeat, conn, usuario)
+            proximo[op] += args.heartbeat
+        elif op == "buscar":
+            cursor = medir(op, backend.buscar, conn, cursor) or cursor
+            proximo[op] += args.poll
+        else:
+            medir(op, backend.enviar, conn, usuario, f"mensagem {len(latencias[op])} de {usuario}")
+            proximo[op] += rng.expovariate(args.envios / 60)
+    medir("sair", backend.sair, conn, usuario)
+    registro(latencias, erros)
+
+
+def rodar(backend, args):
+    latencias = defaultdict(list)
+    erros = defaultdict(int)
+    lock = threading.Lock()
+
+    def registro(minhas, meus_erros):
+        with lock:
+            for op, valores in minhas.items():
+                latencias[op] += valores
+            for op, n in meus_erros.items():
+                erros[op] += n
+
+    inicio = time.perf_counter()
+    fim = inicio + args.segundos
+    threads = [threading.Thread(target=usuario_simulado, args=(backend, i, args, fim, registro), daemon=True)
+               for i in range(args.usuarios)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    print(f"[{backend.nome}] {args.usuarios} usuários, {duracao:.1f} s")
+    print(f"        {'operação':10s} {'total':>7s} {'op/s':>8s} {'erros':>6s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s}")
+    for op in ("entrar", "heartbeat", "buscar", "enviar", "sair"):
+        valores = latencias.get(op)
+        if not valores:
+            continue
+        q = statistics.quantiles(valores, n=100) if len(valores) > 1 else [valores[0]] * 99
+        print(f"        {op:10s} {len(valores):7d} {len(valores) / duracao:8.1f} {erros[op]:6d} "
+              f"{q[49] * 1000:8.2f} {q[94] * 1000:8.2f} {q[98] * 1000:8.2f}")
+    esperas, tempo = backend.esperas()
+    print(f"        esperas pelo lock: {esperas} ({tempo:.2f} s no total)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usuarios", type=int, default=100, help="Usuários simultâneos")
+    parser.add_argument("--segundos", type=float, default=15.0, help="Duração do teste")
+    parser.add_argument("--entradas", type=float, default=50.0, help="Usuários que entram por segundo")
+    parser.add_argument("--heartbeat", type=float, default=2.0, help="Intervalo entre renovações de presença (s)")
+    parser.add_argument("--poll", type=float, default=0.5, help="Intervalo entre buscas de mensagens novas (s)")
+    parser.add_argument("--envios", type=float, default=6.0, help="Mensagens por minuto por usuário")
+    parser.add_argument("--backend", choices=["legado", "store", "ambos"], default="ambos")
+    args = parser.parse_args()
+
+    backends = [Legado, Store] if args.backend == "ambos" else [Legado if args.backend == "legado" else Store]
+    with tempfile.TemporaryDirectory() as pasta:
+        for classe in backends:
+            backend = classe(os.path.join(pasta, f"{classe.nome}.db"))
+            rodar(backend, args)
+            backend.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Micro-benchmark da renderização do histórico do chat.
+
+Monta um histórico de N mensagens (20% delas com códigos de emoji, além de
+mensagens de sistema e do próprio usuário) e mede:
+
+1. emojify: o laço antigo de str.replace por código contra a regex única;
+2. montagem do HTML: sem cache (como a cada rerun antes) contra o cache por
+   id de mensagem, no segundo rerun em diante;
+3. a página no harness de testes do Streamlit (AppTest): um st.markdown por
+   mensagem contra um único bloco com todo o histórico.
+
+Uso:
+    python benchmarks/bench_chat_render.py --mensagens 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from ferramentas import chat  # noqa: E402
+
+
+def emojify_antigo(texto):
+    for k, v in chat.EMOJI_MAP.items():
+        texto = texto.replace(k, v)
+    return texto
+
+
+def historico(n):
+    rng = random.Random(0)
+    codigos = list(chat.EMOJI_MAP)
+    palavras = "oi tudo bem com você hoje o ping caiu de novo rede lenta aqui".split()
+    linhas = []
+    for i in range(1, n + 1):
+        texto = " ".join(rng.choice(palavras) for _ in range(rng.randint(3, 15)))
+        if rng.random() < 0.2: # Uma em cada cinco mensagens usa emojis
+            texto += " " + " ".join(rng.sample(codigos, rng.randint(1, 3)))
+        if i % 20 == 0:
+            linhas.append((i, "Sistema", f"usuario{i % 7} entrou no chat.", "10:00", True))
+        else:
+            linhas.append((i, f"usuario{i % 7}", texto, "10:00", False))
+    return linhas
+
+
+def cronometrar(funcao, repeticoes=3):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def pagina(modo, n, raiz):
+    # Executada pelo AppTest como um script isolado: importa tudo aqui dentro
+    import sys
+    import time
+    sys.path.insert(0, raiz)
+    import streamlit as st
+    sys.path.insert(0, raiz + "/benchmarks")
+    from bench_chat_render import historico
+    from ferramentas.chat import _message_html, render_history
+
+    mensagens = historico(n)
+    inicio = time.perf_counter()
+    if modo == "por_mensagem":
+        with st.empty().container():
+            for _, user, msg, timestamp, is_system in mensagens:
+                st.markdown(_message_html(user, msg, timestamp, is_system, user == "usuario1"),
+                            unsafe_allow_html=True)
+    else:
+        st.empty().markdown(render_history(mensagens, "usuario1"), unsafe_allow_html=True)
+    st.session_state.duracao = time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mensagens", type=int, default=10000)
+    args = parser.parse_args()
+
+    mensagens = historico(args.mensagens)
+    textos = [msg for _, _, msg, _, _ in mensagens]
+    assert [emojify_antigo(t) for t in textos] == [chat.emojify(t) for t in textos]
+    print(f"Histórico de {args.mensagens} mensagens")
+
+    antigo = cronometrar(lambda: [emojify_antigo(t) for t in textos])
+    novo = cronometrar(lambda: [chat.emojify(t) for t in textos])
+    print(f"emojify       str.replace {antigo * 1000:8.1f} ms   regex {novo * 1000:8.1f} ms   ({antigo / novo:4.1f}x)")
+
+    chat.RENDER_CACHE_SIZE = max(chat.RENDER_CACHE_SIZE, 2 * args.mensagens)
+    sem_cache = cronometrar(lambda: "\n".join(chat._message_html(u, m, t, s, u == "usuario1")
+                                              for _, u, m, t, s in mensagens))
+    chat.render_history(mensagens, "usuario1") # Primeiro rerun: preenche o cache
+    com_cache = cronometrar(lambda: chat.render_history(mensagens, "usuario1"))
+    print(f"HTML          sem cache   {sem_cache * 1000:8.1f} ms   cache {com_cache * 1000:8.1f} ms   "
+          f"({sem_cache / com_cache:4.1f}x)")
+
+    tempos = {}
+    for modo in ("por_mensagem", "um_bloco"):
+        at = AppTest.from_function(pagina, args=(modo, args.mensagens, RAIZ), default_timeout=600)
+        inicio = time.perf_counter()
+        at.run()
+        total = time.perf_counter() - inicio
+        tempos[modo] = at.session_state.duracao
+        print(f"página        {modo:12s} script {tempos[modo] * 1000:8.1f} ms   elementos: {len(at.markdown):6d}   "
+              f"total com o AppTest {total:6.2f} s")
+    print(f"              um bloco é {tempos['por_mensagem'] / tempos['um_bloco']:4.1f}x mais rápido no script")
+
+
+if __name__ == "__main__":
+    main()
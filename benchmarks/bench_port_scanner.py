@@ -0,0 +1,95 @@
+"""
+Benchmark do Verificador de Portas: laço sequencial (scan_port) x motor concorrente.
+
+Sobe em 127.0.0.1 portas abertas (listeners que aceitam conexões), portas
+"filtradas" (listeners com a fila de conexões cheia, cujo connect() fica sem
+resposta até o timeout) e usa o restante do intervalo como portas fechadas.
+
+Uso:
+    python benchmarks/bench_port_scanner.py --abertas 10 --filtradas 10 --timeout 0.5
+"""
+import argparse
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ferramentas.port_scanner import scan_port, scan_ports  # noqa: E402
+
+
+def abrir_listeners(abertas, filtradas):
+    """Cria os listeners locais e retorna (sockets, portas_abertas, portas_filtradas)."""
+    sockets, portas_abertas, portas_filtradas = [], [], []
+    for _ in range(abertas):
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        s.listen(128)
+        sockets.append(s)
+        portas_abertas.append(s.getsockname()[1])
+    for _ in range(filtradas):
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        s.listen(0)
+        porta = s.getsockname()[1]
+        # Ocupa a fila de conexões: a partir daí o kernel descarta os SYNs
+        ocupante = socket.socket()
+        ocupante.connect(("127.0.0.1", porta))
+        sockets.extend([s, ocupante])
+        portas_filtradas.append(porta)
+    return sockets, portas_abertas, portas_filtradas
+
+
+def portas_fechadas(quantidade, ocupadas):
+    """Escolhe portas locais sem listener (respondem com RST)."""
+    portas = []
+    porta = 20000
+    while len(portas) < quantidade:
+        if porta not in ocupadas:
+            s = socket.socket()
+            if s.connect_ex(("127.0.0.1", porta)) != 0:
+                portas.append(porta)
+            s.close()
+        porta += 1
+    return portas
+
+
+def cronometrar(funcao):
+    inicio = time.perf_counter()
+    abertas = funcao()
+    return time.perf_counter() - inicio, abertas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--abertas", type=int, default=10)
+    parser.add_argument("--filtradas", type=int, default=10)
+    parser.add_argument("--fechadas", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=0.5)
+    parser.add_argument("--concorrencia", type=int, default=256)
+    args = parser.parse_args()
+
+    sockets, abertas, filtradas = abrir_listeners(args.abertas, args.filtradas)
+    fechadas = portas_fechadas(args.fechadas, set(abertas) | set(filtradas))
+    portas = sorted(abertas + filtradas + fechadas)
+    print(f"{len(portas)} portas: {len(abertas)} abertas, {len(filtradas)} filtradas, "
+          f"{len(fechadas)} fechadas (timeout {args.timeout}s)")
+
+    try:
+        t_seq, res_seq = cronometrar(
+            lambda: {p for p in portas if scan_port("127.0.0.1", p, args.timeout)})
+        t_conc, res_conc = cronometrar(
+            lambda: {p for p, aberta in scan_ports("127.0.0.1", portas, args.timeout, args.concorrencia) if aberta})
+    finally:
+        for s in sockets:
+            s.close()
+
+    esperado = set(abertas)
+    print(f"Sequencial : {t_seq:8.3f}s  abertas corretas: {res_seq == esperado}")
+    print(f"Concorrente: {t_conc:8.3f}s  abertas corretas: {res_conc == esperado}")
+    print(f"Aceleração : {t_seq / t_conc:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
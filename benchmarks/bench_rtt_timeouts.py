@@ -0,0 +1,73 @@
+"""
+Harness dos timeouts adaptativos do Verificador de Portas.
+
+1. Mostra o timeout e as retransmissões que o RttEstimator deriva para hosts
+   com RTTs diferentes (amostras sintéticas com jitter).
+2. Mede o tempo total de um escaneamento local com portas abertas, fechadas e
+   "filtradas" (listeners com a fila cheia, que nunca respondem) usando um
+   timeout fixo de 1 s e os perfis adaptativos.
+
+Uso:
+    python benchmarks/bench_rtt_timeouts.py --filtradas 50
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_port_scanner import abrir_listeners, portas_fechadas  # noqa: E402
+from ferramentas.port_scanner import TIMING_PROFILES, RttEstimator, TimingProfile, scan_ports  # noqa: E402
+
+# Sem adaptação: o comportamento antigo, 1 s por porta e nenhuma retransmissão
+FIXO = TimingProfile(initial_timeout=1.0, min_timeout=1.0, max_timeout=1.0, max_retries=0, concurrency=256, rate=0)
+
+
+def timeouts_derivados():
+    print("RTT simulado         perfil      timeout derivado  retransmissões")
+    for nome, rtt, jitter in [("LAN", 0.0003, 0.0001), ("WAN", 0.020, 0.005), ("Transatlântico", 0.150, 0.030)]:
+        for perfil in ("normal", "aggressive"):
+            estimador = RttEstimator(TIMING_PROFILES[perfil])
+            for _ in range(20):
+                estimador.update(max(0.0, random.gauss(rtt, jitter)))
+            print(f"{nome:15s} {rtt * 1000:6.1f} ms  {perfil:10s}  {estimador.timeout * 1000:10.1f} ms  "
+                  f"{estimador.retries:8d}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--abertas", type=int, default=10)
+    parser.add_argument("--filtradas", type=int, default=50)
+    parser.add_argument("--fechadas", type=int, default=1000)
+    parser.add_argument("--repeticoes", type=int, default=3, help="Mantém o melhor tempo de N execuções")
+    args = parser.parse_args()
+
+    timeouts_derivados()
+
+    sockets, abertas, filtradas = abrir_listeners(args.abertas, args.filtradas)
+    fechadas = portas_fechadas(args.fechadas, set(abertas) | set(filtradas))
+    portas = sorted(abertas + filtradas + fechadas)
+    print(f"{len(portas)} portas: {len(abertas)} abertas, {len(filtradas)} filtradas, {len(fechadas)} fechadas")
+
+    try:
+        referencia = None
+        for nome, perfil in [("fixo 1 s", FIXO), ("normal", "normal"), ("aggressive", "aggressive"), ("insane", "insane")]:
+            duracao = float("inf")
+            for _ in range(args.repeticoes):
+                # Mesma concorrência para todos: só a temporização muda
+                inicio = time.perf_counter()
+                encontradas = {p for p, aberta in scan_ports("127.0.0.1", portas, concurrency=256, profile=perfil)
+                               if aberta}
+                duracao = min(duracao, time.perf_counter() - inicio)
+            referencia = referencia or duracao
+            print(f"{nome:12s} {duracao:7.3f}s  ({referencia / duracao:5.1f}x)  abertas corretas: {encontradas == set(abertas)}")
+    finally:
+        for s in sockets:
+            s.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark da página do SpeedTest conforme o histórico cresce.
+
+Gera históricos de N testes (um a cada 10 s, terminando agora) e mede, para
+cada tamanho:
+
+1. a camada de dados: `SpeedHistory.series` + `SpeedHistory.summary` para
+   cada período da página;
+2. a página no harness de testes do Streamlit (AppTest), rerun com o
+   período "Tudo": a página antiga (lista em st.session_state, DataHora como
+   texto, pd.to_datetime, médias sobre todas as linhas e todos os pontos
+   nos gráficos) contra a atual (agregados, LTTB, no máximo MAX_PONTOS
+   pontos).
+
+Uso:
+    python benchmarks/bench_speedtest_history.py --tamanhos 1000 10000 60000 250000
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from ferramentas.speedtest_history import SpeedHistory  # noqa: E402
+from ferramentas.speedtest_module import MAX_PONTOS, PERIODOS  # noqa: E402
+
+INTERVALO = 10 # Segundos entre testes no histórico gerado
+
+
+def testes(n):
+    """(timestamp, download, upload, ping) de n testes terminando agora."""
+    rng = random.Random(0)
+    agora = time.time()
+    for i in range(n):
+        yield (agora - (n - i) * INTERVALO, 100 + 30 * math.sin(i / 500) + rng.gauss(0, 5),
+               20 + rng.gauss(0, 2), 15 + rng.expovariate(0.2))
+
+
+def gerar_historico(diretorio, n):
+    historico = SpeedHistory(os.path.join(diretorio, "speedtest_history.db"))
+    historico.conn.execute("PRAGMA synchronous = OFF") # Só para gerar rápido; a página usa o padrão
+    for timestamp, download, upload, ping in testes(n):
+        historico.record(download, upload, ping, timestamp=timestamp, server="bench")
+    return historico
+
+
+def pagina_antiga(n):
+    # Cópia da seção de resultados da página antiga, com os dados na sessão
+    from datetime import datetime
+
+    import pandas as pd
+    import streamlit as st
+
+    from benchmarks.bench_speedtest_history import testes
+
+    if "dados" not in st.session_state:
+        dados = {"DataHora": [], "Download": [], "Upload": [], "Ping": []}
+        for timestamp, download, upload, ping in testes(n):
+            dados["DataHora"].append(datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S"))
+            dados["Download"].append(download)
+            dados["Upload"].append(upload)
+            dados["Ping"].append(ping)
+        st.session_state.dados = dados
+
+    df = pd.DataFrame(st.session_state.dados)
+    df["DataHora"] = pd.to_datetime(df["DataHora"], errors="coerce")
+    df = df.dropna(subset=["DataHora"])
+    col1, col2, col3 = st.columns(3)
+    col1.metric("📈 Download Médio", f"{df['Download'].mean():.1f} Mbps", f"Max: {df['Download'].max():.1f}")
+    col2.metric("📤 Upload Médio", f"{df['Upload'].mean():.1f} Mbps", f"Max: {df['Upload'].max():.1f}")
+    col3.metric("🏓 Ping Médio", f"{df['Ping'].mean():.0f} ms", f"Min: {df['Ping'].min():.0f}")
+    st.dataframe(df.tail(10), use_container_width=True)
+    st.line_chart(df.set_index("DataHora")[["Download", "Upload"]])
+    st.line_chart(df.set_index("DataHora")[["Ping"]])
+    st.download_button("📥 Baixar Dados da Sessão (CSV)", data=df.to_csv(index=False).encode("utf-8"),
+                       file_name="speedtest.csv", mime="text/csv")
+
+
+def pagina_atual(diretorio):
+    import os
+
+    import streamlit as st
+
+    from ferramentas import speedtest_module
+    from ferramentas.speedtest_scheduler import SpeedtestScheduler
+
+    os.chdir(diretorio) # O agendador abre speedtest_history.db no diretório atual
+    SpeedtestScheduler.wait_for_change = lambda self, version, timeout: st.stop() # Sem a espera do fim da página
+    speedtest_module.speedtest_teste()
+
+
+def cronometrar(funcao, repeticoes):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 60000, 250000],
+                        help="Número de testes no histórico")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--sem-pagina", action="store_true", help="Mede só a camada de dados")
+    args = parser.parse_args()
+
+    from ferramentas import speedtest_module
+
+    print(f"{'testes':>8} {'período':<18} {'resolução':>9} {'pontos':>6} {'dados (ms)':>10}")
+    paginas = []
+    for n in args.tamanhos:
+        with tempfile.TemporaryDirectory() as diretorio:
+            historico = gerar_historico(diretorio, n)
+            for periodo, janela in PERIODOS.items():
+                inicio = time.time() - janela if janela else None
+
+                def consulta():
+                    linhas, resolucao = historico.series(inicio, max_points=MAX_PONTOS)
+                    historico.summary(inicio, resolution=resolucao)
+                    return linhas, resolucao
+
+                linhas, resolucao = consulta()
+                tempo = cronometrar(consulta, args.repeticoes)
+                print(f"{n:>8} {periodo:<18} {resolucao:>9} {len(linhas):>6} {tempo * 1000:>10.1f}")
+
+            if args.sem_pagina:
+                continue
+            speedtest_module._agendador = None # O AppTest roda neste processo: um agendador (e histórico) por tamanho
+            atual = AppTest.from_function(pagina_atual, args=(diretorio,), default_timeout=300).run()
+            atual.selectbox[0].set_value("Tudo")
+            tempo_atual = cronometrar(atual.run, args.repeticoes)
+            antiga = AppTest.from_function(pagina_antiga, args=(n,), default_timeout=300).run()
+            tempo_antiga = cronometrar(antiga.run, args.repeticoes)
+            paginas.append((n, tempo_antiga, tempo_atual))
+
+    if paginas:
+        print(f"\n{'testes':>8} {'página antiga (s)':>18} {'página atual (s)':>17}")
+        for n, tempo_antiga, tempo_atual in paginas:
+            print(f"{n:>8} {tempo_antiga:>18.3f} {tempo_atual:>17.3f}")
+
+
+if __name__ == "__main__":
+    main()
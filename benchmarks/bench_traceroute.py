@@ -0,0 +1,193 @@
+"""
+Harness do traceroute em paralelo com um caminho simulado.
+
+Um respondedor simula os roteadores: para cada sondagem UDP enviada ele
+devolve, depois do RTT do salto, o ICMP "tempo excedido" (ou "porta
+inalcançável", no destino) montado byte a byte como um roteador real faria.
+Os pacotes chegam ao motor por um socketpair que faz o papel do socket raw
+ICMP, passando pelo mesmo parse_icmp e pela mesma correlação do uso real.
+Não precisa de root nem de rede.
+
+Compara:
+1. O motor enviando todos os TTLs de uma vez (trace_probes).
+2. Um TTL por vez, como o traceroute do sistema: cada salto silencioso custa um timeout.
+
+E confere se os saltos descobertos são os do caminho simulado.
+
+Uso:
+    python benchmarks/bench_traceroute.py --saltos 15 --silenciosos 4,9,10
+"""
+import argparse
+import heapq
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from typing import NamedTuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ferramentas.ping import UDP_PROBE_PORT  # noqa: E402
+from ferramentas.traceroute_engine import UdpProbes, collect_hops, trace_probes  # noqa: E402
+
+ORIGEM = "10.0.0.2"
+
+
+class Salto(NamedTuple):
+    ip: str
+    rtt: float # Segundos
+    responde: bool
+
+
+def pacote_icmp(roteador, destino, tipo, codigo, porta_origem, porta_destino):
+    """ICMP de erro como lido de um socket raw IPv4: cabeçalho IP + ICMP + IP/UDP da sondagem citados."""
+    udp = struct.pack("!HHHH", porta_origem, porta_destino, 8 + 32, 0)
+    ip_citado = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + 8 + 32, 0, 0, 1, socket.IPPROTO_UDP, 0,
+                            socket.inet_aton(ORIGEM), socket.inet_aton(destino))
+    icmp = struct.pack("!BBHI", tipo, codigo, 0, 0) + ip_citado + udp
+    return struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + len(icmp), 0, 0, 64, socket.IPPROTO_ICMP, 0,
+                       socket.inet_aton(roteador), socket.inet_aton(ORIGEM)) + icmp
+
+
+class Respondedor:
+    """Agenda as respostas dos saltos e as entrega no socketpair na hora certa."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.entrada, self.saida = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.fila = []
+        self.cond = threading.Condition()
+        self.parar = False
+        self.thread = threading.Thread(target=self._entregar, daemon=True)
+        self.thread.start()
+
+    def sondagem(self, ttl, porta_origem, porta_destino):
+        destino = self.caminho[-1].ip
+        salto = self.caminho[min(ttl, len(self.caminho)) - 1]
+        if not salto.responde:
+            return
+        if ttl >= len(self.caminho):
+            pacote = pacote_icmp(destino, destino, 3, 3, porta_origem, porta_destino) # Porta inalcançável
+        else:
+            pacote = pacote_icmp(salto.ip, destino, 11, 0, porta_origem, porta_destino) # Tempo excedido
+        with self.cond:
+            heapq.heappush(self.fila, (time.perf_counter() + salto.rtt, pacote))
+            self.cond.notify()
+
+    def _entregar(self):
+        with self.cond:
+            while not self.parar:
+                if not self.fila:
+                    self.cond.wait()
+                    continue
+                quando, pacote = self.fila[0]
+                espera = quando - time.perf_counter()
+                if espera > 0:
+                    self.cond.wait(espera)
+                    continue
+                heapq.heappop(self.fila)
+                self.entrada.send(pacote)
+
+    def fechar(self):
+        with self.cond:
+            self.parar = True
+            self.cond.notify()
+        self.thread.join()
+        self.entrada.close()
+        self.saida.close()
+
+
+class Escuta:
+    """Faz a ponta do socketpair se passar pelo socket raw ICMP (o endereço vem do cabeçalho IP)."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.sock.setblocking(False)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def recvfrom(self, tamanho):
+        dados = self.sock.recv(tamanho)
+        return dados, (socket.inet_ntoa(dados[12:16]), 0)
+
+
+class SondagensSimuladas(UdpProbes):
+    """UdpProbes cujos envios vão para o respondedor em vez da rede."""
+
+    def __init__(self, respondedor):
+        self.ip = respondedor.caminho[-1].ip
+        self.family = socket.AF_INET
+        self.port = UDP_PROBE_PORT
+        self.sport = 40000
+        self.sees_hops = False
+        self.respondedor = respondedor
+
+    def send(self, ttl, n):
+        self.respondedor.sondagem(ttl, self.sport, self.port + n)
+
+    def register(self, selector):
+        pass
+
+    def close(self):
+        pass
+
+
+def em_paralelo(respondedor, escuta, args):
+    return collect_hops(trace_probes(SondagensSimuladas(respondedor), escuta, args.max_saltos, args.consultas,
+                                     args.timeout), args.consultas)
+
+
+def um_ttl_por_vez(respondedor, escuta, args):
+    saltos = []
+    for ttl in range(1, args.max_saltos + 1):
+        salto = collect_hops(trace_probes(SondagensSimuladas(respondedor), escuta, ttl, args.consultas,
+                                          args.timeout, first_ttl=ttl), args.consultas)
+        saltos += salto
+        if salto and salto[-1]["kind"] in ("reached", "unreachable"):
+            break
+    return saltos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--saltos", type=int, default=12, help="Saltos até o destino, inclusive")
+    parser.add_argument("--silenciosos", default="3,7,8", help="Saltos que não respondem (ex: 3,7,8)")
+    parser.add_argument("--rtt-ms", type=float, default=8.0, help="RTT acrescentado por salto")
+    parser.add_argument("--timeout", type=float, default=1.0)
+    parser.add_argument("--consultas", type=int, default=3)
+    parser.add_argument("--max-saltos", type=int, default=30)
+    args = parser.parse_args()
+
+    silenciosos = {int(s) for s in args.silenciosos.split(",") if s.strip()}
+    caminho = [Salto(f"10.{i}.0.1", i * args.rtt_ms / 1000, i not in silenciosos) for i in range(1, args.saltos + 1)]
+    esperado = [s.ip if s.responde else None for s in caminho]
+    print(f"Caminho simulado: {args.saltos} saltos, silenciosos: {sorted(silenciosos) or 'nenhum'}, "
+          f"timeout {args.timeout} s")
+
+    respondedor = Respondedor(caminho)
+    escuta = Escuta(respondedor.saida)
+    try:
+        referencia = None
+        for nome, rastrear in [("um TTL por vez", um_ttl_por_vez), ("todos os TTLs", em_paralelo)]:
+            inicio = time.perf_counter()
+            saltos = rastrear(respondedor, escuta, args)
+            duracao = time.perf_counter() - inicio
+            time.sleep(0.1) # Descarta respostas atrasadas antes da próxima rodada
+            while True:
+                try:
+                    escuta.recvfrom(2048)
+                except BlockingIOError:
+                    break
+            encontrados = [salto["ips"][0] if salto["ips"] else None for salto in saltos]
+            status = "OK" if encontrados == esperado else f"DIVERGENTE: {encontrados}"
+            referencia = referencia or duracao
+            print(f"{nome:15s} {duracao:7.3f} s  ({referencia / duracao:5.1f}x)  saltos: {len(saltos):3d}  {status}")
+    finally:
+        respondedor.fechar()
+
+
+if __name__ == "__main__":
+    main()
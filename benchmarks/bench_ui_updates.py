@@ -0,0 +1,78 @@
+"""
+Benchmark do custo da interface durante um escaneamento rápido.
+
+Roda o Verificador de Portas contra portas fechadas de 127.0.0.1 dentro do
+harness de testes do Streamlit (AppTest) em três situações:
+
+* sem_ui: resultados apenas consumidos, sem nenhum elemento na tela;
+* por_porta: o padrão antigo, texto de status e barra de progresso a cada porta;
+* em_quadros: ThrottledProgress e LiveTable de ferramentas/live_ui.py.
+
+O AppTest serializa cada atualização como faria para o navegador, mas sem a
+rede; com um navegador conectado a diferença é maior.
+
+Uso:
+    python benchmarks/bench_ui_updates.py --portas 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+
+def pagina(modo, portas, raiz):
+    # Executada pelo AppTest como um script isolado: importa tudo aqui dentro
+    import sys
+    import time
+    sys.path.insert(0, raiz)
+    import streamlit as st
+    from ferramentas.live_ui import LiveTable, ThrottledProgress
+    from ferramentas.port_scanner import scan_targets
+
+    inicio = time.perf_counter()
+    resultados = scan_targets(["127.0.0.1"], range(20000, 20000 + portas), shards=1, window=1)
+    if modo == "sem_ui":
+        for _ in resultados:
+            pass
+    elif modo == "por_porta":
+        barra = st.progress(0)
+        status = st.empty()
+        for i, r in enumerate(resultados):
+            status.text(f"Porta {r.port} verificada...")
+            barra.progress((i + 1) / portas)
+    else:
+        progresso = ThrottledProgress(portas)
+        tabela = LiveTable()
+        for i, r in enumerate(resultados):
+            progresso.update(i + 1, f"Porta {r.port} verificada...")
+            if r.is_open:
+                tabela.append({"Porta": r.port})
+        progresso.finish()
+        tabela.flush()
+    st.session_state.duracao = time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--portas", type=int, default=5000)
+    parser.add_argument("--repeticoes", type=int, default=3, help="Mantém o melhor tempo de N execuções")
+    args = parser.parse_args()
+
+    print(f"{args.portas} portas fechadas em 127.0.0.1")
+    referencia = None
+    for modo in ("sem_ui", "por_porta", "em_quadros"):
+        melhor = float("inf")
+        for _ in range(args.repeticoes):
+            app = AppTest.from_function(pagina, args=(modo, args.portas, RAIZ), default_timeout=600).run()
+            melhor = min(melhor, app.session_state.duracao)
+        referencia = referencia or melhor
+        print(f"{modo:11s} {melhor:7.3f}s  ({melhor / referencia:5.1f}x o tempo sem interface)")
+
+
+if __name__ == "__main__":
+    main()
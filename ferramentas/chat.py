@@ -1,7 +1,20 @@
 import streamlit as st
-import sqlite3
+import pandas as pd
+import re
+import threading
 import time
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from datetime import datetime
+
+from ferramentas.chat_store import get_store
+
+# Mensagens carregadas de uma vez (inicialmente e a cada "carregar mensagens antigas")
+PAGE_SIZE = 50
+
+# Espera por mensagens novas: fatias de WAIT_SLICE s, e um rerun a cada
+# HEARTBEAT_INTERVAL s mesmo sem mensagens (menor que os 5 min de inatividade)
+WAIT_SLICE = 0.2
+HEARTBEAT_INTERVAL = 30
 
 # Emoji mapping
 EMOJI_MAP = {
@@ -10,92 +23,129 @@ EMOJI_MAP = {
     ":ok:": "👌", ":star:": "⭐"
 }
 
+_EMOJI_RE = re.compile("|".join(map(re.escape, EMOJI_MAP)))
+
 def emojify(text):
-    """Converte códigos de emoji em emojis Unicode."""
-    for k, v in EMOJI_MAP.items():
-        text = text.replace(k, v)
-    return text
+    """Converte códigos de emoji em emojis Unicode (uma única passada pelo texto)."""
+    if ":" not in text: # A maioria das mensagens não tem nenhum código
+        return text
+    return _EMOJI_RE.sub(lambda m: EMOJI_MAP[m.group(0)], text)
+
+# HTML já montado de cada mensagem: (id, é do próprio usuário) -> HTML.
+# Compartilhado pelas sessões; as menos usadas saem quando passa do limite
+RENDER_CACHE_SIZE = 5000
+_render_cache = OrderedDict()
+_render_lock = threading.Lock()
+
+def _message_html(user, msg, timestamp, is_system, own):
+    # Estilos CSS para mensagens de sistema, do próprio usuário e de outros usuários
+    if is_system:
+        return f"<div style='font-style: italic; color: #888; text-align: center; margin: 8px 0;'>{msg}</div>"
+    if own:
+        return f"<div style='display: flex; justify-content: flex-end; margin-bottom: 5px;'><div style='max-width: 70%; background: #e3f0fb; color: #1976d2; border-radius: 15px 15px 0 15px; padding: 10px 15px; box-shadow: 1px 1px 3px rgba(0,0,0,0.1);'><small style='font-weight: bold;'>Você</small><br>{emojify(msg)} <span style='font-size:0.75em;color:#888; display: block; text-align: right;'>{timestamp}</span></div></div>"
+    return f"<div style='display: flex; justify-content: flex-start; margin-bottom: 5px;'><div style='max-width: 70%; background: #f1f1f1; color: #333; border-radius: 15px 15px 15px 0; padding: 10px 15px; box-shadow: 1px 1px 3px rgba(0,0,0,0.1);'><small style='font-weight: bold;'>{user}</small><br>{emojify(msg)} <span style='font-size:0.75em;color:#888; display: block; text-align: right;'>{timestamp}</span></div></div>"
+
+def render_history(messages, username):
+    """
+    Todo o histórico visível como um único bloco HTML (um só st.markdown em vez de um por mensagem).
+
+    O HTML de cada mensagem é montado uma vez e reaproveitado nos reruns
+    seguintes, inclusive pelas outras sessões.
+    """
+    parts = []
+    missing = []
+    with _render_lock:
+        for row in messages:
+            key = (row[0], row[1] == username)
+            html = _render_cache.get(key)
+            if html is None:
+                missing.append((len(parts), key, row))
+            else:
+                _render_cache.move_to_end(key)
+            parts.append(html)
+    if missing:
+        for i, key, (_, user, msg, timestamp, is_system) in missing:
+            parts[i] = _message_html(user, msg, timestamp, is_system, key[1])
+        with _render_lock:
+            for i, key, _ in missing:
+                _render_cache[key] = parts[i]
+            while len(_render_cache) > RENDER_CACHE_SIZE:
+                _render_cache.popitem(last=False)
+    return "\n".join(parts)
 
 # Initialize SQLite database
 def init_db():
-    """Inicializa e conecta ao banco de dados SQLite."""
-    # check_same_thread=False é crucial para SQLite em ambientes multi-thread como o Streamlit
-    conn = sqlite3.connect("chat.db", check_same_thread=False)
-    c = conn.cursor()
-    # Tabela para armazenar as mensagens do chat
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user TEXT,
-            message TEXT,
-            timestamp TEXT,
-            is_system BOOLEAN
-        )
-    """)
-    # Tabela para rastrear usuários ativos
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            username TEXT PRIMARY KEY,
-            last_active TIMESTAMP
-        )
-    """)
-    conn.commit()
-    return conn
+    """
+    Retorna o ChatStore do processo (banco em WAL, criado na primeira chamada).
+
+    Todas as sessões compartilham o mesmo store: as leituras usam um pool de
+    conexões e as escritas passam por uma única thread que as agrupa em
+    transações.
+    """
+    return get_store()
 
 # Add or remove user, update last_active
 def manage_user(username, action="add"):
     """Adiciona, remove ou atualiza o timestamp de atividade de um usuário."""
-    conn = st.session_state.db
-    c = conn.cursor()
+    store = st.session_state.db
     if action == "add":
-        # INSERT OR IGNORE para evitar duplicatas se o usuário já existir
-        c.execute("INSERT OR IGNORE INTO users (username, last_active) VALUES (?, ?)",
-                  (username, datetime.now()))
+        store.add_user(username).result()
     elif action == "remove":
-        c.execute("DELETE FROM users WHERE username = ?", (username,))
+        store.remove_user(username).result()
     elif action == "update":
-        c.execute("UPDATE users SET last_active = ? WHERE username = ?", (datetime.now(), username))
-    conn.commit()
+        # Heartbeat: não precisa esperar, a thread de escrita junta os de todas as sessões
+        store.touch_user(username)
 
 # Add a message to the database
 def add_message(user, message, is_system=False):
-    """Adiciona uma nova mensagem ao banco de dados."""
-    conn = st.session_state.db
-    c = conn.cursor()
-    timestamp = datetime.now().strftime("%H:%M") # Formato de hora:minuto
-    c.execute("INSERT INTO messages (user, message, timestamp, is_system) VALUES (?, ?, ?, ?)",
-              (user, message, timestamp, is_system))
-    conn.commit()
-
-# Get all messages
-def get_messages():
-    """Recupera todas as mensagens do chat, ordenadas por ID."""
-    conn = st.session_state.db
-    c = conn.cursor()
-    c.execute("SELECT user, message, timestamp, is_system FROM messages ORDER BY id")
-    return c.fetchall()
+    """Adiciona uma nova mensagem ao banco de dados e retorna o id dela."""
+    # Espera a gravação para a mensagem já aparecer no rerun seguinte
+    return st.session_state.db.add_message(user, message, is_system).result()
+
+# Get messages after a cursor
+def get_messages(after_id=0, limit=PAGE_SIZE):
+    """
+    Recupera as mensagens com id maior que `after_id`, ordenadas por ID.
+
+    Cada linha é (id, user, message, timestamp, is_system). Se houver mais
+    de `limit` mensagens novas, retorna só as `limit` mais recentes, assim o
+    custo não depende do tamanho do histórico.
+    """
+    return st.session_state.db.messages_after(after_id, limit)
+
+# Get a page of older messages
+def get_messages_before(before_id, limit=PAGE_SIZE):
+    """Recupera as `limit` mensagens imediatamente anteriores a `before_id`, ordenadas por ID."""
+    return st.session_state.db.messages_before(before_id, limit)
+
+def get_last_message_id():
+    """ID da mensagem mais recente (0 se não houver): uma consulta só ao índice da chave primária."""
+    return st.session_state.db.last_message_id()
+
+def has_messages_before(before_id):
+    return st.session_state.db.has_messages_before(before_id)
 
 # Get active users (active in last 5 minutes)
 def get_users():
     """Recupera a lista de usuários ativos (últimos 5 minutos)."""
-    conn = st.session_state.db
-    c = conn.cursor()
-    five_minutes_ago = datetime.now() - timedelta(minutes=5)
-    c.execute("SELECT username FROM users WHERE last_active >= ?", (five_minutes_ago,))
-    return [row[0] for row in c.fetchall()]
+    return st.session_state.db.active_users()
+
+# Full-text search and archive
+def search_messages(text, limit=50):
+    """Mensagens (id, user, message, created_at) que contêm as palavras de `text`, inclusive as arquivadas."""
+    return st.session_state.db.search(text, limit)
+
+def _history_table(rows):
+    return pd.DataFrame([{
+        "Data": datetime.fromtimestamp(created_at).strftime("%d/%m/%Y %H:%M"),
+        "Usuário": user,
+        "Mensagem": emojify(msg),
+    } for user, msg, created_at in rows])
 
 # Clean up inactive users
 def cleanup_users():
-    """Remove usuários inativos do banco de dados e registra a saída."""
-    conn = st.session_state.db
-    c = conn.cursor()
-    five_minutes_ago = datetime.now() - timedelta(minutes=5)
-    c.execute("SELECT username FROM users WHERE last_active < ?", (five_minutes_ago,))
-    inactive_users = [row[0] for row in c.fetchall()]
-    for user in inactive_users:
-        c.execute("DELETE FROM users WHERE username = ?", (user,))
-        add_message("Sistema", f"{user} saiu do chat.", is_system=True) # Registra a saída
-    conn.commit()
+    """Remove usuários inativos do banco de dados e registra a saída (no máximo uma vez a cada poucos segundos no processo)."""
+    st.session_state.db.cleanup()
 
 # A função principal da página do chat
 def chat_dev():
@@ -110,8 +160,10 @@ def chat_dev():
     # Inicializa variáveis de estado da sessão para o chat
     if "username" not in st.session_state:
         st.session_state.username = ""
-    if "last_message_count" not in st.session_state:
-        st.session_state.last_message_count = 0
+    if "chat_messages" not in st.session_state:
+        st.session_state.chat_messages = [] # Janela de mensagens exibidas, da mais antiga para a mais nova
+        st.session_state.chat_window = PAGE_SIZE # Tamanho máximo da janela
+        st.session_state.last_message_id = 0 # Cursor: última mensagem já carregada
     if "chat_active" not in st.session_state:
         st.session_state.chat_active = False
 
@@ -138,20 +190,44 @@ def chat_dev():
         users = get_users()
         st.markdown(f"**Online:** {', '.join(u if u != st.session_state.username else f'**{u}**' for u in users)}")
 
+        # Busca no histórico: índice FTS5, cobre também os dias arquivados
+        with st.expander("🔍 Buscar no histórico"):
+            busca = st.text_input("Palavras:", key="chat_search")
+            if busca.strip():
+                resultados = search_messages(busca)
+                if resultados:
+                    st.dataframe(_history_table((user, msg, created_at) for _, user, msg, created_at in resultados),
+                                 use_container_width=True, hide_index=True)
+                else:
+                    st.info("Nenhuma mensagem encontrada.")
+            dias = st.session_state.db.archive_days()
+            if dias:
+                dia = st.selectbox("Dias arquivados:", dias, index=None, key="chat_archive_day",
+                                   format_func=lambda d: f"{d[0]} ({d[1]} mensagens)")
+                if dia:
+                    arquivadas = st.session_state.db.archived_messages(dia[0])
+                    st.dataframe(_history_table((user, msg, created_at) for _, user, msg, _, _, created_at in arquivadas),
+                                 use_container_width=True, hide_index=True)
+
+        # Busca só as mensagens depois do cursor
+        messages = st.session_state.chat_messages
+        new_messages = get_messages(st.session_state.last_message_id, st.session_state.chat_window)
+        if new_messages:
+            messages.extend(new_messages)
+            st.session_state.last_message_id = new_messages[-1][0]
+            del messages[:-st.session_state.chat_window] # Mantém a janela limitada
+
+        # Paginação para trás: cada clique aumenta a janela em uma página
+        if messages and has_messages_before(messages[0][0]):
+            if st.button("⬆️ Carregar mensagens antigas", key="load_older_button"):
+                messages[:0] = get_messages_before(messages[0][0], PAGE_SIZE)
+                st.session_state.chat_window += PAGE_SIZE
+
         # Contêiner para as mensagens do chat
         chat_placeholder = st.empty() # Usar st.empty() para atualizar o conteúdo
         
         # Exibe as mensagens
-        messages = get_messages()
-        with chat_placeholder.container():
-            for user, msg, timestamp, is_system in messages:
-                # Estilos CSS para mensagens de sistema, do próprio usuário e de outros usuários
-                if is_system:
-                    st.markdown(f"<div style='font-style: italic; color: #888; text-align: center; margin: 8px 0;'>{msg}</div>", unsafe_allow_html=True)
-                elif user == st.session_state.username:
-                    st.markdown(f"<div style='display: flex; justify-content: flex-end; margin-bottom: 5px;'><div style='max-width: 70%; background: #e3f0fb; color: #1976d2; border-radius: 15px 15px 0 15px; padding: 10px 15px; box-shadow: 1px 1px 3px rgba(0,0,0,0.1);'><small style='font-weight: bold;'>Você</small><br>{emojify(msg)} <span style='font-size:0.75em;color:#888; display: block; text-align: right;'>{timestamp}</span></div></div>", unsafe_allow_html=True)
-                else:
-                    st.markdown(f"<div style='display: flex; justify-content: flex-start; margin-bottom: 5px;'><div style='max-width: 70%; background: #f1f1f1; color: #333; border-radius: 15px 15px 15px 0; padding: 10px 15px; box-shadow: 1px 1px 3px rgba(0,0,0,0.1);'><small style='font-weight: bold;'>{user}</small><br>{emojify(msg)} <span style='font-size:0.75em;color:#888; display: block; text-align: right;'>{timestamp}</span></div></div>", unsafe_allow_html=True)
+        chat_placeholder.markdown(render_history(messages, st.session_state.username), unsafe_allow_html=True)
 
         # Usando st.form para o input da mensagem para lidar com a limpeza de forma mais limpa
         with st.form(key='chat_form', clear_on_submit=True):
@@ -167,14 +243,16 @@ def chat_dev():
                 else:
                     st.warning("A mensagem não pode estar vazia.")
 
-        # Auto-refresh para simular atualizações em tempo real
-        # Este loop fará o Streamlit recarregar a cada 2 segundos
+        # Espera por mensagens novas sem reexecutar a página: o broker do
+        # ChatStore acorda a sessão assim que uma mensagem é gravada. A espera
+        # é feita em fatias curtas porque ler o st.session_state é um ponto em
+        # que o Streamlit interrompe o script (envio do formulário, cliques ou
+        # sessão encerrada). A cada HEARTBEAT_INTERVAL s a página roda de novo
+        # para renovar o last_active e a lista de online.
         if st.session_state.chat_active:
-            current_message_count = len(get_messages()) # Pega a contagem atual de mensagens
-            if current_message_count > st.session_state.last_message_count:
-                st.session_state.last_message_count = current_message_count
-                st.rerun() # Força o rerun se houver novas mensagens
-            else:
-                time.sleep(2)  # Poll a cada 2 segundos
-                st.rerun() # Força o rerun para verificar novas mensagens
-
+            limite = time.monotonic() + HEARTBEAT_INTERVAL
+            while time.monotonic() < limite:
+                cursor = st.session_state.last_message_id
+                if st.session_state.db.wait_for_message(cursor, WAIT_SLICE) > cursor:
+                    break
+            st.rerun()
\ No newline at end of file
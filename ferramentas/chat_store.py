@@ -0,0 +1,462 @@
+# ferramentas/chat_store.py
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+# Caminho do banco do chat; pode ser trocado pela variável de ambiente CHAT_DB_PATH
+DEFAULT_PATH = os.environ.get("CHAT_DB_PATH", "chat.db")
+
+# Usuários sem atividade há mais que isso saem da lista de online
+INACTIVE_AFTER = timedelta(minutes=5)
+
+# Dias completos mantidos na tabela de mensagens; os mais antigos vão para o arquivo
+RETENTION_DAYS = int(os.environ.get("CHAT_RETENTION_DAYS", 7))
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user TEXT,
+        message TEXT,
+        timestamp TEXT,
+        is_system BOOLEAN,
+        created_at REAL
+    )""",
+    """CREATE TABLE IF NOT EXISTS users (
+        username TEXT PRIMARY KEY,
+        last_active TIMESTAMP
+    )""",
+    # Um registro por dia arquivado: as mensagens do dia em JSON comprimido com zlib
+    """CREATE TABLE IF NOT EXISTS messages_archive (
+        day TEXT PRIMARY KEY,
+        count INTEGER,
+        data BLOB
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_users_last_active ON users (last_active)",
+]
+
+# Índice de busca: guarda o próprio texto, então as mensagens continuam
+# pesquisáveis depois de arquivadas. remove_diacritics: "voce" acha "você"
+_FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE messages_fts USING fts5(
+        user, message, created_at UNINDEXED, tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages WHEN NOT new.is_system BEGIN
+        INSERT INTO messages_fts (rowid, user, message, created_at) VALUES (new.id, new.user, new.message, new.created_at);
+    END""",
+]
+
+# BEGIN IMMEDIATE mais demorado que isso conta como espera pelo lock de
+# escrita (outro processo escrevendo no banco, ou um checkpoint do WAL)
+LOCK_WAIT_THRESHOLD = 0.001
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(path=None):
+    """ChatStore compartilhado por todas as sessões do processo para o banco `path`."""
+    path = os.path.abspath(path or DEFAULT_PATH)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = ChatStore(path)
+        return store
+
+class MessageBroker:
+    """
+    Avisa as sessões que esperam por mensagens novas.
+
+    A thread de escrita publica o maior id gravado; quem espera bloqueia numa
+    variável de condição até aparecer um id maior que o seu cursor, sem
+    consultar o banco.
+    """
+
+    def __init__(self, last_id=0):
+        self._cond = threading.Condition()
+        self.last_id = last_id
+
+    def publish(self, message_id):
+        with self._cond:
+            if message_id > self.last_id:
+                self.last_id = message_id
+                self._cond.notify_all()
+
+    def wait(self, after_id, timeout):
+        """Espera até `timeout` s por uma mensagem com id > after_id; retorna o maior id conhecido."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.last_id > after_id, timeout)
+            return self.last_id
+
+def _now():
+    # Mesmo formato que o adaptador de datetime do sqlite3 gravava nas versões anteriores
+    return datetime.now().isoformat(" ")
+
+class ChatStore:
+    """
+    Acesso ao banco do chat compartilhado pelo processo inteiro.
+
+    O banco roda em modo WAL: as leituras usam um pool de conexões e não
+    bloqueiam nem são bloqueadas pela escrita. Todas as escritas passam por
+    uma única thread, que agrupa o que chegou na fila em uma transação:
+    mensagens e entradas/saídas de usuários na ordem de chegada, e os
+    heartbeats (touch_user) de cada usuário reduzidos a um único UPDATE.
+    Os métodos de escrita retornam um Future com o resultado.
+
+    A tabela de mensagens guarda só os últimos `retention_days` dias; os
+    anteriores são arquivados em messages_archive, um registro comprimido por
+    dia, e continuam pesquisáveis pelo índice FTS5 (`search`).
+    """
+
+    def __init__(self, path=DEFAULT_PATH, batch_size=512, linger=0.002, cleanup_interval=5.0, max_readers=16,
+                 db_check_interval=5.0, retention_days=RETENTION_DAYS, archive_interval=3600.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.linger = linger # Espera por mais escritas antes de fechar um lote
+        self.cleanup_interval = cleanup_interval
+        self.max_readers = max_readers
+        self.db_check_interval = db_check_interval # Consulta ao MAX(id) para ver escritas de outros processos
+        self.retention_days = retention_days
+        self.archive_interval = archive_interval
+        self._readers = queue.LifoQueue()
+        self._writes = queue.Queue()
+        self._lock = threading.Lock()
+        self._touching = {} # usuário -> Future do heartbeat ainda na fila
+        self._cleaning = None # Future da limpeza ainda na fila
+        self._last_cleanup = float("-inf")
+        self._last_db_check = time.monotonic()
+        self._last_archive = float("-inf")
+        self.batches = 0 # Transações feitas pela thread de escrita
+        self.writes = 0 # Operações de escrita recebidas
+        self.lock_waits = 0 # Transações que esperaram o lock de escrita
+        self.lock_wait_time = 0.0
+
+        self._conn = self._connect()
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self.fts = self._migrate()
+        self.broker = MessageBroker(self.last_message_id())
+        self._thread = threading.Thread(target=self._write_loop, name="chat-writer", daemon=True)
+        self._thread.start()
+
+    def _migrate(self):
+        """Cria ou atualiza o esquema; retorna se a busca por FTS5 está disponível."""
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+            if "created_at" not in columns:
+                # Bancos antigos só guardam "%H:%M": a data das mensagens
+                # existentes é desconhecida, então elas ficam com a da migração
+                conn.execute("ALTER TABLE messages ADD COLUMN created_at REAL")
+                conn.execute("UPDATE messages SET created_at = ?", (time.time(),))
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_created_at ON messages (created_at)")
+            fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'").fetchone() is not None
+            if not fts:
+                try:
+                    for statement in _FTS_SCHEMA:
+                        conn.execute(statement)
+                    conn.execute("INSERT INTO messages_fts (rowid, user, message, created_at) "
+                                 "SELECT id, user, message, created_at FROM messages WHERE NOT is_system")
+                    fts = True
+                except sqlite3.OperationalError:
+                    pass # SQLite sem FTS5: a busca cai para LIKE na tabela de mensagens
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return fts
+
+    def _connect(self):
+        # check_same_thread=False: as conexões do pool passam pelas threads das sessões
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA synchronous = NORMAL") # Seguro em WAL e evita um fsync por transação
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """Empresta uma conexão de leitura do pool."""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if self._readers.qsize() < self.max_readers:
+                self._readers.put(conn)
+            else:
+                conn.close()
+
+    # Leituras
+
+    def messages_after(self, after_id=0, limit=50):
+        """Mensagens (id, user, message, timestamp, is_system) com id > after_id; no máximo as `limit` mais recentes."""
+        with self.reader() as conn:
+            rows = conn.execute("SELECT id, user, message, timestamp, is_system FROM messages WHERE id > ? "
+                                "ORDER BY id DESC LIMIT ?", (after_id, limit)).fetchall()
+        return rows[::-1]
+
+    def messages_before(self, before_id, limit=50):
+        with self.reader() as conn:
+            rows = conn.execute("SELECT id, user, message, timestamp, is_system FROM messages WHERE id < ? "
+                                "ORDER BY id DESC LIMIT ?", (before_id, limit)).fetchall()
+        return rows[::-1]
+
+    def last_message_id(self):
+        with self.reader() as conn:
+            return conn.execute("SELECT MAX(id) FROM messages").fetchone()[0] or 0
+
+    def has_messages_before(self, before_id):
+        with self.reader() as conn:
+            return conn.execute("SELECT 1 FROM messages WHERE id < ? LIMIT 1", (before_id,)).fetchone() is not None
+
+    def wait_for_message(self, after_id, timeout):
+        """
+        Espera até `timeout` s por uma mensagem com id > after_id e retorna o maior id conhecido.
+
+        As mensagens gravadas por este processo acordam a espera na hora. As
+        de outros processos usando o mesmo banco aparecem pela consulta ao
+        MAX(id), feita por uma só sessão a cada `db_check_interval` s.
+        """
+        last_id = self.broker.wait(after_id, timeout)
+        if last_id <= after_id:
+            with self._lock:
+                check = time.monotonic() - self._last_db_check >= self.db_check_interval
+                if check:
+                    self._last_db_check = time.monotonic()
+            if check:
+                self.broker.publish(self.last_message_id())
+                last_id = self.broker.last_id
+        return last_id
+
+    def search(self, text, limit=50):
+        """
+        Mensagens (id, user, message, created_at) com todas as palavras de `text`, das mais recentes para as mais antigas.
+
+        Usa o índice FTS5, que cobre também as mensagens já arquivadas; cada
+        palavra casa como prefixo ("rot" acha "roteador").
+        """
+        terms = text.split()
+        if not terms:
+            return []
+        with self.reader() as conn:
+            if self.fts:
+                query = " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+                return conn.execute("SELECT rowid, user, message, created_at FROM messages_fts WHERE messages_fts MATCH ? "
+                                    "ORDER BY rowid DESC LIMIT ?", (query, limit)).fetchall()
+            where = " AND ".join(["message LIKE ?"] * len(terms))
+            return conn.execute(f"SELECT id, user, message, created_at FROM messages WHERE NOT is_system AND {where} "
+                                "ORDER BY id DESC LIMIT ?", [f"%{term}%" for term in terms] + [limit]).fetchall()
+
+    def archive_days(self):
+        """Dias arquivados, do mais recente para o mais antigo: lista de (dia ISO, número de mensagens)."""
+        with self.reader() as conn:
+            return conn.execute("SELECT day, count FROM messages_archive ORDER BY day DESC").fetchall()
+
+    def archived_messages(self, day):
+        """Mensagens (id, user, message, timestamp, is_system, created_at) arquivadas no dia `day` (ISO)."""
+        with self.reader() as conn:
+            row = conn.execute("SELECT data FROM messages_archive WHERE day = ?", (day,)).fetchone()
+        return [tuple(message) for message in json.loads(zlib.decompress(row[0]))] if row else []
+
+    def active_users(self):
+        since = (datetime.now() - INACTIVE_AFTER).isoformat(" ")
+        with self.reader() as conn:
+            return [row[0] for row in conn.execute("SELECT username FROM users WHERE last_active >= ?", (since,))]
+
+    # Escritas (enfileiradas para a thread de escrita)
+
+    def _submit(self, op, *args):
+        future = Future()
+        self._writes.put((op, args, future))
+        return future
+
+    def add_message(self, user, message, is_system=False):
+        """Future com o id da mensagem gravada."""
+        return self._submit("message", user, message, datetime.now().strftime("%H:%M"), is_system, time.time())
+
+    def add_user(self, username):
+        return self._submit("add_user", username)
+
+    def remove_user(self, username):
+        return self._submit("remove_user", username)
+
+    def touch_user(self, username):
+        """Heartbeat: atualiza last_active. Enquanto um heartbeat do usuário está na fila, os seguintes o reaproveitam."""
+        with self._lock:
+            future = self._touching.get(username)
+            if future is None:
+                future = self._touching[username] = self._submit("touch", username)
+            return future
+
+    def cleanup(self):
+        """
+        Remove os usuários inativos e registra a saída de cada um.
+
+        É uma única operação em conjunto (INSERT ... SELECT + DELETE), feita
+        no máximo uma vez a cada `cleanup_interval` s no processo inteiro,
+        por mais sessões que a peçam.
+        """
+        with self._lock:
+            if self._cleaning is None:
+                if time.monotonic() - self._last_cleanup < self.cleanup_interval:
+                    future = Future()
+                    future.set_result(0)
+                    return future
+                self._cleaning = self._submit("cleanup")
+            return self._cleaning
+
+    def close(self):
+        self._writes.put(None)
+        self._thread.join()
+        self._conn.close()
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+
+    def _write_loop(self):
+        while True:
+            first = self._writes.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.linger
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._writes.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._apply(batch)
+            if stop:
+                return
+
+    def _apply(self, batch):
+        conn = self._conn
+        results = []
+        touches = {} # usuário -> instante do último heartbeat do lote
+        newest = 0 # Maior id de mensagem gravado no lote
+        cleaned_at = archived_at = None # Limpeza/arquivamento feitos no lote (instante monotônico)
+        with self._lock:
+            # Daqui em diante, novos heartbeats e limpezas vão para o próximo lote
+            for op, args, future in batch:
+                if op == "touch" and self._touching.get(args[0]) is future:
+                    del self._touching[args[0]]
+                elif op == "cleanup" and self._cleaning is future:
+                    self._cleaning = None
+        try:
+            start = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            waited = time.perf_counter() - start
+            if waited > LOCK_WAIT_THRESHOLD:
+                self.lock_waits += 1
+                self.lock_wait_time += waited
+            for op, args, _ in batch:
+                if op == "message":
+                    newest = conn.execute(
+                        "INSERT INTO messages (user, message, timestamp, is_system, created_at) VALUES (?, ?, ?, ?, ?)",
+                        args).lastrowid
+                    results.append(newest)
+                elif op == "add_user":
+                    conn.execute("INSERT OR IGNORE INTO users (username, last_active) VALUES (?, ?)", (args[0], _now()))
+                    results.append(None)
+                elif op == "remove_user":
+                    conn.execute("DELETE FROM users WHERE username = ?", args)
+                    touches.pop(args[0], None)
+                    results.append(None)
+                elif op == "touch":
+                    touches[args[0]] = _now()
+                    results.append(None)
+                elif op == "cleanup":
+                    # Os heartbeats do lote são gravados antes: quem acabou de
+                    # voltar ao chat não pode ser removido como inativo
+                    self._flush_touches(conn, touches)
+                    now = time.monotonic()
+                    if now - self._last_cleanup >= self.cleanup_interval:
+                        cleaned_at = now
+                        results.append(self._cleanup(conn))
+                        if results[-1]:
+                            newest = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                    else:
+                        results.append(0)
+                    if now - self._last_archive >= self.archive_interval:
+                        archived_at = now
+                        self._archive(conn)
+            self._flush_touches(conn, touches)
+            conn.execute("COMMIT")
+        except Exception as e:
+            # Qualquer falha (SQLite, JSON/zlib do arquivamento, argumentos
+            # inválidos) desfaz o lote e vai para quem espera cada escrita: a
+            # thread de escrita continua viva para os próximos lotes
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        # Só depois do COMMIT: uma limpeza desfeita volta a ser feita no próximo pedido
+        with self._lock:
+            if cleaned_at is not None:
+                self._last_cleanup = cleaned_at
+            if archived_at is not None:
+                self._last_archive = archived_at
+        self.batches += 1
+        self.writes += len(batch)
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+        if newest:
+            try:
+                self.broker.publish(newest)
+            except Exception:
+                pass # As mensagens já estão gravadas; os leitores as pegam na próxima consulta
+
+    @staticmethod
+    def _flush_touches(conn, touches):
+        if touches:
+            conn.executemany("UPDATE users SET last_active = ? WHERE username = ?",
+                             [(ts, user) for user, ts in touches.items()])
+            touches.clear()
+
+    def _cleanup(self, conn):
+        before = (datetime.now() - INACTIVE_AFTER).isoformat(" ")
+        conn.execute("""
+            INSERT INTO messages (user, message, timestamp, is_system, created_at)
+            SELECT 'Sistema', username || ' saiu do chat.', ?, 1, ? FROM users WHERE last_active < ?
+        """, (datetime.now().strftime("%H:%M"), time.time(), before))
+        return conn.execute("DELETE FROM users WHERE last_active < ?", (before,)).rowcount
+
+    def _archive(self, conn):
+        """
+        Move para messages_archive as mensagens de dias fora da retenção.
+
+        Roda junto com a limpeza, no máximo uma vez a cada `archive_interval` s.
+        Cada dia vira um registro com as mensagens em JSON comprimido; se o dia
+        já tem registro (mensagens que chegaram atrasadas), as novas são somadas.
+        """
+        cutoff = datetime.combine(date.today() - timedelta(days=self.retention_days), datetime.min.time()).timestamp()
+        rows = conn.execute("SELECT id, user, message, timestamp, is_system, created_at FROM messages "
+                            "WHERE created_at < ? ORDER BY id", (cutoff,)).fetchall()
+        if not rows:
+            return 0
+        days = defaultdict(list)
+        for row in rows:
+            days[date.fromtimestamp(row[5]).isoformat()].append(list(row))
+        for day, messages in days.items():
+            old = conn.execute("SELECT data FROM messages_archive WHERE day = ?", (day,)).fetchone()
+            if old:
+                messages = json.loads(zlib.decompress(old[0])) + messages
+            data = zlib.compress(json.dumps(messages, ensure_ascii=False).encode(), 9)
+            conn.execute("INSERT OR REPLACE INTO messages_archive (day, count, data) VALUES (?, ?, ?)",
+                         (day, len(messages), data))
+        conn.execute("DELETE FROM messages WHERE created_at < ?", (cutoff,))
+        return len(rows)
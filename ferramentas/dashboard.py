@@ -1,5 +1,66 @@
+import socket
+
+import numpy as np
 import streamlit as st
-from ferramentas.ping import ping # Importe a função ping do módulo ping
+import pandas as pd
+from ferramentas.live_ui import Throttle
+from ferramentas.ping import RingBuffer, ping, ping_stream, ping_sweep # Importe as funções de ping do módulo ping
+from ferramentas.port_scanner import expand_targets
+
+# Limite de hosts por varredura, para não esgotar descritores e memória da sessão
+MAX_SWEEP_HOSTS = 4096
+
+# Amostras mantidas para o gráfico do ping ao vivo (o ping contínuo pode rodar por horas)
+PING_BUFFER_SIZE = 600
+
+def _ms(value):
+    """Formata uma latência em ms (o ping do sistema no Windows retorna inteiros)."""
+    return "N/A" if value is None else f"{value:.2f} ms" if isinstance(value, float) else f"{value} ms"
+
+def _render_ping(buffer, chart, summary, last=None):
+    """Desenha o gráfico e o resumo a partir do buffer circular de amostras."""
+    _, rtts = buffer.arrays()
+    seqs = np.arange(buffer.total - len(buffer), buffer.total) + 1
+    chart.line_chart(pd.DataFrame({"RTT (ms)": rtts}, index=pd.Index(seqs, name="Pacote")))
+    stats = buffer.stats()
+    text = (f"**Pacotes:** {buffer.total}  •  **Perda:** {stats['loss_pct']:.0f}%  •  "
+            f"**Mín/Média/Máx:** {_ms(stats['min_latency_ms'])} / {_ms(stats['avg_latency_ms'])} / "
+            f"{_ms(stats['max_latency_ms'])}  •  **Jitter:** {_ms(stats['jitter_ms'])}")
+    if buffer.total > len(buffer):
+        text += f"  \n_Estatísticas das últimas {len(buffer)} amostras._"
+    if last is not None:
+        reply = f"tempo={last['rtt_ms']:.2f} ms" if last["rtt_ms"] is not None else "sem resposta"
+        text += f"  \nResposta de {last['ip']}: seq={last['seq']} {reply} ({last['method'].upper()})"
+    summary.markdown(text)
+
+def _ping_ao_vivo(host, count, interval, method):
+    """Executa o ping em streaming, redesenhando o gráfico a cada quadro (count=None = contínuo)."""
+    try:
+        stream = ping_stream(host, count=count, interval=interval, method=method)
+    except (socket.gaierror, ValueError): # ValueError: nome malformado, ex: "a..b"
+        st.error(f"Erro ao executar o ping: Não foi possível resolver o host {host}.")
+        return
+    except (OSError, KeyError) as e:
+        st.error(f"Erro ao executar o ping: Método de ping indisponível: {e}")
+        return
+
+    # Um buffer novo por medição; fica na sessão para o resultado sobreviver ao botão Parar
+    buffer = st.session_state.ping_buffer = RingBuffer(PING_BUFFER_SIZE)
+    summary = st.empty()
+    chart = st.empty()
+    throttle = Throttle(fps=4)
+    sample = None
+    try:
+        for sample in stream:
+            buffer.append(sample["timestamp"], sample["rtt_ms"])
+            if throttle.ready():
+                _render_ping(buffer, chart, summary, sample)
+    except OSError as e:
+        st.error(f"Erro ao enviar pacotes: {e}")
+    if buffer.total:
+        _render_ping(buffer, chart, summary, sample)
+        if buffer.stats()["received"] == 0:
+            st.error(f"Erro ao executar o ping: Nenhuma resposta de {host} ({sample['ip']}).")
 
 def render_dashboard():
     st.title("Página do Dashboard")
@@ -9,19 +70,97 @@ def render_dashboard():
     st.subheader("📍 Medidor de Latência da Rede")
 
     host = st.text_input("Endereço IP ou domínio", value="8.8.8.8")
-    count = st.number_input("Número de pacotes (ping)", min_value=1, max_value=50, value=3)
+    continuous = st.checkbox("Ping contínuo", help="Envia pacotes até você clicar em Parar. "
+                                                   f"O gráfico mostra as últimas {PING_BUFFER_SIZE} amostras.")
+    count = st.number_input("Número de pacotes (ping)", min_value=1, max_value=50, value=3, disabled=continuous)
+    col1, col2 = st.columns(2)
+    interval = col1.number_input("Intervalo entre pacotes (s)", min_value=0.05, max_value=10.0, value=1.0, step=0.05)
+    method = col2.selectbox("Método", ["auto", "icmp", "tcp", "udp", "sistema"],
+                            help="auto usa ICMP e, sem permissão para sockets ICMP, TCP (porta 443). "
+                                 "sistema executa o comando ping.")
 
     if st.button("🔍 Medir Latência (Ping)"):
+        if method == "sistema":
+            # O comando do sistema só devolve a saída no fim, sem respostas ao vivo
+            try:
+                response = ping(host=host, count=count, method=method)
+                if response["success"]:
+                    st.markdown(f"**Host:** {response['host']}")
+                    st.markdown(f"**Pacotes enviados:** {response['count']}")
+                    st.markdown(f"**Latência mínima:** {_ms(response['min_latency_ms'])}")
+                    st.markdown(f"**Latência máxima:** {_ms(response['max_latency_ms'])}")
+                    st.markdown(f"**Latência média:** {_ms(response['avg_latency_ms'])}")
+                    if "loss_pct" in response:
+                        st.markdown(f"**Perda:** {response['loss_pct']:.0f}%  •  **Jitter:** {_ms(response['jitter_ms'])}")
+                    st.code(response["output"])
+                else:
+                    st.error(f"Erro ao executar o ping: {response['error']}")
+            except Exception as e:
+                st.error(f"Erro inesperado: {str(e)}")
+        else:
+            if continuous:
+                # Clicar em Parar reexecuta o script, o que interrompe o laço do ping
+                st.button("⏹️ Parar")
+            _ping_ao_vivo(host, None if continuous else int(count), interval, method)
+    elif "ping_buffer" in st.session_state:
+        # Resultado da última medição (ex: depois de parar o ping contínuo)
+        summary = st.empty()
+        _render_ping(st.session_state.ping_buffer, st.empty(), summary)
+
+    # Varredura de vários hosts
+    st.subheader("📡 Varredura de Hosts (Ping Sweep)")
+    st.write("Mede vários hosts ao mesmo tempo. Aceita IPs, domínios, CIDR (192.168.0.0/24) e faixas (10.0.0.1-50).")
+
+    sweep_text = st.text_area("Hosts (um ou mais por linha)", value="8.8.8.8\n1.1.1.1")
+    uploaded = st.file_uploader("Ou envie uma lista de hosts", type=["txt", "csv"], key="sweep_upload")
+    col1, col2, col3, col4 = st.columns(4)
+    sweep_count = col1.number_input("Pacotes por host", min_value=1, max_value=50, value=3, key="sweep_count")
+    sweep_interval = col2.number_input("Intervalo (s)", min_value=0.05, max_value=10.0, value=0.5, step=0.05,
+                                       key="sweep_interval")
+    sweep_timeout = col3.number_input("Timeout (s)", min_value=0.1, max_value=10.0, value=1.0, step=0.1,
+                                      key="sweep_timeout")
+    sweep_method = col4.selectbox("Método", ["auto", "icmp", "tcp", "udp"], key="sweep_method")
+
+    if st.button("📡 Iniciar Varredura"):
+        lines = sweep_text.splitlines()
+        if uploaded is not None:
+            lines += uploaded.getvalue().decode("utf-8", errors="ignore").splitlines()
         try:
-            response = ping(host=host, count=count)
-            if response["success"]:
-                st.markdown(f"**Host:** {response['host']}")
-                st.markdown(f"**Pacotes enviados:** {response['count']}")
-                st.markdown(f"**Latência mínima:** {response['min_latency_ms']} ms")
-                st.markdown(f"**Latência máxima:** {response['max_latency_ms']} ms")
-                st.markdown(f"**Latência média:** {response['avg_latency_ms']} ms")
-                st.code(response["output"])
-            else:
-                st.error(f"Erro ao executar o ping: {response['error']}")
-        except Exception as e:
-            st.error(f"Erro inesperado: {str(e)}")
\ No newline at end of file
+            hosts = []
+            for host in expand_targets(lines):
+                if len(hosts) == MAX_SWEEP_HOSTS:
+                    st.warning(f"Lista limitada aos primeiros {MAX_SWEEP_HOSTS} hosts.")
+                    break
+                hosts.append(host)
+        except ValueError as e:
+            st.error(f"Alvo inválido: {e}")
+            return
+        if not hosts:
+            st.warning("Nenhum host informado.")
+            return
+
+        try:
+            with st.spinner(f"Varrendo {len(hosts)} host(s)..."):
+                result = ping_sweep(hosts, count=int(sweep_count), interval=sweep_interval, timeout=sweep_timeout,
+                                    method=sweep_method)
+        except (OSError, ValueError) as e:
+            # Ex: método "icmp" sem permissão para sockets ICMP, ou um alvo inválido
+            st.error(f"Erro ao executar a varredura: Método de ping indisponível ou alvo inválido: {e}")
+            return
+
+        df = pd.DataFrame({
+            "Host": result["hosts"],
+            "IP": [ip or "não resolvido" for ip in result["ips"]],
+            "Perda (%)": result["loss_pct"],
+            "Mín (ms)": result["min_latency_ms"],
+            "Média (ms)": result["avg_latency_ms"],
+            "p50 (ms)": result["p50_ms"],
+            "p95 (ms)": result["p95_ms"],
+            "p99 (ms)": result["p99_ms"],
+            "Máx (ms)": result["max_latency_ms"],
+            "Jitter (ms)": result["jitter_ms"],
+        })
+        online = int((result["received"] > 0).sum())
+        st.success(f"Varredura concluída via {result['method'].upper()}: {online} de {len(hosts)} host(s) responderam.")
+        # st.dataframe permite ordenar clicando no cabeçalho das colunas
+        st.dataframe(df.round(2), use_container_width=True, hide_index=True)
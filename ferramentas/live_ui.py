@@ -0,0 +1,129 @@
+# ferramentas/live_ui.py
+import queue
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+# Cada chamada a um elemento do Streamlit vira uma mensagem para o navegador.
+# Estes auxiliares acumulam as mudanças e só redesenham a uma taxa fixa de quadros.
+
+class Throttle:
+    """Libera uma ação no máximo `fps` vezes por segundo."""
+
+    def __init__(self, fps=10):
+        self.interval = 1.0 / fps
+        self._last = float("-inf")
+
+    def ready(self):
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._last = now
+            return True
+        return False
+
+class ThrottledProgress:
+    """Barra de progresso com linha de status que coalesce as atualizações em quadros."""
+
+    def __init__(self, total, fps=10, show_status=True):
+        self.total = total
+        self.done = 0
+        self.message = None
+        self.bar = st.progress(0)
+        self.status = st.empty() if show_status else None
+        self.throttle = Throttle(fps)
+
+    def update(self, done=None, message=None):
+        """Registra o avanço; a tela só é atualizada quando o quadro atual vence."""
+        self.done = self.done + 1 if done is None else done
+        if message is not None:
+            self.message = message
+        if self.throttle.ready():
+            self._render()
+
+    def finish(self, message=None):
+        self.done = self.total
+        if message is not None:
+            self.message = message
+        self._render()
+
+    def _render(self):
+        self.bar.progress(min(1.0, self.done / self.total) if self.total else 1.0)
+        if self.status is not None and self.message:
+            self.status.text(self.message)
+
+class LiveTable:
+    """
+    Tabela atualizada em tempo real.
+
+    As linhas são acumuladas conforme chegam (append) ou alteradas no lugar
+    (touch) e a tabela só é redesenhada a cada quadro, em vez de a cada linha.
+    `rows` pode ser uma lista ou um dict (as linhas são os valores) e
+    `formatter` converte cada linha no dict exibido.
+    """
+
+    def __init__(self, rows=None, fps=4, formatter=None, static=False):
+        self.rows = [] if rows is None else rows
+        self.formatter = formatter
+        self.static = static # st.table em vez de st.dataframe
+        self.placeholder = st.empty()
+        self.throttle = Throttle(fps)
+        self.dirty = False
+
+    def append(self, row):
+        self.rows.append(row)
+        self.touch()
+
+    def touch(self):
+        """Marca a tabela como alterada e redesenha se o quadro atual venceu."""
+        self.dirty = True
+        if self.throttle.ready():
+            self.flush()
+
+    def flush(self):
+        """Redesenha imediatamente, se houver mudanças pendentes."""
+        if not self.dirty:
+            return
+        rows = self.rows.values() if isinstance(self.rows, dict) else self.rows
+        if self.formatter is not None:
+            rows = map(self.formatter, rows)
+        df = pd.DataFrame(list(rows))
+        if self.static:
+            self.placeholder.table(df)
+        else:
+            self.placeholder.dataframe(df, use_container_width=True)
+        self.dirty = False
+
+def iter_with_idle(iterable, on_idle, interval=0.25):
+    """
+    Itera `iterable` em uma thread auxiliar, chamando `on_idle()` quando nada chega por `interval` s.
+
+    Serve para fontes lentas e bloqueantes (ex: a saída de um subprocesso): o
+    último quadro pendente é desenhado enquanto a próxima linha não chega.
+    `on_idle` roda na thread de quem itera, onde os elementos do Streamlit podem ser usados.
+    """
+    items = queue.Queue()
+    done = object()
+
+    def read():
+        try:
+            for item in iterable:
+                items.put(item)
+        except Exception as e:
+            items.put(e)
+        finally:
+            items.put(done)
+
+    threading.Thread(target=read, daemon=True).start()
+    while True:
+        try:
+            item = items.get(timeout=interval)
+        except queue.Empty:
+            on_idle()
+            continue
+        if item is done:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
@@ -3,8 +3,224 @@ import platform
 import subprocess
 import re
 import shutil # Importe shutil
+import socket
+import struct
+import time
+import itertools
+import asyncio
+import warnings
 
-def ping(host='8.8.8.8', count=4):
+import numpy as np
+
+from ferramentas.resolver import default_resolver
+
+# Tipos ICMP de eco (requisição, resposta) para IPv4 e IPv6
+ICMP_ECHO = {socket.AF_INET: (8, 0), socket.AF_INET6: (128, 129)}
+
+# Porta alta usada pela sondagem UDP: a resposta esperada é um ICMP "port unreachable"
+UDP_PROBE_PORT = 33434
+
+_ids = itertools.count(os.getpid() & 0xFFFF)
+
+def _checksum(data):
+    """Checksum da internet (RFC 1071)."""
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+class IcmpProber:
+    """
+    Envia ICMP echo pelo próprio processo, sem o comando ping.
+
+    Usa um socket de datagrama ICMP (sem privilégios no Linux com
+    net.ipv4.ping_group_range e no macOS) e, se não houver permissão, um
+    socket raw (root/administrador).
+    """
+
+    method = "icmp"
+
+    def __init__(self, ip, family, timeout):
+        self.ip = ip
+        self.family = family
+        self.timeout = timeout
+        proto = socket.IPPROTO_ICMP if family == socket.AF_INET else socket.IPPROTO_ICMPV6
+        try:
+            self.sock = socket.socket(family, socket.SOCK_DGRAM, proto)
+            self.raw = False
+        except PermissionError:
+            self.sock = socket.socket(family, socket.SOCK_RAW, proto)
+            self.raw = True
+        self.ident = next(_ids) & 0xFFFF
+
+    def _packet(self, seq):
+        request, _ = ICMP_ECHO[self.family]
+        payload = struct.pack("!d", time.perf_counter()).ljust(56, b"\0")
+        header = struct.pack("!BBHHH", request, 0, 0, self.ident, seq & 0xFFFF)
+        if self.family == socket.AF_INET6:
+            return header + payload # O kernel calcula o checksum do ICMPv6
+        return struct.pack("!BBHHH", request, 0, _checksum(header + payload), self.ident, seq & 0xFFFF) + payload
+
+    def _parse(self, data):
+        """Retorna a sequência de uma resposta de eco destinada a este prober, ou None."""
+        if self.family == socket.AF_INET and data and data[0] >> 4 == 4:
+            data = data[(data[0] & 0x0F) * 4:] # Socket raw (e DGRAM no macOS) inclui o cabeçalho IP
+        if len(data) < 8:
+            return None
+        kind, _, _, ident, seq = struct.unpack("!BBHHH", data[:8])
+        if kind != ICMP_ECHO[self.family][1]:
+            return None
+        if self.raw and ident != self.ident: # No DGRAM o kernel já filtra pelo identificador
+            return None
+        return seq
+
+    def send(self, seq):
+        self.sock.sendto(self._packet(seq), (self.ip, 0))
+
+    def receive(self, timeout):
+        """
+        Espera um pacote por até `timeout` s; retorna None se nada chegou ou
+        (seq, origem, instante), com seq None para pacotes que não são respostas nossas.
+        """
+        self.sock.settimeout(max(timeout, 0.0001))
+        try:
+            data, addr = self.sock.recvfrom(2048)
+        except (socket.timeout, BlockingIOError):
+            return None
+        return self._parse(data), addr[0].split("%")[0], time.perf_counter()
+
+    def probe(self, seq):
+        """Uma requisição de eco; retorna o RTT em segundos ou None se não houve resposta."""
+        sent = time.perf_counter()
+        self.send(seq)
+        deadline = sent + self.timeout
+        while (remaining := deadline - time.perf_counter()) > 0:
+            reply = self.receive(remaining)
+            if reply is None:
+                break
+            reply_seq, source, received = reply
+            if reply_seq == seq & 0xFFFF and source == self.ip:
+                return received - sent
+        return None
+
+    def close(self):
+        self.sock.close()
+
+class TcpProber:
+    """Mede o tempo de um connect() TCP; RST (porta fechada) também conta como resposta."""
+
+    method = "tcp"
+
+    def __init__(self, ip, family, timeout, port=443):
+        self.ip = ip
+        self.family = family
+        self.timeout = timeout
+        self.port = port
+
+    def probe(self, seq):
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        start = time.perf_counter()
+        try:
+            sock.connect((self.ip, self.port))
+        except ConnectionRefusedError:
+            pass
+        except OSError:
+            return None
+        finally:
+            sock.close()
+        return time.perf_counter() - start
+
+    def close(self):
+        pass
+
+class UdpProber:
+    """Envia um datagrama para uma porta alta e espera o ICMP "port unreachable" (ou uma resposta)."""
+
+    method = "udp"
+
+    def __init__(self, ip, family, timeout, port=UDP_PROBE_PORT):
+        self.ip = ip
+        self.family = family
+        self.timeout = timeout
+        self.port = port
+
+    def probe(self, seq):
+        sock = socket.socket(self.family, socket.SOCK_DGRAM)
+        sock.settimeout(self.timeout)
+        start = time.perf_counter()
+        try:
+            # Socket conectado: o kernel entrega o ICMP de erro como ConnectionRefusedError
+            sock.connect((self.ip, self.port))
+            sock.send(struct.pack("!H", seq & 0xFFFF))
+            sock.recv(512)
+        except ConnectionRefusedError:
+            pass
+        except OSError:
+            return None
+        finally:
+            sock.close()
+        return time.perf_counter() - start
+
+    def close(self):
+        pass
+
+PROBERS = {"icmp": IcmpProber, "tcp": TcpProber, "udp": UdpProber}
+LOOPBACK = {socket.AF_INET: "127.0.0.1", socket.AF_INET6: "::1"}
+
+def resolve(host):
+    """Resolve o host para (família, ip), pelo cache DNS compartilhado."""
+    return default_resolver.forward(host)
+
+def make_prober(ip, family, timeout=1.0, method="auto", port=None):
+    """
+    Cria o prober do método pedido. Em "auto", tenta ICMP e cai para TCP
+    quando o sistema não permite sockets ICMP.
+    """
+    if method == "auto":
+        try:
+            return IcmpProber(ip, family, timeout)
+        except OSError:
+            method = "tcp"
+    if method == "icmp":
+        return IcmpProber(ip, family, timeout)
+    prober = PROBERS[method]
+    return prober(ip, family, timeout) if port is None else prober(ip, family, timeout, port)
+
+def summarize(rtts_ms):
+    """Estatísticas de uma série de RTTs em ms (None = pacote perdido)."""
+    received = [r for r in rtts_ms if r is not None]
+    sent = len(rtts_ms)
+    stats = {
+        "sent": sent,
+        "received": len(received),
+        "loss_pct": 100.0 * (sent - len(received)) / sent if sent else 0.0,
+        "min_latency_ms": min(received) if received else None,
+        "max_latency_ms": max(received) if received else None,
+        "avg_latency_ms": sum(received) / len(received) if received else None,
+        "jitter_ms": None,
+    }
+    if len(received) > 1:
+        # Jitter como a média da variação entre respostas consecutivas
+        stats["jitter_ms"] = sum(abs(b - a) for a, b in zip(received, received[1:])) / (len(received) - 1)
+    return stats
+
+def _format_output(host, ip, method, rtts_ms, stats):
+    """Texto no estilo do comando ping, para exibição."""
+    lines = [f"PING {host} ({ip}) via {method.upper()}"]
+    for seq, rtt in enumerate(rtts_ms, 1):
+        lines.append(f"seq={seq} time={rtt:.2f} ms" if rtt is not None else f"seq={seq} sem resposta")
+    lines.append(f"--- {stats['sent']} enviados, {stats['received']} recebidos, {stats['loss_pct']:.0f}% de perda ---")
+    if stats["received"]:
+        jitter = f" jitter={stats['jitter_ms']:.2f} ms" if stats["jitter_ms"] is not None else ""
+        lines.append(f"rtt min/avg/max = {stats['min_latency_ms']:.2f}/{stats['avg_latency_ms']:.2f}/"
+                     f"{stats['max_latency_ms']:.2f} ms{jitter}")
+    return "\n".join(lines)
+
+def _ping_sistema(host, count):
+    """Caminho antigo: executa o comando ping do sistema e extrai min/avg/max da saída."""
     system = platform.system().lower()
     
     # Localizar o comando ping
@@ -82,4 +298,271 @@ def ping(host='8.8.8.8', count=4):
             "host": host,
             "count": count,
             "error": f"Erro inesperado: {str(e)}"
-        }
\ No newline at end of file
+        }
+
+def _stream(prober, host, ip, count, interval):
+    """Sonda com `prober` a cada `interval` s e fecha o socket ao terminar (ou se o consumidor parar)."""
+    seqs = itertools.count(1) if count is None else range(1, count + 1)
+    try:
+        for seq in seqs:
+            sent = time.perf_counter()
+            timestamp = time.time()
+            rtt = prober.probe(seq)
+            yield {
+                "seq": seq,
+                "host": host,
+                "ip": ip,
+                "method": prober.method,
+                "timestamp": timestamp,
+                "rtt_ms": rtt * 1000 if rtt is not None else None,
+            }
+            if count is None or seq < count:
+                # O tempo gasto pelo consumidor entre as respostas também conta no intervalo
+                time.sleep(max(0.0, interval - (time.perf_counter() - sent)))
+    finally:
+        prober.close()
+
+
+def ping_stream(host, count=None, interval=1.0, timeout=1.0, method="auto", port=None):
+    """
+    Gerador que entrega cada resposta de ping assim que ela chega.
+
+    Cada item é um dict com seq, host, ip, method, timestamp (epoch) e rtt_ms
+    (None para pacotes perdidos). Com `count=None` o ping é contínuo e só
+    termina quando o consumidor para de iterar. Erros de resolução
+    (socket.gaierror) e de socket (OSError) são propagados ao consumidor.
+    """
+    family, ip = resolve(host)
+    prober = make_prober(ip, family, timeout, method, port)
+    return _stream(prober, host, ip, count, interval)
+
+
+class RingBuffer:
+    """
+    Últimas `capacity` amostras de um ping contínuo em vetores NumPy de tamanho fixo.
+
+    A memória não cresce com a duração do ping: cada amostra nova sobrescreve
+    a mais antiga. RTTs perdidos são guardados como NaN.
+    """
+
+    def __init__(self, capacity=600):
+        self.capacity = capacity
+        self.timestamps = np.full(capacity, np.nan)
+        self.rtts_ms = np.full(capacity, np.nan)
+        self.total = 0 # Amostras recebidas desde o início, inclusive as já descartadas
+
+    def append(self, timestamp, rtt_ms):
+        i = self.total % self.capacity
+        self.timestamps[i] = timestamp
+        self.rtts_ms[i] = np.nan if rtt_ms is None else rtt_ms
+        self.total += 1
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def arrays(self):
+        """(timestamps, rtts_ms) da amostra mais antiga para a mais recente."""
+        if self.total <= self.capacity:
+            return self.timestamps[:self.total], self.rtts_ms[:self.total]
+        i = self.total % self.capacity
+        return (np.concatenate((self.timestamps[i:], self.timestamps[:i])),
+                np.concatenate((self.rtts_ms[i:], self.rtts_ms[:i])))
+
+    def stats(self):
+        """Estatísticas (como em `summarize`) das amostras que estão no buffer."""
+        _, rtts = self.arrays()
+        return summarize([None if np.isnan(r) else r for r in rtts.tolist()])
+
+
+def ping(host='8.8.8.8', count=4, interval=1.0, timeout=1.0, method="auto", port=None):
+    """
+    Mede a latência até `host` sem criar processos.
+
+    `method` pode ser "auto" (ICMP, com TCP como alternativa), "icmp", "tcp",
+    "udp" ou "sistema" (comando ping do sistema). `interval` é o tempo entre
+    o envio de pacotes consecutivos e pode ser menor que 1 s. Além de
+    min/avg/max, o resultado traz o RTT de cada pacote (`rtts_ms`, None para
+    perdidos), a perda e o jitter.
+    """
+    if method == "sistema":
+        return _ping_sistema(host, count)
+
+    try:
+        family, ip = resolve(host)
+        prober = make_prober(ip, family, timeout, method, port)
+    except (socket.gaierror, ValueError): # ValueError: nome malformado, ex: "a..b"
+        return {"success": False, "host": host, "count": count,
+                "error": f"Não foi possível resolver o host {host}."}
+    except (OSError, KeyError) as e:
+        return {"success": False, "host": host, "count": count, "error": f"Método de ping indisponível: {e}"}
+
+    rtts_ms = []
+    try:
+        for sample in _stream(prober, host, ip, count, interval):
+            rtts_ms.append(sample["rtt_ms"])
+    except OSError as e:
+        return {"success": False, "host": host, "count": count, "error": f"Erro ao enviar pacotes: {e}"}
+
+    stats = summarize(rtts_ms)
+    result = {
+        "success": stats["received"] > 0,
+        "host": host,
+        "ip": ip,
+        "count": count,
+        "method": prober.method,
+        "rtts_ms": rtts_ms,
+        "output": _format_output(host, ip, prober.method, rtts_ms, stats),
+        **stats,
+    }
+    if not result["success"]:
+        result["error"] = f"Nenhuma resposta de {host} ({ip}) via {prober.method.upper()}."
+    return result
+
+
+def _sweep_icmp(targets, rtts, count, interval, timeout):
+    """
+    Varredura ICMP com um único socket: a cada rodada envia um eco para todos os
+    hosts (envios intercalados) e casa as respostas pelo IP de origem e pela sequência.
+    """
+    by_ip = {}
+    for i, (family, ip) in targets:
+        by_ip.setdefault(ip, []).append(i)
+    family = targets[0][1][0]
+    prober = IcmpProber(targets[0][1][1], family, timeout)
+    sent = np.full(rtts.shape, np.nan)
+    try:
+        start = time.perf_counter()
+        end = start + (count - 1) * interval + timeout
+        for r in range(count):
+            for i, (_, ip) in targets:
+                prober.ip = ip
+                try:
+                    sent[i, r] = time.perf_counter()
+                    prober.send(r)
+                except OSError:
+                    sent[i, r] = np.nan # Buffer cheio ou rede inalcançável: conta como perda
+            round_end = start + (r + 1) * interval if r + 1 < count else end
+            while (remaining := round_end - time.perf_counter()) > 0:
+                reply = prober.receive(remaining)
+                if reply is None:
+                    break
+                seq, source, received = reply
+                if seq is None or seq >= count:
+                    continue
+                for i in by_ip.get(source, ()):
+                    elapsed = received - sent[i, seq]
+                    if np.isnan(rtts[i, seq]) and elapsed <= timeout:
+                        rtts[i, seq] = elapsed * 1000
+    finally:
+        prober.close()
+
+async def _probe_async(family, ip, method, port, timeout):
+    """Sondagem TCP ou UDP não bloqueante; retorna o RTT em ms ou NaN."""
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(family, socket.SOCK_STREAM if method == "tcp" else socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    start = time.perf_counter()
+    try:
+        if method == "tcp":
+            await asyncio.wait_for(loop.sock_connect(sock, (ip, port)), timeout)
+        else:
+            await loop.sock_connect(sock, (ip, port))
+            await loop.sock_sendall(sock, b"\0\0")
+            await asyncio.wait_for(loop.sock_recv(sock, 512), timeout)
+    except ConnectionRefusedError:
+        pass # RST ou ICMP port unreachable: o host respondeu
+    except (asyncio.TimeoutError, OSError):
+        return np.nan
+    finally:
+        sock.close()
+    return (time.perf_counter() - start) * 1000
+
+async def _sweep_async(targets, rtts, count, interval, timeout, method, port):
+    """Varredura TCP/UDP: todas as sondagens de uma rodada partem juntas no event loop."""
+    semaphore = asyncio.Semaphore(512) # Evita esgotar os descritores de arquivo
+
+    async def probe(i, r, family, ip):
+        async with semaphore:
+            rtts[i, r] = await _probe_async(family, ip, method, port, timeout)
+
+    start = time.perf_counter()
+    tasks = []
+    for r in range(count):
+        await asyncio.sleep(max(0.0, start + r * interval - time.perf_counter()))
+        tasks += [asyncio.create_task(probe(i, r, family, ip)) for i, (family, ip) in targets]
+    await asyncio.gather(*tasks)
+
+def sweep_stats(rtts_ms):
+    """
+    Estatísticas de todos os hosts de uma vez a partir da matriz hosts × pacotes (NaN = perdido).
+
+    Retorna vetores NumPy com uma posição por host.
+    """
+    received = ~np.isnan(rtts_ms)
+    count = rtts_ms.shape[1]
+    # Reordena cada linha deixando as respostas no início, na ordem original,
+    # para que np.diff compare apenas respostas consecutivas
+    order = np.argsort(~received, axis=1, kind="stable")
+    compact = np.take_along_axis(rtts_ms, order, axis=1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning) # Hosts sem nenhuma resposta geram NaN
+        p50, p95, p99 = np.nanpercentile(rtts_ms, [50, 95, 99], axis=1)
+        return {
+            "received": received.sum(axis=1),
+            "loss_pct": 100.0 * (1 - received.sum(axis=1) / count) if count else np.zeros(len(rtts_ms)),
+            "min_latency_ms": np.nanmin(rtts_ms, axis=1),
+            "avg_latency_ms": np.nanmean(rtts_ms, axis=1),
+            "max_latency_ms": np.nanmax(rtts_ms, axis=1),
+            "p50_ms": p50,
+            "p95_ms": p95,
+            "p99_ms": p99,
+            "jitter_ms": np.nanmean(np.abs(np.diff(compact, axis=1)), axis=1) if count > 1
+                         else np.full(len(rtts_ms), np.nan),
+        }
+
+def ping_sweep(hosts, count=3, interval=1.0, timeout=1.0, method="auto", port=None):
+    """
+    Mede a latência de muitos hosts ao mesmo tempo, no estilo do fping.
+
+    Todos os hosts recebem a rodada r de pacotes antes da rodada r+1. Os RTTs
+    ficam em uma matriz NumPy hosts × pacotes (`rtts_ms`, NaN para perdidos) e
+    as estatísticas são calculadas vetorizadas por sweep_stats.
+    """
+    hosts = list(hosts)
+    rtts = np.full((len(hosts), count), np.nan)
+    resolved = default_resolver.forward_many(hosts) # Em paralelo; None = não resolvido
+    targets = [(i, address) for i, address in enumerate(resolved) if address is not None]
+
+    # O método é escolhido por família: sem privilégio, o sistema pode permitir
+    # sockets ICMP e não ICMPv6 (ou o contrário); em "auto" a família sem ICMP cai para TCP
+    methods = {}
+    for family in sorted({address[0] for _, address in targets} or {socket.AF_INET}):
+        methods[family] = method
+        if method == "auto":
+            try:
+                IcmpProber(LOOPBACK[family], family, timeout).close()
+                methods[family] = "icmp"
+            except OSError:
+                methods[family] = "tcp"
+
+    others = []
+    for family, family_method in methods.items():
+        family_targets = [t for t in targets if t[1][0] == family]
+        if family_method == "icmp":
+            if family_targets:
+                _sweep_icmp(family_targets, rtts, count, interval, timeout) # Um socket por família
+        else:
+            others += family_targets
+    if others:
+        # Em "auto" as famílias sem ICMP usam TCP; senão é o método pedido, o mesmo para todas
+        other_method = "tcp" if method == "auto" else method
+        default_port = 443 if other_method == "tcp" else UDP_PROBE_PORT
+        asyncio.run(_sweep_async(others, rtts, count, interval, timeout, other_method, port or default_port))
+
+    return {
+        "hosts": hosts,
+        "ips": [address[1] if address else None for address in resolved],
+        "method": "+".join(dict.fromkeys(methods.values())),
+        "rtts_ms": rtts,
+        **sweep_stats(rtts),
+    }
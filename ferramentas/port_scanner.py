@@ -1,6 +1,20 @@
 # ferramentas/port_scanner_module.py
 import streamlit as st
+import pandas as pd
 import socket
+import asyncio
+import ipaddress
+import itertools
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import NamedTuple, Optional
+from ferramentas.live_ui import LiveTable, ThrottledProgress
+from ferramentas.resolver import default_resolver
+from ferramentas.scan_history import ScanHistory
+from ferramentas.service_detection import format_banner, grab_banner, lookup_service, match_banner
 
 def scan_port(target_host, port, timeout=1):
     """Tenta conectar a uma porta específica e retorna se está aberta."""
@@ -18,26 +32,535 @@ def scan_port(target_host, port, timeout=1):
     except socket.error:
         return False # Other socket errors
 
+# Nomes amigáveis que têm prioridade sobre a tabela de serviços do sistema
+COMMON_SERVICES = {
+    20: "FTP (Data)", 21: "FTP (Control)", 22: "SSH", 23: "Telnet",
+    25: "SMTP", 53: "DNS", 67: "DHCP (Server)", 68: "DHCP (Client)",
+    80: "HTTP", 110: "POP3", 139: "NetBIOS Session Service", 143: "IMAP",
+    443: "HTTPS", 3389: "RDP", 8080: "HTTP Proxy/Alt HTTP"
+}
+
+# Capturas de banner simultâneas por shard, além das sondagens
+BANNER_CONCURRENCY = 32
+
+class _RateLimiter:
+    """Limita quantas conexões são iniciadas por segundo (token bucket assíncrono)."""
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = 0.0
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        # Reserva o próximo horário livre antes de dormir, assim as tarefas
+        # concorrentes recebem horários distintos sem precisar de lock
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+class TimingProfile(NamedTuple):
+    """Parâmetros de temporização do motor concorrente (inspirados nos perfis -T0..-T5 do nmap)."""
+    initial_timeout: float # Timeout usado antes de existir alguma medida de RTT
+    min_timeout: float
+    max_timeout: float
+    max_retries: int
+    concurrency: int
+    rate: float # Conexões por segundo por host (0 = sem limite)
+
+TIMING_PROFILES = {
+    "paranoid": TimingProfile(5.0, 1.0, 10.0, 5, 1, 0.2),
+    "sneaky": TimingProfile(5.0, 1.0, 10.0, 5, 1, 1),
+    "polite": TimingProfile(1.0, 0.1, 10.0, 3, 16, 10),
+    "normal": TimingProfile(1.0, 0.1, 10.0, 3, 256, 0),
+    "aggressive": TimingProfile(0.5, 0.1, 1.25, 2, 512, 0),
+    "insane": TimingProfile(0.25, 0.05, 0.3, 1, 1000, 0),
+}
+
+class RttEstimator:
+    """
+    Estima o RTT de um host como o TCP (RFC 6298) e deriva dele o timeout e as retransmissões.
+
+    As amostras vêm das sondagens respondidas (SYN/ACK ou RST). Antes da
+    primeira amostra vale o timeout inicial do perfil.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.srtt = None
+        self.rttvar = None
+        self.recovered = False # Alguma porta só respondeu depois de retransmitida
+
+    def update(self, sample):
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - sample)
+            self.srtt = 0.875 * self.srtt + 0.125 * sample
+
+    @property
+    def timeout(self):
+        if self.srtt is None:
+            return self.profile.initial_timeout
+        rto = self.srtt + 4 * self.rttvar
+        return min(self.profile.max_timeout, max(self.profile.min_timeout, rto))
+
+    @property
+    def retries(self):
+        # Enquanto nenhuma retransmissão se mostrou útil, o host provavelmente
+        # não perde pacotes: uma única nova tentativa basta para portas filtradas
+        return self.profile.max_retries if self.recovered else min(1, self.profile.max_retries)
+
+async def _probe_port(loop, family, ip_address, port, timeout):
+    """
+    Versão não bloqueante de scan_port: um connect() no event loop.
+
+    Retorna (estado, rtt) com estado "open", "closed" ou "filtered"; o rtt só
+    é informado quando o host respondeu (conexão aceita ou recusada).
+    """
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    start = loop.time()
+    try:
+        await asyncio.wait_for(loop.sock_connect(sock, (ip_address, port)), timeout)
+        return "open", loop.time() - start
+    except ConnectionRefusedError:
+        return "closed", loop.time() - start
+    except asyncio.TimeoutError:
+        return "filtered", None
+    except OSError:
+        return "closed", None # Rede/host inalcançável: não adianta retransmitir
+    finally:
+        sock.close()
+
+async def _probe_with_retries(loop, family, ip_address, port, rtt, limiter):
+    """Sonda a porta retransmitindo com backoff exponencial sobre o timeout estimado."""
+    for attempt in range(rtt.retries + 1):
+        if attempt:
+            await limiter.acquire()
+        timeout = min(rtt.profile.max_timeout, rtt.timeout * 2 ** attempt)
+        status, elapsed = await _probe_port(loop, family, ip_address, port, timeout)
+        if status != "filtered":
+            if elapsed is not None:
+                rtt.update(elapsed)
+            if attempt:
+                rtt.recovered = True
+            return status == "open"
+    return False
+
+class ScanResult(NamedTuple):
+    """Resultado de uma sondagem. `is_open` é None quando o host não pôde ser resolvido."""
+    host: str
+    ip: Optional[str]
+    port: Optional[int]
+    is_open: Optional[bool]
+    service: Optional[str] = None # Preenchido só para portas abertas
+    banner: Optional[str] = None
+
+def _expand_token(token):
+    """Expande um único alvo: IP, hostname, CIDR (10.0.0.0/24) ou faixa (10.0.0.1-50)."""
+    if "/" in token:
+        network = ipaddress.ip_network(token, strict=False)
+        if network.num_addresses == 1:
+            yield str(network.network_address)
+        else:
+            yield from (str(ip) for ip in network.hosts())
+        return
+
+    if "-" in token:
+        first, _, last = token.partition("-")
+        try:
+            start = ipaddress.ip_address(first)
+        except ValueError:
+            start = None # Hostname com hífen, ex: meu-servidor.local
+        if start is not None:
+            if last.isdigit() and start.version == 4:
+                # Forma curta: só o último octeto, ex: 10.0.0.1-50
+                last = first.rsplit(".", 1)[0] + "." + last
+            end = ipaddress.ip_address(last)
+            if end.version != start.version or end < start:
+                raise ValueError(f"Faixa de IPs inválida: {token}")
+            for value in range(int(start), int(end) + 1):
+                yield str(type(start)(value)) # ip_address(int) transformaria ::1-::3 em IPv4
+            return
+
+    yield token
+
+def expand_targets(lines):
+    """
+    Expande sob demanda uma lista de alvos (linhas de texto ou arquivo enviado).
+
+    Cada linha pode ter vários alvos separados por espaço ou vírgula; o que
+    vem depois de '#' é ignorado. Nenhuma faixa é materializada em memória.
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="ignore")
+        for token in line.split("#", 1)[0].replace(",", " ").split():
+            yield from _expand_token(token)
+
+class _ScanStopped(Exception):
+    """Sinaliza às shards que o consumidor dos resultados desistiu."""
+
+class _SharedIterator:
+    """Iterador protegido por lock, compartilhado entre as threads do pool."""
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self._lock = threading.Lock()
+
+    def __next__(self):
+        with self._lock:
+            return next(self._iterator)
+
+class _HostState:
+    """Estado de um host dentro da janela de uma shard."""
+
+    def __init__(self, host, ports, profile):
+        self.host = host
+        self.ports = iter(ports(host) if callable(ports) else ports)
+        self.limiter = _RateLimiter(profile.rate)
+        self.rtt = RttEstimator(profile)
+        self.address = asyncio.ensure_future(_resolve(host))
+        self.failed = False
+
+async def _resolve(host):
+    """Resolve o host sem bloquear o event loop, pelo cache DNS compartilhado; retorna (família, ip)."""
+    return await default_resolver.forward_async(host)
+
+async def _scan_shard(hosts, ports, profile, concurrency, window, emit, grab_banners=False):
+    """
+    Processa a parte dos alvos que cabe a uma shard.
+
+    Mantém até `window` hosts ativos e distribui as portas entre eles em
+    rodízio, de forma que um host lento (portas filtradas) ocupa no máximo
+    sua fração das conexões e não atrasa os demais. Com `grab_banners`, cada
+    porta aberta ganha uma tarefa de captura de banner que roda em paralelo
+    com as sondagens seguintes.
+    """
+    loop = asyncio.get_running_loop()
+    active = deque()
+    hosts_done = False
+    banner_slots = asyncio.Semaphore(BANNER_CONCURRENCY)
+    banner_tasks = set()
+
+    async def identify(state, family, ip_address, port):
+        async with banner_slots:
+            raw = await grab_banner(family, ip_address, port, state.rtt.timeout * 2)
+        service = match_banner(raw) or get_common_service(port)
+        emit(ScanResult(state.host, ip_address, port, True, service, format_banner(raw) or None))
+
+    def next_job():
+        nonlocal hosts_done
+        while True:
+            while len(active) < window and not hosts_done:
+                try:
+                    active.append(_HostState(next(hosts), ports, profile))
+                except StopIteration:
+                    hosts_done = True
+            if not active:
+                return None
+            state = active.popleft()
+            if state.failed:
+                continue
+            port = next(state.ports, None)
+            if port is None:
+                continue
+            active.append(state)
+            return state, port
+
+    async def worker():
+        while (job := next_job()) is not None:
+            state, port = job
+            try:
+                family, ip_address = await state.address
+            except OSError:
+                if not state.failed:
+                    state.failed = True
+                    emit(ScanResult(state.host, None, None, None))
+                continue
+            await state.limiter.acquire()
+            is_open = await _probe_with_retries(loop, family, ip_address, port, state.rtt, state.limiter)
+            if is_open and grab_banners:
+                task = asyncio.create_task(identify(state, family, ip_address, port))
+                banner_tasks.add(task)
+                task.add_done_callback(banner_tasks.discard)
+            else:
+                emit(ScanResult(state.host, ip_address, port, is_open,
+                                get_common_service(port) if is_open else None))
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+        await asyncio.gather(*workers)
+        while banner_tasks:
+            await asyncio.gather(*banner_tasks)
+    finally:
+        for task in workers + list(banner_tasks):
+            task.cancel()
+        for state in active:
+            state.address.cancel()
+
+def _resolve_profile(profile, timeout, concurrency, rate):
+    """Aplica ao perfil de temporização os valores informados explicitamente."""
+    if isinstance(profile, str):
+        profile = TIMING_PROFILES[profile]
+    if timeout is not None:
+        profile = profile._replace(initial_timeout=timeout, max_timeout=max(profile.max_timeout, timeout))
+    if concurrency is not None:
+        profile = profile._replace(concurrency=concurrency)
+    if rate is not None:
+        profile = profile._replace(rate=rate)
+    return profile
+
+def scan_targets(hosts, ports, timeout=None, concurrency=None, rate=None, shards=4, window=16, profile="normal",
+                 grab_banners=False):
+    """
+    Escaneia as `ports` de vários hosts, gerando ScanResult conforme as respostas chegam.
+
+    `hosts` pode ser qualquer iterável (inclusive o gerador de expand_targets) e
+    é consumido aos poucos. O trabalho é dividido entre `shards` threads, cada
+    uma com seu próprio event loop e uma fatia de `concurrency`; `rate` limita
+    as conexões por segundo de cada host. `ports` precisa ser reiterável (range, lista)
+    ou uma função que recebe o host e devolve as portas daquele host.
+
+    `profile` é um nome de TIMING_PROFILES ou um TimingProfile; `timeout` (inicial),
+    `concurrency` e `rate` sobrescrevem os valores do perfil quando informados.
+    Depois das primeiras respostas, o timeout de cada host passa a ser derivado do RTT medido.
+
+    Com `grab_banners`, o banner das portas abertas é capturado durante o
+    escaneamento e usado para identificar o serviço.
+    """
+    profile = _resolve_profile(profile, timeout, concurrency, rate)
+    results = queue.Queue()
+    stop = threading.Event()
+    shared_hosts = _SharedIterator(hosts)
+    per_shard = max(1, -(-profile.concurrency // shards))
+
+    def emit(result):
+        if stop.is_set():
+            raise _ScanStopped()
+        results.put(result)
+
+    def run_shard():
+        asyncio.run(_scan_shard(shared_hosts, ports, profile, per_shard, window, emit, grab_banners))
+
+    executor = ThreadPoolExecutor(max_workers=shards, thread_name_prefix="port-scan")
+    futures = [executor.submit(run_shard) for _ in range(shards)]
+    executor.shutdown(wait=False)
+    try:
+        pending = len(futures)
+        for future in futures:
+            future.add_done_callback(results.put)
+        while pending:
+            item = results.get()
+            if isinstance(item, Future):
+                pending -= 1
+                if item.exception() is not None:
+                    raise item.exception()
+            else:
+                yield item
+    finally:
+        stop.set()
+
+def scan_ports(ip_address, ports, timeout=None, concurrency=None, rate=None, profile="normal"):
+    """
+    Escaneia várias portas de um único host mantendo até `concurrency` conexões em andamento.
+
+    `rate` limita as conexões iniciadas por segundo contra o host (0 = sem limite).
+    Gera tuplas (porta, aberta) na ordem em que as respostas chegam.
+    """
+    for result in scan_targets([ip_address], ports, timeout, concurrency, rate, shards=1, window=1, profile=profile):
+        if result.port is None:
+            raise socket.gaierror(f"Não foi possível resolver {ip_address}")
+        yield result.port, result.is_open
+
 def get_common_service(port):
     """Retorna um nome de serviço comum para a porta."""
-    services = {
-        20: "FTP (Data)", 21: "FTP (Control)", 22: "SSH", 23: "Telnet",
-        25: "SMTP", 53: "DNS", 67: "DHCP (Server)", 68: "DHCP (Client)",
-        80: "HTTP", 110: "POP3", 139: "NetBIOS Session Service", 143: "IMAP",
-        443: "HTTPS", 3389: "RDP", 8080: "HTTP Proxy/Alt HTTP"
-    }
-    return services.get(port, "Serviço Desconhecido")
+    return COMMON_SERVICES.get(port) or lookup_service(port) or "Serviço Desconhecido"
+
+# Quantos resultados acumular antes de gravar no histórico
+HISTORY_BATCH = 500
+
+_history = None
+_history_lock = threading.Lock()
+
+def _get_history():
+    """Histórico de escaneamentos do processo, compartilhado por todas as sessões."""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = ScanHistory()
+        return _history
+
+def _ports_plan(history, ports_to_scan, sample, ip_address):
+    """
+    Portas de um reescaneamento incremental de `ip_address`.
+
+    O histórico é indexado pelo IP nos dois modos (alvo único e vários), mesmo
+    quando o alvo é um domínio.
+    """
+    if not history.has_history(ip_address):
+        return ports_to_scan # Sem histórico não há o que comparar: escaneamento completo
+    return history.rescan_plan(ip_address, ports_to_scan, sample)
+
+def _rescan_plans(lines, history, ports_to_scan, sample, batch=256):
+    """
+    Plano de cada alvo da lista, calculado uma única vez e reaproveitado no escaneamento.
+
+    Retorna ({alvo: portas}, número de alvos, total de sondagens). Os alvos são
+    resolvidos em lotes pelo cache DNS compartilhado (o escaneamento
+    reaproveita as respostas); alvos que não resolvem ficam sem portas.
+    """
+    plans = {}
+    total_hosts = total = 0
+    hosts = expand_targets(lines)
+    while chunk := list(itertools.islice(hosts, batch)):
+        new = [host for host in dict.fromkeys(chunk) if host not in plans]
+        for host, address in zip(new, default_resolver.forward_many(new)):
+            plans[host] = _ports_plan(history, ports_to_scan, sample, address[1]) if address else ()
+        total_hosts += len(chunk)
+        total += sum(len(plans[host]) for host in chunk)
+    return plans, total_hosts, total
+
+class _HistoryWriter:
+    """Acumula resultados e grava no histórico em lotes, juntando as mudanças encontradas."""
+
+    def __init__(self, history):
+        self.history = history
+        self.pending = []
+        self.changes = []
+
+    def add(self, result):
+        if result.port is None:
+            return
+        self.pending.append(result._replace(host=result.ip)) # O histórico é indexado pelo IP
+        if len(self.pending) >= HISTORY_BATCH:
+            self.flush()
+
+    def flush(self):
+        self.changes += self.history.record(self.pending)
+        self.pending = []
+
+def _report_changes(changes):
+    """Mostra as portas que abriram ou fecharam desde o escaneamento anterior."""
+    opened = sorted((host, port) for host, port, old, new in changes if old == "closed" and new == "open")
+    closed = sorted((host, port) for host, port, old, new in changes if old == "open" and new == "closed")
+    discovered = sum(1 for _, _, old, _ in changes if old is None)
+    if opened:
+        st.warning("🆕 Portas que abriram desde o último escaneamento: "
+                   + ", ".join(f"{host}:{port}" for host, port in opened))
+    if closed:
+        st.info("🔒 Portas que fecharam desde o último escaneamento: "
+                + ", ".join(f"{host}:{port}" for host, port in closed))
+    if not opened and not closed:
+        st.caption("Nenhuma mudança em relação ao histórico.")
+    if discovered:
+        st.caption(f"{discovered} porta(s) aberta(s) registrada(s) pela primeira vez no histórico.")
+
+def _render_history(history, host=None):
+    """Tabela com as mudanças de estado mais recentes registradas no histórico."""
+    events = history.events(host)
+    with st.expander("📜 Histórico de mudanças"):
+        if not events:
+            st.write("Nenhuma mudança registrada ainda.")
+            return
+        st.dataframe(pd.DataFrame([
+            {"Data": datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"), "Host": h, "Porta": port,
+             "De": old or "-", "Para": new}
+            for h, port, old, new, ts in events
+        ]), use_container_width=True)
+
+def _scan_multiple(lines, ports_to_scan, timeout, concurrency, rate, shards, profile, grab_banners,
+                   history, rescan, sample):
+    """Escaneia vários alvos e atualiza uma tabela por host conforme os resultados chegam."""
+    if rescan:
+        plans, total_hosts, total = _rescan_plans(lines, history, ports_to_scan, sample)
+        ports = plans.__getitem__
+    else:
+        total_hosts = sum(1 for _ in expand_targets(lines))
+        total = total_hosts * len(ports_to_scan)
+        ports = ports_to_scan
+    if not total_hosts:
+        st.warning("Nenhum alvo informado.")
+        return
+    st.info(f"Escaneando {total_hosts} host(s) nas portas {ports_to_scan.start}-{ports_to_scan.stop - 1} "
+            f"({total} sondagens)...")
+    writer = _HistoryWriter(history)
+
+    progress = ThrottledProgress(total, show_status=False)
+    rows = {}
+    table = LiveTable(rows, formatter=lambda row: {
+        "Host": row["host"], "IP": row["ip"] or "não resolvido", "Verificadas": row["checked"],
+        "Portas abertas": ", ".join(f"{p} ({service})" for p, service in sorted(row["open"])) or "-",
+    })
+
+    results = scan_targets(expand_targets(lines), ports, timeout, concurrency, rate, shards,
+                           profile=profile, grab_banners=grab_banners)
+    for result in results:
+        writer.add(result)
+        row = rows.setdefault(result.host, {"host": result.host, "ip": result.ip, "checked": 0, "open": []})
+        if result.port is not None: # Host não resolvido: nenhuma porta será verificada
+            row["checked"] += 1
+            if result.is_open:
+                row["open"].append((result.port, result.service))
+            progress.update()
+        table.touch()
+
+    progress.finish()
+    table.flush()
+    writer.flush()
+    hosts_with_open = sum(1 for row in rows.values() if row["open"])
+    st.success(f"Escaneamento concluído! {hosts_with_open} host(s) com portas abertas.")
+    _report_changes(writer.changes)
 
 def port_scanner():
     st.title("🛡️ Verificador de Portas")
     st.write("Verifique quais portas estão abertas em um host.")
 
-    target = st.text_input("Digite o IP ou Domínio do alvo", "scanme.nmap.org")
+    target_mode = st.radio("Alvos", ["Único", "Vários"], horizontal=True,
+                           help="Vários alvos aceitam CIDR (192.168.0.0/24), faixas (10.0.0.1-50) e listas de hosts.")
+    if target_mode == "Único":
+        target = st.text_input("Digite o IP ou Domínio do alvo", "scanme.nmap.org")
+    else:
+        targets_text = st.text_area("Alvos (um ou mais por linha)", "127.0.0.1\n192.168.0.0/30")
+        uploaded = st.file_uploader("Ou envie uma lista de hosts", type=["txt", "csv"])
     
     col1, col2 = st.columns(2)
     start_port = col1.number_input("Porta Inicial", min_value=1, max_value=65535, value=1)
     end_port = col2.number_input("Porta Final", min_value=1, max_value=65535, value=100)
 
+    engine = st.radio("Modo de escaneamento", ["Concorrente", "Sequencial"], horizontal=True,
+                      help="O modo sequencial testa uma porta por vez com scan_port.")
+    profile_name = st.select_slider("Perfil de temporização", options=list(TIMING_PROFILES), value="normal",
+                                    disabled=engine == "Sequencial",
+                                    help="No modo concorrente o timeout de cada host é ajustado pelo RTT medido; "
+                                         "o perfil define os limites, as retransmissões e os valores iniciais abaixo.")
+    profile = TIMING_PROFILES[profile_name]
+    col3, col4, col5, col6 = st.columns(4)
+    timeout = col3.number_input("Timeout inicial (s)", min_value=0.05, max_value=10.0,
+                                value=profile.initial_timeout, step=0.05)
+    concurrency = col4.number_input("Conexões simultâneas", min_value=1, max_value=1000, value=profile.concurrency,
+                                    disabled=engine == "Sequencial")
+    rate = col5.number_input("Limite por host (conexões/s, 0 = sem limite)", min_value=0.0, max_value=100000.0,
+                             value=float(profile.rate), disabled=engine == "Sequencial")
+    shards = col6.number_input("Threads (vários alvos)", min_value=1, max_value=32, value=4,
+                               disabled=engine == "Sequencial" or target_mode == "Único")
+    grab_banners = st.checkbox("Identificar serviços pelo banner", disabled=engine == "Sequencial",
+                               help="Lê o banner de cada porta aberta durante o escaneamento.")
+    col7, col8 = st.columns([2, 1])
+    rescan = col7.checkbox("Reescanear só as mudanças",
+                           help="Usa o histórico: sonda primeiro as portas vistas abertas e depois uma amostra "
+                                "priorizada das demais, informando o que abriu ou fechou.")
+    sample = col8.number_input("Amostra das demais portas", min_value=0, max_value=65535, value=100,
+                               disabled=not rescan)
+
+    history = _get_history()
+
     if st.button("Escanear Portas"):
         if start_port > end_port:
             st.error("A porta inicial não pode ser maior que a porta final.")
@@ -45,33 +568,71 @@ def port_scanner():
 
         ports_to_scan = range(start_port, end_port + 1)
         open_ports = []
+
+        if target_mode == "Vários":
+            lines = targets_text.splitlines()
+            if uploaded is not None:
+                lines += uploaded.getvalue().decode("utf-8", errors="ignore").splitlines()
+            if engine == "Sequencial":
+                concurrency, shards = 1, 1
+            try:
+                _scan_multiple(lines, ports_to_scan, timeout, int(concurrency), rate, int(shards), profile,
+                               grab_banners, history, rescan, int(sample))
+            except ValueError as e:
+                st.error(f"Alvo inválido: {e}")
+            except Exception as e:
+                st.error(f"Ocorreu um erro durante o escaneamento: {e}")
+            st.caption(default_resolver.summary())
+            _render_history(history)
+            return
         
+        ip_address = None
         try:
             # Resolva o hostname para IP uma única vez
-            ip_address = socket.gethostbyname(target)
+            ip_address = default_resolver.forward(target, socket.AF_INET)[1]
             st.info(f"Escaneando {target} ({ip_address}) nas portas {start_port}-{end_port}...")
 
-            progress_bar = st.progress(0)
-            status_text = st.empty()
+            ports = ports_to_scan
+            if rescan:
+                ports = _ports_plan(history, ports_to_scan, int(sample), ip_address)
+                st.caption(f"Reescaneamento incremental: {len(ports)} de {len(ports_to_scan)} portas.")
+            writer = _HistoryWriter(history)
+            progress = ThrottledProgress(len(ports))
 
-            for i, port in enumerate(ports_to_scan):
-                status_text.text(f"Escaneando porta {port}...")
-                is_open = scan_port(ip_address, port)
-                if is_open:
-                    open_ports.append((port, get_common_service(port)))
-                
-                progress_bar.progress((i + 1) / len(ports_to_scan))
+            if engine == "Sequencial":
+                results = (ScanResult(ip_address, ip_address, port, is_open,
+                                      get_common_service(port) if is_open else None)
+                           for port in ports
+                           for is_open in [scan_port(ip_address, port, timeout)])
+            else:
+                results = scan_targets([ip_address], ports, timeout, int(concurrency), rate, shards=1,
+                                       window=1, profile=profile, grab_banners=grab_banners)
+
+            for i, result in enumerate(results):
+                writer.add(result)
+                if result.is_open:
+                    open_ports.append((result.port, result.service, result.banner))
+                progress.update(i + 1, f"Porta {result.port} verificada...")
+
+            progress.finish(f"{len(ports)} portas verificadas.")
+            writer.flush()
+            open_ports.sort() # No modo concorrente as respostas chegam fora de ordem
 
             st.success("Escaneamento concluído!")
+            _report_changes(writer.changes)
 
             if open_ports:
                 st.subheader("Portas Abertas Encontradas:")
-                for port, service in open_ports:
-                    st.write(f"🟢 Porta {port}: {service}")
+                for port, service, banner in open_ports:
+                    st.write(f"🟢 Porta {port}: {service}" + (f" — `{banner}`" if banner else ""))
             else:
                 st.info("Nenhuma porta aberta encontrada no intervalo especificado.")
 
         except socket.gaierror:
             st.error(f"Não foi possível resolver o hostname: {target}. Verifique se o nome está correto.")
+            return
         except Exception as e:
-            st.error(f"Ocorreu um erro durante o escaneamento: {e}")
\ No newline at end of file
+            st.error(f"Ocorreu um erro durante o escaneamento: {e}")
+
+        st.caption(default_resolver.summary())
+        _render_history(history, ip_address)
\ No newline at end of file
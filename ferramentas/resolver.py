@@ -0,0 +1,142 @@
+# ferramentas/resolver.py
+import asyncio
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Erros de "o nome não existe": são respostas definitivas e também vão para o
+# cache. Falhas temporárias (ex: servidor DNS fora do ar) não são guardadas
+_NEGATIVE_ERRORS = {socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)}
+
+class Resolver:
+    """
+    Resolução direta (nome → IP) e reversa (IP → nome) compartilhada pelas ferramentas.
+
+    As consultas rodam em paralelo num pool de threads e as respostas,
+    positivas e negativas, ficam num cache LRU com validade: `ttl` s para
+    as positivas e `negative_ttl` s para as negativas (a API de sockets não
+    expõe o TTL dos registros DNS). Pedidos repetidos enquanto a consulta
+    ainda está em andamento aguardam a mesma consulta.
+    """
+
+    def __init__(self, max_entries=4096, ttl=300.0, negative_ttl=60.0, workers=32):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._cache = OrderedDict() # chave -> (expira em, valor); valor None = resposta negativa
+        self._pending = {} # chave -> Future das consultas em andamento
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="resolver")
+        self.hits = 0 # Respondidos pelo cache (ou por uma consulta que já estava em andamento)
+        self.misses = 0 # Consultas feitas ao sistema
+
+    def _submit(self, key, query):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    future = Future()
+                    future.set_result(entry[1])
+                    return future
+                del self._cache[key]
+            future = self._pending.get(key)
+            if future is not None:
+                self.hits += 1
+                return future
+            self.misses += 1
+            future = self._pending[key] = self._pool.submit(self._query, key, query)
+            return future
+
+    def _query(self, key, query):
+        try:
+            try:
+                value, ttl = query(), self.ttl
+            except socket.herror:
+                value, ttl = None, self.negative_ttl
+            except socket.gaierror as e:
+                if e.errno not in _NEGATIVE_ERRORS:
+                    raise
+                value, ttl = None, self.negative_ttl
+            except ValueError:
+                # Nome malformado ("a..b", rótulo com mais de 63 caracteres): o
+                # getaddrinfo levanta UnicodeError; é um nome que não existe
+                value, ttl = None, self.negative_ttl
+            with self._lock:
+                self._cache[key] = (time.monotonic() + ttl, value)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+            return value
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def submit_forward(self, host, family=socket.AF_UNSPEC):
+        """Future com (família, ip) do host, ou None se o nome não existe."""
+        host = host.strip().lower().rstrip(".")
+
+        def query():
+            info = socket.getaddrinfo(host, None, family, socket.SOCK_STREAM)
+            return info[0][0], info[0][4][0]
+
+        return self._submit(("A", family, host), query)
+
+    def submit_reverse(self, ip):
+        """Future com o nome (registro PTR) do IP, ou None se não houver."""
+        return self._submit(("PTR", ip), lambda: socket.gethostbyaddr(ip)[0])
+
+    def forward(self, host, family=socket.AF_UNSPEC):
+        """(família, ip) do host; levanta socket.gaierror se não resolver."""
+        return self._or_raise(self.submit_forward(host, family).result(), host)
+
+    async def forward_async(self, host, family=socket.AF_UNSPEC):
+        """Como `forward`, sem bloquear o event loop."""
+        return self._or_raise(await asyncio.wrap_future(self.submit_forward(host, family)), host)
+
+    @staticmethod
+    def _or_raise(result, host):
+        if result is None:
+            raise socket.gaierror(socket.EAI_NONAME, f"Não foi possível resolver {host}")
+        return result
+
+    def reverse(self, ip):
+        return self.submit_reverse(ip).result()
+
+    def forward_many(self, hosts, family=socket.AF_UNSPEC):
+        """Resolve todos os hosts ao mesmo tempo; lista de (família, ip) ou None, na ordem de `hosts`."""
+        futures = [self.submit_forward(host, family) for host in hosts]
+        return [self._result_or_none(future) for future in futures]
+
+    def reverse_many(self, ips):
+        """Nomes de todos os IPs ao mesmo tempo: dict ip → nome (None se não houver)."""
+        futures = {ip: self.submit_reverse(ip) for ip in set(ips)}
+        return {ip: self._result_or_none(future) for ip, future in futures.items()}
+
+    @staticmethod
+    def _result_or_none(future):
+        try:
+            return future.result()
+        except OSError:
+            return None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._cache),
+        }
+
+    def summary(self):
+        """Resumo do cache para exibir nas páginas."""
+        stats = self.stats()
+        return (f"Cache DNS: {stats['hit_rate']:.0%} de acertos ({stats['hits']} do cache, "
+                f"{stats['misses']} consultas ao DNS, {stats['entries']} nomes guardados)")
+
+# Instância única do processo: o cache vale para todas as páginas e sessões
+default_resolver = Resolver()
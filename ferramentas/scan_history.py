@@ -0,0 +1,149 @@
+# ferramentas/scan_history.py
+import random
+import sqlite3
+import threading
+import time
+
+from ferramentas.service_detection import known_ports
+
+class ScanHistory:
+    """
+    Histórico persistente do Verificador de Portas em SQLite.
+
+    `port_state` guarda o último estado conhecido de cada (host, porta, protocolo)
+    e `port_events` registra cada mudança de estado com data e hora, formando
+    o histórico consultável.
+    """
+
+    def __init__(self, path="scan_history.db"):
+        # check_same_thread=False: as shards do escaneamento consultam o histórico
+        # das suas threads; o lock serializa o acesso à conexão
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS port_state (
+                    host TEXT,
+                    port INTEGER,
+                    protocol TEXT,
+                    state TEXT,
+                    service TEXT,
+                    banner TEXT,
+                    first_seen REAL,
+                    last_seen REAL,
+                    last_change REAL,
+                    PRIMARY KEY (host, port, protocol)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS port_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    host TEXT,
+                    port INTEGER,
+                    protocol TEXT,
+                    old_state TEXT,
+                    new_state TEXT,
+                    timestamp REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_port_events_host ON port_events (host, timestamp);
+            """)
+
+    def record(self, results, protocol="tcp"):
+        """
+        Grava um lote de ScanResult e retorna as mudanças encontradas.
+
+        Cada mudança é uma tupla (host, porta, estado_anterior, estado_novo), com
+        estado_anterior None para portas que o host ainda não tinha no histórico.
+        """
+        now = time.time()
+        results = [r for r in results if r.port is not None]
+        if not results:
+            return []
+        changes = []
+        with self.lock, self.conn:
+            previous = {}
+            for host in {r.host for r in results}:
+                ports = [r.port for r in results if r.host == host]
+                for i in range(0, len(ports), 500): # Limite de parâmetros do SQLite
+                    chunk = ports[i:i + 500]
+                    rows = self.conn.execute(
+                        f"SELECT port, state FROM port_state WHERE host = ? AND protocol = ? "
+                        f"AND port IN ({','.join('?' * len(chunk))})",
+                        [host, protocol, *chunk],
+                    )
+                    previous.update(((host, port), state) for port, state in rows)
+
+            for r in results:
+                new_state = "open" if r.is_open else "closed"
+                old_state = previous.get((r.host, r.port))
+                if old_state != new_state and (old_state is not None or new_state == "open"):
+                    changes.append((r.host, r.port, old_state, new_state))
+
+            self.conn.executemany("""
+                INSERT INTO port_state (host, port, protocol, state, service, banner, first_seen, last_seen, last_change)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (host, port, protocol) DO UPDATE SET
+                    last_change = CASE WHEN state != excluded.state THEN excluded.last_change ELSE last_change END,
+                    state = excluded.state,
+                    service = COALESCE(excluded.service, service),
+                    banner = COALESCE(excluded.banner, banner),
+                    last_seen = excluded.last_seen
+            """, [(r.host, r.port, protocol, "open" if r.is_open else "closed", r.service, r.banner, now, now, now)
+                  for r in results])
+            self.conn.executemany(
+                "INSERT INTO port_events (host, port, protocol, old_state, new_state, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+                [(host, port, protocol, old, new, now) for host, port, old, new in changes],
+            )
+        return changes
+
+    def has_history(self, host, protocol="tcp"):
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM port_state WHERE host = ? AND protocol = ? LIMIT 1",
+                                    (host, protocol)).fetchone()
+        return row is not None
+
+    def rescan_plan(self, host, ports, sample=100, protocol="tcp"):
+        """
+        Ordem de sondagem de um reescaneamento incremental dentro de `ports`.
+
+        Primeiro as portas vistas abertas no último escaneamento, depois as que
+        já estiveram abertas em algum momento, as de serviços registrados e, por
+        fim, uma amostra aleatória das demais, limitando essa segunda parte a `sample` portas.
+        """
+        low, high = min(ports), max(ports)
+        with self.lock:
+            open_now = [p for (p,) in self.conn.execute(
+                "SELECT port FROM port_state WHERE host = ? AND protocol = ? AND state = 'open' "
+                "AND port BETWEEN ? AND ? ORDER BY port", (host, protocol, low, high))]
+            opened_before = [p for (p,) in self.conn.execute(
+                "SELECT DISTINCT port FROM port_events WHERE host = ? AND protocol = ? AND new_state = 'open' "
+                "AND port BETWEEN ? AND ? ORDER BY port", (host, protocol, low, high))]
+
+        plan = dict.fromkeys(open_now) # dict preserva a ordem e descarta repetidas
+        rest = {}
+        for port in opened_before + [p for p in known_ports() if low <= p <= high]:
+            if len(rest) >= sample:
+                break
+            if port not in plan:
+                rest[port] = None
+        # Completa a amostra sorteando no intervalo sem materializá-lo
+        candidates = range(low, high + 1)
+        target = min(sample, len(candidates) - len(plan))
+        attempts = 0
+        while len(rest) < target and attempts < sample * 10:
+            port = random.choice(candidates)
+            if port not in plan:
+                rest[port] = None
+            attempts += 1
+        plan.update(rest)
+        return list(plan)
+
+    def events(self, host=None, limit=200, protocol="tcp"):
+        """Mudanças de estado mais recentes, opcionalmente de um único host."""
+        query = "SELECT host, port, old_state, new_state, timestamp FROM port_events WHERE protocol = ?"
+        params = [protocol]
+        if host:
+            query += " AND host = ?"
+            params.append(host)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            return self.conn.execute(query, params).fetchall()
@@ -0,0 +1,112 @@
+# ferramentas/service_detection.py
+import asyncio
+import os
+import re
+import socket
+import sys
+from array import array
+from bisect import bisect_left
+
+# Arquivos de serviços do sistema (formato "nome  porta/protocolo  apelidos  # comentário")
+SERVICES_FILES = [
+    "/etc/services",
+    os.path.join(os.environ.get("SystemRoot", r"C:\Windows"), "System32", "drivers", "etc", "services"),
+]
+
+# Sondagem enviada quando o serviço não fala primeiro (HTTP e semelhantes)
+GENERIC_PROBE = b"HEAD / HTTP/1.0\r\n\r\n"
+
+# (serviço, expressão aplicada ao início do banner). A ordem importa: a
+# primeira alternativa que casar vence
+BANNER_SIGNATURES = [
+    ("SSH", rb"SSH-\d+\.\d+-"),
+    ("HTTP", rb"HTTP/\d\.\d \d{3}"),
+    ("RTSP", rb"RTSP/\d\.\d \d{3}"),
+    ("FTP", rb"220[ -][^\r\n]*FTP"),
+    ("SMTP", rb"220[ -][^\r\n]*(?:SMTP|Postfix|Exim|Sendmail|mail)"),
+    ("FTP/SMTP", rb"220[ -]"),
+    ("POP3", rb"\+OK"),
+    ("IMAP", rb"\* (?:OK|PREAUTH)"),
+    ("VNC", rb"RFB \d{3}\.\d{3}"),
+    ("MySQL", rb".\x00\x00\x00\x0a\d+\.\d+"),
+    ("Redis", rb"-(?:ERR|NOAUTH|DENIED)"),
+    ("Telnet", rb"\xff[\xfb-\xfe]"),
+]
+
+# Todas as assinaturas em um único autômato: um grupo nomeado por serviço
+_SIGNATURE_RE = re.compile(
+    b"|".join(b"(?P<s%d>%s)" % (i, pattern) for i, (_, pattern) in enumerate(BANNER_SIGNATURES)),
+    re.DOTALL,
+)
+
+def _load_services():
+    """Lê a tabela porta→serviço TCP do sistema em dois vetores paralelos ordenados por porta."""
+    services = {}
+    for path in SERVICES_FILES:
+        try:
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                for line in f:
+                    fields = line.split("#", 1)[0].split()
+                    if len(fields) < 2 or not fields[1].endswith("/tcp"):
+                        continue
+                    port = fields[1].split("/", 1)[0]
+                    if port.isdigit():
+                        services.setdefault(int(port), fields[0])
+        except OSError:
+            continue
+        if services:
+            break
+    ports = sorted(services)
+    # array('H') guarda cada porta em 2 bytes; os nomes ficam numa tupla paralela
+    return array("H", ports), tuple(sys.intern(services[p]) for p in ports)
+
+_SERVICE_PORTS, _SERVICE_NAMES = _load_services()
+
+def lookup_service(port):
+    """Nome do serviço registrado para a porta TCP, ou None se não houver."""
+    i = bisect_left(_SERVICE_PORTS, port)
+    if i < len(_SERVICE_PORTS) and _SERVICE_PORTS[i] == port:
+        return _SERVICE_NAMES[i]
+    return None
+
+def known_ports():
+    """Portas TCP com serviço registrado, em ordem crescente."""
+    return _SERVICE_PORTS
+
+def match_banner(banner):
+    """Identifica o serviço a partir dos bytes do banner, ou None se nenhuma assinatura casar."""
+    if not banner:
+        return None
+    match = _SIGNATURE_RE.match(banner)
+    if match is None:
+        return None
+    return BANNER_SIGNATURES[int(match.lastgroup[1:])][0]
+
+def format_banner(banner, limit=80):
+    """Primeira linha do banner em texto legível."""
+    text = banner.decode("utf-8", errors="replace").strip()
+    line = text.splitlines()[0] if text else ""
+    # Protocolos binários (ex: MySQL) trazem bytes de controle no meio do texto
+    return " ".join("".join(c if c.isprintable() else " " for c in line).split())[:limit]
+
+async def grab_banner(family, ip_address, port, connect_timeout, read_timeout=2.0):
+    """
+    Abre uma nova conexão com a porta e lê o banner do serviço.
+
+    Se o serviço não falar nada em `read_timeout`, envia GENERIC_PROBE e tenta
+    de novo. Retorna os bytes lidos (possivelmente vazios).
+    """
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    try:
+        await asyncio.wait_for(loop.sock_connect(sock, (ip_address, port)), connect_timeout)
+        try:
+            return await asyncio.wait_for(loop.sock_recv(sock, 1024), read_timeout)
+        except asyncio.TimeoutError:
+            await loop.sock_sendall(sock, GENERIC_PROBE)
+            return await asyncio.wait_for(loop.sock_recv(sock, 1024), read_timeout)
+    except (asyncio.TimeoutError, OSError):
+        return b""
+    finally:
+        sock.close()
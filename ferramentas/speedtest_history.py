@@ -0,0 +1,225 @@
+# ferramentas/speedtest_history.py
+import math
+import sqlite3
+import threading
+import time
+
+# Resoluções dos agregados, em segundos
+MINUTE, HOUR, DAY = 60, 3600, 86400
+RESOLUTIONS = (MINUTE, HOUR, DAY)
+
+# Por quanto tempo os testes individuais e os agregados por minuto são guardados;
+# os agregados por hora e por dia ficam para sempre (um dia de testes a cada 10 s
+# são 8640 linhas brutas, mas só 24 por hora e 1 por dia)
+RAW_RETENTION = 30 * DAY
+
+METRICS = ("download", "upload", "ping")
+
+def bucket_start(timestamp, resolution):
+    """Início do intervalo de `resolution` s que contém `timestamp`, alinhado ao horário local."""
+    offset = time.localtime(timestamp).tm_gmtoff
+    return math.floor((timestamp + offset) / resolution) * resolution - offset
+
+def lttb(rows, threshold, columns=(2, 5, 8)):
+    """
+    Reduz `rows` (ordenadas pelo timestamp na coluna 0) a `threshold` linhas com o LTTB.
+
+    Largest-Triangle-Three-Buckets: mantém a primeira e a última linha e, de
+    cada faixa intermediária, a linha que forma o maior triângulo com a
+    escolhida na faixa anterior e a média da faixa seguinte. Picos e vales
+    sobrevivem, ao contrário de uma média. A área soma as colunas `columns`
+    (download, upload e ping médios), cada uma normalizada pela sua amplitude.
+    """
+    n = len(rows)
+    if threshold >= n or threshold < 3:
+        return list(rows)
+    scales = []
+    for column in columns:
+        values = [row[column] for row in rows]
+        span = max(values) - min(values)
+        scales.append(1 / span if span else 0.0)
+
+    sampled = [rows[0]]
+    every = (n - 2) / (threshold - 2)
+    chosen = rows[0]
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        following = rows[end:min(int((i + 2) * every) + 1, n)]
+        next_x = sum(row[0] for row in following) / len(following)
+        next_y = [sum(row[column] for row in following) / len(following) for column in columns]
+        best, best_area = None, -1.0
+        for row in rows[start:end]:
+            area = 0.0
+            for column, mean, scale in zip(columns, next_y, scales):
+                area += abs((chosen[0] - next_x) * (row[column] - chosen[column])
+                            - (chosen[0] - row[0]) * (mean - chosen[column])) * scale
+            if area > best_area:
+                best, best_area = row, area
+        sampled.append(best)
+        chosen = best
+    sampled.append(rows[-1])
+    return sampled
+
+class SpeedHistory:
+    """
+    Histórico persistente do SpeedTest em SQLite.
+
+    `speed_samples` guarda cada teste (últimos 30 dias) e `speed_rollups`
+    mantém, para cada minuto, hora e dia, a contagem, a soma, o mínimo e o
+    máximo de download, upload e ping, atualizados a cada teste gravado. Os
+    gráficos consultam a resolução mais fina que cabe em `OVERSAMPLE` vezes
+    o número de pontos pedido, reduzida com `lttb`, e as médias do período
+    saem dos agregados: o custo de uma consulta não cresce com o histórico.
+    """
+
+    OVERSAMPLE = 10 # Linhas lidas por ponto do gráfico antes da redução com LTTB
+
+    def __init__(self, path="speedtest_history.db"):
+        # check_same_thread=False: gravado pela página e pelo monitoramento; o lock serializa o acesso à conexão
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS speed_samples (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp REAL,
+                    download REAL,
+                    upload REAL,
+                    ping REAL,
+                    server TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_speed_samples_timestamp ON speed_samples (timestamp);
+                CREATE TABLE IF NOT EXISTS speed_rollups (
+                    resolution INTEGER,
+                    bucket REAL,
+                    count INTEGER,
+                    download_sum REAL, download_min REAL, download_max REAL,
+                    upload_sum REAL, upload_min REAL, upload_max REAL,
+                    ping_sum REAL, ping_min REAL, ping_max REAL,
+                    PRIMARY KEY (resolution, bucket)
+                ) WITHOUT ROWID;
+            """)
+
+    def record(self, download, upload, ping, timestamp=None, server=None):
+        """Grava um teste (Mbps, Mbps, ms) e atualiza os agregados de cada resolução."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self.lock, self.conn:
+            self.conn.execute("INSERT INTO speed_samples (timestamp, download, upload, ping, server) VALUES (?, ?, ?, ?, ?)",
+                              (timestamp, download, upload, ping, server))
+            self.conn.executemany("""
+                INSERT INTO speed_rollups VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (resolution, bucket) DO UPDATE SET
+                    count = count + 1,
+                    download_sum = download_sum + excluded.download_sum,
+                    download_min = MIN(download_min, excluded.download_min),
+                    download_max = MAX(download_max, excluded.download_max),
+                    upload_sum = upload_sum + excluded.upload_sum,
+                    upload_min = MIN(upload_min, excluded.upload_min),
+                    upload_max = MAX(upload_max, excluded.upload_max),
+                    ping_sum = ping_sum + excluded.ping_sum,
+                    ping_min = MIN(ping_min, excluded.ping_min),
+                    ping_max = MAX(ping_max, excluded.ping_max)
+            """, [(resolution, bucket_start(timestamp, resolution), download, download, download,
+                   upload, upload, upload, ping, ping, ping) for resolution in RESOLUTIONS])
+            # Retenção: apaga o que saiu da janela (índice por timestamp, custo proporcional ao apagado)
+            cutoff = timestamp - RAW_RETENTION
+            self.conn.execute("DELETE FROM speed_samples WHERE timestamp < ?", (cutoff,))
+            self.conn.execute("DELETE FROM speed_rollups WHERE resolution = ? AND bucket < ?", (MINUTE, cutoff))
+
+    def recent(self, limit=10):
+        """Últimos testes: lista de (timestamp, download, upload, ping, servidor), do mais antigo para o mais novo."""
+        with self.lock:
+            rows = self.conn.execute("SELECT timestamp, download, upload, ping, server FROM speed_samples "
+                                     "ORDER BY timestamp DESC LIMIT ?", (limit,)).fetchall()
+        return rows[::-1]
+
+    def first_timestamp(self):
+        with self.lock:
+            row = self.conn.execute("SELECT MIN(bucket) FROM speed_rollups WHERE resolution = ?", (DAY,)).fetchone()
+        return row[0]
+
+    def pick_resolution(self, start, end, max_points):
+        """Resolução mais fina (0 = testes individuais) com no máximo `max_points` pontos entre `start` e `end`."""
+        now = time.time()
+        if start >= now - RAW_RETENTION - MINUTE: # Folga para uma janela de exatamente RAW_RETENTION
+            # Contagem pelos agregados por hora (no máximo 24 linhas por dia), não pelos testes
+            with self.lock:
+                count = self.conn.execute("SELECT COALESCE(SUM(count), 0) FROM speed_rollups "
+                                          "WHERE resolution = ? AND bucket BETWEEN ? AND ?",
+                                          (HOUR, bucket_start(start, HOUR), end)).fetchone()[0]
+            if count <= max_points:
+                return 0
+        for resolution in RESOLUTIONS:
+            if resolution == MINUTE and start < now - RAW_RETENTION:
+                continue
+            if (end - start) / resolution <= max_points:
+                return resolution
+        return DAY
+
+    def _window(self, start, end):
+        # Janela recortada ao início do histórico, para não escolher uma resolução grossa por causa de dias vazios
+        end = time.time() if end is None else end
+        first = self.first_timestamp() or end
+        return first if start is None else max(start, first), end
+
+    def series(self, start=None, end=None, max_points=500, resolution=None):
+        """
+        Série para os gráficos entre `start` e `end` (epoch) e a resolução usada.
+
+        Cada linha é (timestamp, testes, download_médio, download_mín,
+        download_máx, upload_médio, upload_mín, upload_máx, ping_médio,
+        ping_mín, ping_máx). Sem `resolution`, usa `pick_resolution` com até
+        `OVERSAMPLE` vezes `max_points` linhas; o resultado passa por `lttb`
+        e nunca tem mais que `max_points` pontos.
+        """
+        start, end = self._window(start, end)
+        if resolution is None:
+            resolution = self.pick_resolution(start, end, max_points * self.OVERSAMPLE)
+        with self.lock:
+            if resolution == 0:
+                rows = self.conn.execute("""
+                    SELECT timestamp, 1, download, download, download, upload, upload, upload, ping, ping, ping
+                    FROM speed_samples WHERE timestamp BETWEEN ? AND ? ORDER BY timestamp
+                """, (start, end)).fetchall()
+            else:
+                rows = self.conn.execute("""
+                    SELECT bucket, count,
+                           download_sum / count, download_min, download_max,
+                           upload_sum / count, upload_min, upload_max,
+                           ping_sum / count, ping_min, ping_max
+                    FROM speed_rollups WHERE resolution = ? AND bucket BETWEEN ? AND ? ORDER BY bucket
+                """, (resolution, bucket_start(start, resolution), end)).fetchall()
+        return lttb(rows, max_points), resolution
+
+    def summary(self, start=None, end=None, resolution=0):
+        """
+        Contagem e (média, mínimo, máximo) de cada métrica entre `start` e `end`.
+
+        Com `resolution` > 0 a conta é feita sobre os agregados dessa
+        resolução (a mesma da série), sem ler os testes individuais.
+        """
+        start, end = self._window(start, end)
+        with self.lock:
+            if resolution == 0:
+                row = self.conn.execute("""
+                    SELECT COUNT(*), AVG(download), MIN(download), MAX(download),
+                           AVG(upload), MIN(upload), MAX(upload), AVG(ping), MIN(ping), MAX(ping)
+                    FROM speed_samples WHERE timestamp BETWEEN ? AND ?
+                """, (start, end)).fetchone()
+            else:
+                row = self.conn.execute("""
+                    SELECT SUM(count),
+                           SUM(download_sum) / SUM(count), MIN(download_min), MAX(download_max),
+                           SUM(upload_sum) / SUM(count), MIN(upload_min), MAX(upload_max),
+                           SUM(ping_sum) / SUM(count), MIN(ping_min), MAX(ping_max)
+                    FROM speed_rollups WHERE resolution = ? AND bucket BETWEEN ? AND ?
+                """, (resolution, bucket_start(start, resolution), end)).fetchone()
+        summary = {"count": row[0] or 0}
+        for i, metric in enumerate(METRICS):
+            summary[metric] = tuple(float("nan") if value is None else value for value in row[1 + 3 * i:4 + 3 * i])
+        return summary
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM speed_samples")
+            self.conn.execute("DELETE FROM speed_rollups")
@@ -1,174 +1,215 @@
 import streamlit as st
 import pandas as pd
-import speedtest
 from datetime import datetime
 import time
+import threading
 import logging
+from functools import partial
+
+from ferramentas import throughput
+from ferramentas.speedtest_history import DAY, HOUR, MINUTE, SpeedHistory
+from ferramentas.speedtest_scheduler import SpeedtestScheduler
+from ferramentas.speedtest_servers import ServerCache
 
 # Configurar logging para depuração
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def speedtest_teste():
-    # Inicialização de sessão
-    if "dados" not in st.session_state:
-        st.session_state.dados = {
-            "DataHora": [],
-            "Download": [],
-            "Upload": [],
-            "Ping": []
-        }
-
-    if "monitorando" not in st.session_state:
-        st.session_state.monitorando = False
-
-    # Função de teste com tratamento de erros
-    def testar_velocidade():
+# Janelas do gráfico; a série é reduzida com LTTB para no máximo MAX_PONTOS pontos
+PERIODOS = {"Última hora": HOUR, "Últimas 24 horas": DAY, "Últimos 7 dias": 7 * DAY,
+            "Últimos 30 dias": 30 * DAY, "Tudo": None}
+MAX_PONTOS = 500
+RESOLUCOES = {0: "testes individuais", MINUTE: "médias por minuto", HOUR: "médias por hora", DAY: "médias por dia"}
+ESPERA = 0.2 # Fatia da espera por novidades do agendador (s)
+SPEEDTEST_NET = "speedtest.net"
+SERVIDOR_PROPRIO = "Servidor próprio"
+COLUNAS_SERIE = ["Timestamp", "Testes", "Download", "Download mín", "Download máx",
+                 "Upload", "Upload mín", "Upload máx", "Ping", "Ping mín", "Ping máx"]
+
+# Um teste por vez no processo: compartilhado pelo agendador e pela revalidação dos servidores
+_teste_lock = threading.Lock()
+
+# Configuração e melhor servidor do speedtest.net, descobertos uma vez e revalidados em segundo plano
+servidores = ServerCache(test_lock=_teste_lock)
+
+def medir_velocidade():
+    """Executa um teste completo e retorna (download Mbps, upload Mbps, ping ms, servidor)."""
+    logger.info("Selecionando melhor servidor...")
+    stt = servidores.speedtest()
+    logger.info(f"Servidor selecionado: {stt.results.server['host']}")
+
+    logger.info("Testando download...")
+    download = stt.download() / 1_000_000
+    logger.info("Testando upload...")
+    upload = stt.upload() / 1_000_000
+    logger.info("Testando ping...")
+    ping = stt.results.ping
+
+    logger.info(f"Teste concluído: Download={download:.1f} Mbps, Upload={upload:.1f} Mbps, Ping={ping:.0f} ms")
+    return download, upload, ping, stt.results.server["host"]
+
+_agendador = None
+_agendador_lock = threading.Lock()
+
+def agendador():
+    """Agendador de testes do processo, compartilhado por todas as sessões (e o histórico que ele grava)."""
+    global _agendador
+    with _agendador_lock:
+        if _agendador is None:
+            _agendador = SpeedtestScheduler(medir_velocidade, SpeedHistory(), test_lock=_teste_lock)
+        return _agendador
+
+def _hora(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%H:%M:%S")
+
+def _escolher_alvo():
+    """Onde medir: retorna (função de medida, descrição) para o teste manual e o monitoramento."""
+    origem = st.radio("Servidor de teste", [SPEEDTEST_NET, SERVIDOR_PROPRIO], horizontal=True)
+    if origem == SPEEDTEST_NET:
+        return medir_velocidade, SPEEDTEST_NET
+
+    col_host, col_porta, col_conexoes, col_duracao = st.columns(4)
+    host = col_host.text_input("Host", "127.0.0.1")
+    porta = int(col_porta.number_input("Porta", min_value=1, max_value=65535, value=throughput.DEFAULT_PORT))
+    conexoes = int(col_conexoes.number_input("Conexões TCP", min_value=1, max_value=64, value=4))
+    duracao = int(col_duracao.number_input("Duração (s) por sentido", min_value=3, max_value=60, value=10))
+
+    st.caption(f"Na outra máquina, rode `python -m ferramentas.throughput --server --port {porta}`. "
+               f"Os primeiros {throughput.WARMUP:.0f} s de cada sentido (aquecimento) ficam fora da média.")
+    bind = st.text_input("Endereço do servidor nesta máquina", "127.0.0.1",
+                         help="127.0.0.1 aceita só conexões locais. O servidor não tem autenticação: "
+                              "use 0.0.0.0 (todas as redes) apenas em redes confiáveis.")
+    if st.button("🖥️ Servir nesta máquina"):
         try:
-            with st.spinner("Realizando teste de velocidade..."):
-                stt = speedtest.Speedtest(timeout=30)
-                logger.info("Selecionando melhor servidor...")
-                stt.get_best_server()
-                logger.info(f"Servidor selecionado: {stt.results.server['host']}")
-                
-                logger.info("Testando download...")
-                download = stt.download() / 1_000_000
-                logger.info("Testando upload...")
-                upload = stt.upload() / 1_000_000
-                logger.info("Testando ping...")
-                ping = stt.results.ping
-                agora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-                novo_dado = pd.DataFrame({
-                    "DataHora": [agora],
-                    "Download": [download],
-                    "Upload": [upload],
-                    "Ping": [ping]
-                })
-
-                for col in novo_dado.columns:
-                    st.session_state.dados[col].append(novo_dado[col].values[0])
-
-                logger.info(f"Teste concluído: Download={download:.1f} Mbps, Upload={upload:.1f} Mbps, Ping={ping:.0f} ms")
-                return True
-
-        except Exception as e:
-            logger.error(f"Erro no teste de velocidade: {str(e)}")
-            st.error(f"Erro ao testar velocidade: {str(e)}")
-            return False
+            throughput.start_background_server(bind, porta)
+            st.success(f"Servidor de vazão ouvindo em {bind}:{porta}.")
+        except OSError as e:
+            st.error(f"Não foi possível abrir {bind}:{porta}: {e}")
+
+    return partial(throughput.run_test, host, porta, conexoes, duracao), f"{host}:{porta} ({conexoes} conexões)"
+
+def _vazao_por_intervalo(resultado):
+    """Gráfico das amostras por intervalo de um teste contra servidor próprio."""
+    detalhes = resultado[4]
+    series = []
+    for sentido, medida in detalhes.items():
+        series.append(pd.Series({round(t, 1): mbps for t, mbps, _ in medida.samples}, name=sentido.capitalize()))
+    aquecimento = sum(1 for *_, aquecendo in detalhes["download"].samples if aquecendo)
+    with st.expander(f"📶 Vazão por intervalo do último teste ({resultado[3]})"):
+        st.line_chart(pd.concat(series, axis=1).rename_axis("Segundos"))
+        st.caption(f"{detalhes['download'].streams} conexões; as {aquecimento} primeiras amostras de cada "
+                   "sentido são do aquecimento e não entram na média.")
+
+def speedtest_teste():
+    monitor = agendador()
+    status = monitor.status()
 
     # Título e teste manual
     st.title("📡 Monitor de Velocidade da Internet")
 
+    medir, alvo = _escolher_alvo()
+
     col_teste, col_limpar = st.columns([3, 1])
 
     with col_teste:
         if st.button("🚀 Iniciar Teste Manual", use_container_width=True):
-            st.write("Executando teste...")
-            if testar_velocidade():
-                st.success("Teste concluído!")
+            try:
+                with st.spinner("Realizando teste de velocidade..."):
+                    resultado = monitor.run_once(blocking=False, measure=medir)
+                if resultado is None:
+                    st.warning("Já há um teste em andamento; o resultado aparecerá quando ele terminar.")
+                else:
+                    st.success("Teste concluído!")
+            except Exception as e:
+                logger.error(f"Erro no teste de velocidade: {str(e)}")
+                st.error(f"Erro ao testar velocidade: {str(e)}")
+            status = monitor.status()
 
     with col_limpar:
-        if st.button("🗑️ Limpar Dados", use_container_width=True):
-            st.session_state.dados = {
-                "DataHora": [],
-                "Download": [],
-                "Upload": [],
-                "Ping": []
-            }
-            st.success("Dados limpos!")
+        if st.button("🗑️ Limpar Histórico", use_container_width=True):
+            monitor.history.clear()
+            st.success("Histórico apagado!")
             st.rerun()
 
-    # Monitoramento contínuo
+    # Monitoramento contínuo: roda no agendador do processo, esta página só mostra o estado
     st.subheader("🔁 Monitoramento Contínuo")
 
-    if "ultimo_teste" not in st.session_state:
-        st.session_state.ultimo_teste = None
-
-    if "proximo_teste" not in st.session_state:
-        st.session_state.proximo_teste = None
-
-    intervalo = st.number_input("Intervalo (segundos) entre testes", min_value=10, value=10, step=10)
+    intervalo = st.number_input("Intervalo (segundos) entre testes", min_value=10, value=status["interval"] or 10, step=10)
 
     col1, col2 = st.columns(2)
 
     with col1:
-        if not st.session_state.monitorando:
+        if not status["active"]:
             if st.button("▶️ Iniciar Monitoramento Contínuo"):
-                st.session_state.monitorando = True
-                st.session_state.ultimo_teste = datetime.now()
-                st.session_state.proximo_teste = st.session_state.ultimo_teste + pd.Timedelta(seconds=intervalo)
-                st.success("Monitoramento iniciado.")
+                monitor.start(intervalo, medir, alvo)
                 st.rerun()
         else:
             if st.button("⏹️ Parar Monitoramento"):
-                st.session_state.monitorando = False
-                st.session_state.ultimo_teste = None
-                st.session_state.proximo_teste = None
-                st.warning("Monitoramento interrompido.")
+                monitor.stop()
+                st.rerun()
+            if (intervalo != status["interval"] or alvo != (status["target"] or SPEEDTEST_NET)) \
+                    and st.button("🔧 Aplicar Configuração"):
+                monitor.start(intervalo, medir, alvo)
                 st.rerun()
 
     with col2:
-        if st.session_state.monitorando:
-            agora = datetime.now()
-            if st.session_state.proximo_teste and agora >= st.session_state.proximo_teste:
-                if testar_velocidade():
-                    st.session_state.ultimo_teste = agora
-                    st.session_state.proximo_teste = agora + pd.Timedelta(seconds=intervalo)
-                    st.success(f"Teste automático realizado às {agora.strftime('%H:%M:%S')}")
-                    st.rerun()
-            
-            if st.session_state.proximo_teste:
-                tempo_restante = (st.session_state.proximo_teste - agora).total_seconds()
-                if tempo_restante > 0:
-                    st.info(f"⏰ Próximo teste em: {int(tempo_restante)}s")
-                    if st.button("🔄 Atualizar Status"):
-                        st.rerun()
-                else:
-                    st.info("⏰ Executando teste...")
-            
-            st.info("💡 Dica: A página atualizará automaticamente quando for hora do próximo teste.")
-            st.caption(f"Status: Monitoramento ativo - Última verificação: {agora.strftime('%H:%M:%S')}")
-            
-            if st.session_state.proximo_teste:
-                tempo_para_teste = (st.session_state.proximo_teste - agora).total_seconds()
-                if 0 < tempo_para_teste <= 10:
-                    time.sleep(2)
-                    st.rerun()
+        if status["running_since"]:
+            st.info(f"⏳ Teste em andamento desde {_hora(status['running_since'])}")
+        elif status["active"]:
+            st.info(f"⏰ Próximo teste às {_hora(status['next_run'])}")
+        if status["active"]:
+            st.caption(f"Status: Monitoramento ativo a cada ~{status['interval']} s em "
+                       f"{status['target'] or SPEEDTEST_NET} - {status['runs']} testes, "
+                       f"{status['failures']} falhas. Continua rodando ao fechar a página.")
+        if status["last_error"]:
+            st.error(f"Último teste falhou: {status['last_error']}")
+
+    if alvo == SPEEDTEST_NET:
+        st.caption(servidores.summary())
+    if status["last_result"] and len(status["last_result"]) > 4:
+        _vazao_por_intervalo(status["last_result"])
 
     # Visualização de resultados
     st.subheader("📊 Resultados")
 
-    df = pd.DataFrame(st.session_state.dados)
+    historico = monitor.history
+    periodo = st.selectbox("Período", list(PERIODOS), index=1)
+    inicio = time.time() - PERIODOS[periodo] if PERIODOS[periodo] else None
+    linhas, resolucao = historico.series(inicio, max_points=MAX_PONTOS)
 
-    if not df.empty:
-        df["DataHora"] = pd.to_datetime(df["DataHora"], errors="coerce")
-        df = df.dropna(subset=["DataHora"])
+    if linhas:
+        resumo = historico.summary(inicio, resolution=resolucao)
+        df = pd.DataFrame(linhas, columns=COLUNAS_SERIE)
+        df.insert(0, "DataHora", [datetime.fromtimestamp(t) for t in df.pop("Timestamp")])
 
         col1, col2, col3 = st.columns(3)
         
         with col1:
             st.metric(
                 label="📈 Download Médio", 
-                value=f"{df['Download'].mean():.1f} Mbps",
-                delta=f"Max: {df['Download'].max():.1f}"
+                value=f"{resumo['download'][0]:.1f} Mbps",
+                delta=f"Max: {resumo['download'][2]:.1f}"
             )
         
         with col2:
             st.metric(
                 label="📤 Upload Médio", 
-                value=f"{df['Upload'].mean():.1f} Mbps",
-                delta=f"Max: {df['Upload'].max():.1f}"
+                value=f"{resumo['upload'][0]:.1f} Mbps",
+                delta=f"Max: {resumo['upload'][2]:.1f}"
             )
         
         with col3:
             st.metric(
                 label="🏓 Ping Médio", 
-                value=f"{df['Ping'].mean():.0f} ms",
-                delta=f"Min: {df['Ping'].min():.0f}"
+                value=f"{resumo['ping'][0]:.0f} ms",
+                delta=f"Min: {resumo['ping'][1]:.0f}"
             )
 
-        st.dataframe(df.tail(10), use_container_width=True)
+        st.caption(f"{resumo['count']} testes no período; gráficos com {len(linhas)} pontos ({RESOLUCOES[resolucao]}).")
+
+        recentes = pd.DataFrame(historico.recent(10), columns=["DataHora", "Download", "Upload", "Ping", "Servidor"])
+        recentes["DataHora"] = [datetime.fromtimestamp(t) for t in recentes["DataHora"]]
+        st.dataframe(recentes, use_container_width=True)
 
         st.write("📈 Gráfico de Download/Upload")
         st.line_chart(df.set_index("DataHora")[["Download", "Upload"]])
@@ -178,12 +219,21 @@ def speedtest_teste():
 
         csv_data = df.to_csv(index=False).encode("utf-8")
         st.download_button(
-            "📥 Baixar Dados da Sessão (CSV)", 
+            "📥 Baixar Dados do Período (CSV)", 
             data=csv_data, 
-            file_name=f"speedtest_session_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv", 
+            file_name=f"speedtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv", 
             mime="text/csv",
-            help="⚠️ Dados são apenas da sessão atual e serão perdidos ao recarregar a página"
+            help="Os mesmos pontos dos gráficos: testes individuais ou médias, conforme o período"
         )
     else:
-        st.info("Nenhum teste realizado ainda.")
-        st.warning("💡 **Nota**: Os dados são armazenados apenas durante esta sessão e serão perdidos ao recarregar a página.")
\ No newline at end of file
+        st.info("Nenhum teste realizado no período.")
+        st.caption("Os testes ficam gravados em speedtest_history.db e continuam disponíveis depois de recarregar a página.")
+
+    # Espera pelo próximo início/fim de teste (desta ou de outra sessão) sem
+    # reexecutar a página. A espera é feita em fatias curtas porque ler o
+    # st.session_state é um ponto em que o Streamlit interrompe o script
+    # (cliques ou sessão encerrada)
+    st.session_state.speedtest_versao = status["version"]
+    while monitor.wait_for_change(st.session_state.speedtest_versao, ESPERA) == st.session_state.speedtest_versao:
+        pass
+    st.rerun()
\ No newline at end of file
@@ -0,0 +1,138 @@
+# ferramentas/speedtest_scheduler.py
+import random
+import threading
+import time
+
+class SpeedtestScheduler:
+    """
+    Monitoramento contínuo do SpeedTest numa thread do processo.
+
+    Os testes rodam em intervalo fixo com uma variação aleatória (`jitter`,
+    fração do intervalo), independentes das páginas abertas: fechar a aba ou
+    trocar de página não para o monitoramento. `test_lock` garante um único
+    teste por vez no processo, inclusive os manuais, para que dois testes
+    não disputem o link e estraguem as medidas um do outro.
+
+    As páginas só observam: `status()` e `wait_for_change()`, que bloqueia
+    até o próximo início/fim de teste ou mudança de configuração.
+    """
+
+    def __init__(self, measure, history, jitter=0.1, test_lock=None):
+        self.measure = measure # Função sem argumentos que retorna (download, upload, ping, servidor, ...)
+        self.target = None # Descrição de onde os testes agendados medem
+        self.history = history
+        self.jitter = jitter
+        self.test_lock = test_lock or threading.Lock()
+        self._cond = threading.Condition()
+        self.version = 0 # Incrementada a cada mudança observável
+        self.interval = None # None: monitoramento parado
+        self.next_run = None
+        self.running_since = None
+        self.last_run = None
+        self.last_result = None
+        self.last_error = None
+        self.runs = 0
+        self.failures = 0
+        self._thread = None
+
+    def _changed(self):
+        # Chamado com self._cond adquirido
+        self.version += 1
+        self._cond.notify_all()
+
+    def start(self, interval, measure=None, target=None):
+        """
+        Inicia (ou reconfigura) o monitoramento: o primeiro teste roda depois de `interval` s.
+
+        `measure` e `target` trocam a função de medida usada pelos testes agendados.
+        """
+        with self._cond:
+            self.interval = interval
+            if measure is not None:
+                self.measure = measure
+                self.target = target
+            self.next_run = time.time() + interval
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="speedtest-scheduler", daemon=True)
+                self._thread.start()
+            self._changed()
+
+    def stop(self):
+        with self._cond:
+            self.interval = None
+            self.next_run = None
+            self._changed()
+
+    def run_once(self, blocking=True, measure=None):
+        """
+        Executa um teste (com `measure`, se dada) e grava no histórico.
+
+        Retorna o resultado, ou None se `blocking` for False e já houver um
+        teste em andamento. Erros do teste são registrados em `last_error` e
+        levantados de novo.
+        """
+        if not self.test_lock.acquire(blocking):
+            return None
+        try:
+            with self._cond:
+                self.running_since = time.time()
+                self._changed()
+            try:
+                result = (measure or self.measure)()
+                self.history.record(*result[:3], server=result[3])
+            except Exception as e:
+                with self._cond:
+                    self.failures += 1
+                    self.last_error = str(e)
+                raise
+            with self._cond:
+                self.runs += 1
+                self.last_result = result
+                self.last_error = None
+            return result
+        finally:
+            with self._cond:
+                self.running_since = None
+                self.last_run = time.time()
+                self._changed()
+            self.test_lock.release()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self.next_run is None or time.time() < self.next_run:
+                    self._cond.wait(None if self.next_run is None else self.next_run - time.time())
+                scheduled = self.next_run
+            try:
+                self.run_once()
+            except Exception:
+                pass # Já registrado em last_error; o monitoramento continua
+            with self._cond:
+                if self.interval is not None and self.next_run == scheduled:
+                    # Intervalo fixo a partir do horário agendado, com variação; se o
+                    # teste demorou mais que o intervalo, o próximo começa em seguida
+                    delay = self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+                    self.next_run = max(scheduled + delay, time.time())
+                    self._changed()
+
+    def wait_for_change(self, version, timeout):
+        """Espera até `timeout` s por uma mudança depois de `version`; retorna a versão atual."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def status(self):
+        with self._cond:
+            return {
+                "version": self.version,
+                "active": self.interval is not None,
+                "interval": self.interval,
+                "target": self.target,
+                "next_run": self.next_run,
+                "running_since": self.running_since,
+                "last_run": self.last_run,
+                "last_result": self.last_result,
+                "last_error": self.last_error,
+                "runs": self.runs,
+                "failures": self.failures,
+            }
@@ -0,0 +1,155 @@
+# ferramentas/speedtest_servers.py
+import copy
+import logging
+import threading
+import time
+
+import speedtest
+
+logger = logging.getLogger(__name__)
+
+class _CachedSpeedtest(speedtest.Speedtest):
+    """Speedtest que usa uma configuração já baixada em vez de buscá-la de novo no construtor."""
+
+    def __init__(self, config, lat_lon, **kwargs):
+        self._cached_config = config
+        self._cached_lat_lon = lat_lon
+        super().__init__(**kwargs)
+
+    def get_config(self):
+        self.config.update(copy.deepcopy(self._cached_config))
+        self.lat_lon = self._cached_lat_lon
+        return self.config
+
+class ServerCache:
+    """
+    Configuração, lista de servidores e melhor servidor do speedtest.net, compartilhados pelo processo.
+
+    Sem cache, cada teste baixa a configuração e a lista completa de
+    servidores e mede a latência dos 5 mais próximos antes de começar. Aqui
+    isso acontece uma vez: os testes seguintes só medem a latência do
+    servidor escolhido (que é também o ping do teste). Se ela piorar além de
+    `degrade_factor` vezes a latência de quando ele foi escolhido, o melhor
+    servidor é escolhido de novo entre os mais próximos já conhecidos.
+
+    Uma thread revalida em segundo plano a cada `revalidate_interval` s:
+    baixa de novo a configuração e a lista de servidores quando passam dos
+    TTLs e confere a latência do servidor escolhido. Ela usa o mesmo
+    `test_lock` dos testes, para nunca medir durante um teste.
+    """
+
+    def __init__(self, config_ttl=3600.0, servers_ttl=86400.0, revalidate_interval=900.0, degrade_factor=1.5,
+                 min_degrade_ms=10.0, timeout=30, test_lock=None):
+        self.config_ttl = config_ttl
+        self.servers_ttl = servers_ttl
+        self.revalidate_interval = revalidate_interval
+        self.degrade_factor = degrade_factor
+        self.min_degrade_ms = min_degrade_ms # Piora mínima em ms, para servidores com latência muito baixa
+        self.timeout = timeout
+        self.test_lock = test_lock or threading.Lock()
+        self._lock = threading.Lock()
+        self._config = None # (config, lat_lon, quando foi baixada)
+        self._closest = None # (servidores mais próximos, quando a lista foi baixada)
+        self._best = None # Servidor escolhido
+        self._baseline = None # Latência (ms) do servidor quando foi escolhido
+        self._thread = None
+        self.hits = 0 # Testes que não precisaram baixar nada
+        self.discoveries = 0 # Downloads de configuração/lista de servidores
+        self.repicks = 0 # Trocas de servidor por piora de latência
+        self.last_discovery_time = None # Duração da última descoberta (s)
+
+    def speedtest(self):
+        """
+        Speedtest pronto para medir, com o servidor e o ping já definidos em `results`.
+
+        Deve ser chamado com `test_lock` adquirido.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._revalidate_loop, name="speedtest-servers", daemon=True)
+            self._thread.start()
+        if self._config is None or self._closest is None:
+            return self._discover()
+        stt = _CachedSpeedtest(self._config[0], self._config[1], timeout=self.timeout)
+        latency = stt.get_best_server([dict(self._best)])["latency"]
+        if self._degraded(latency):
+            logger.info(f"Latência de {self._best['host']} subiu para {latency:.0f} ms; escolhendo outro servidor")
+            self._repick(stt)
+        else:
+            self.hits += 1
+        return stt
+
+    def _degraded(self, latency):
+        return latency > max(self._baseline * self.degrade_factor, self._baseline + self.min_degrade_ms)
+
+    def _discover(self, keep_best=False):
+        start = time.monotonic()
+        stt = speedtest.Speedtest(timeout=self.timeout) # Baixa a configuração
+        stt.get_closest_servers() # Baixa a lista de servidores
+        now = time.time()
+        with self._lock:
+            self._config = (copy.deepcopy(stt.config), stt.lat_lon, now)
+            self._closest = ([dict(server) for server in stt.closest], now)
+            self.discoveries += 1
+        if keep_best and self._best is not None:
+            latency = stt.get_best_server([dict(self._best)])["latency"]
+            if self._degraded(latency):
+                self._repick(stt)
+        else:
+            self._choose(stt.get_best_server())
+        self.last_discovery_time = time.monotonic() - start
+        logger.info(f"Descoberta do speedtest.net em {self.last_discovery_time:.1f} s; servidor {self._best['host']}")
+        return stt
+
+    def _repick(self, stt):
+        self._choose(stt.get_best_server([dict(server) for server in self._closest[0]]))
+        with self._lock:
+            self.repicks += 1
+
+    def _choose(self, best):
+        with self._lock:
+            self._best = dict(best)
+            self._baseline = best["latency"]
+
+    def revalidate(self):
+        """Atualiza o que passou do TTL e troca de servidor se a latência piorou. Chamar com `test_lock` adquirido."""
+        if self._config is None:
+            return
+        now = time.time()
+        if now - self._config[2] > self.config_ttl or now - self._closest[1] > self.servers_ttl:
+            self._discover(keep_best=True)
+            return
+        stt = _CachedSpeedtest(self._config[0], self._config[1], timeout=self.timeout)
+        if self._degraded(stt.get_best_server([dict(self._best)])["latency"]):
+            self._repick(stt)
+
+    def _revalidate_loop(self):
+        while True:
+            time.sleep(self.revalidate_interval)
+            with self.test_lock:
+                try:
+                    self.revalidate()
+                except Exception as e:
+                    logger.warning(f"Falha ao revalidar os servidores do speedtest.net: {e}")
+
+    def status(self):
+        with self._lock:
+            return {
+                "server": self._best["host"] if self._best else None,
+                "sponsor": self._best.get("sponsor") if self._best else None,
+                "baseline_ms": self._baseline,
+                "config_age": time.time() - self._config[2] if self._config else None,
+                "hits": self.hits,
+                "discoveries": self.discoveries,
+                "repicks": self.repicks,
+                "last_discovery_time": self.last_discovery_time,
+            }
+
+    def summary(self):
+        """Resumo do cache para exibir na página."""
+        status = self.status()
+        if status["server"] is None:
+            return "Servidor do speedtest.net ainda não escolhido: o primeiro teste faz a descoberta."
+        return (f"Servidor: {status['sponsor']} ({status['server']}), latência de referência "
+                f"{status['baseline_ms']:.0f} ms. {status['hits']} testes sem nova descoberta, "
+                f"{status['discoveries']} descobertas (última em {status['last_discovery_time']:.1f} s), "
+                f"{status['repicks']} trocas por latência.")
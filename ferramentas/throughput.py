@@ -0,0 +1,245 @@
+# ferramentas/throughput.py
+"""
+Teste de vazão próprio: download/upload com N conexões TCP em paralelo.
+
+Servidor (na outra ponta, ou na mesma máquina para testar):
+    python -m ferramentas.throughput --server --port 5201
+
+Cliente:
+    python -m ferramentas.throughput 192.168.0.10 --streams 4 --duration 10
+"""
+import argparse
+import os
+import socket
+import socketserver
+import statistics
+import struct
+import tempfile
+import threading
+import time
+from typing import NamedTuple
+
+DEFAULT_PORT = 5201
+WARMUP = 2.0 # Segundos iniciais de cada sentido que ficam fora da média
+MAX_DURATION = 120.0 # O servidor nunca envia/recebe por mais que isso numa conexão
+
+# Cabeçalho enviado pelo cliente em cada conexão: assinatura, modo (b"D" = o
+# servidor envia, b"U" = o servidor recebe) e duração em segundos
+HEADER = struct.Struct("!4scd")
+MAGIC = b"TPUT"
+
+BUFFER_SIZE = 1 << 20 # recv_into e sendfile em blocos de 1 MiB
+
+class ThroughputResult(NamedTuple):
+    direction: str # "download" ou "upload"
+    streams: int
+    mbps: float # Média depois do aquecimento
+    bytes: int # Total transferido, inclusive no aquecimento
+    seconds: float
+    samples: list # (segundos desde o início, Mbps no intervalo, no aquecimento?)
+
+_payload = None
+_payload_lock = threading.Lock()
+
+def _payload_file():
+    """
+    Arquivo de BUFFER_SIZE bytes aleatórios (nada no caminho consegue
+    comprimir), criado no primeiro envio e compartilhado pelo processo: o
+    sendfile lê do cache de páginas do kernel direto para o socket, sem passar
+    pelo Python, e com offset explícito várias conexões leem o mesmo arquivo.
+    """
+    global _payload
+    with _payload_lock:
+        if _payload is None:
+            f = tempfile.TemporaryFile()
+            f.write(os.urandom(BUFFER_SIZE))
+            f.flush()
+            _payload = f
+        return _payload
+
+def _send_until(sock, deadline, counter=None, slot=0):
+    """Envia o payload em laço pelo sendfile (zero-cópia) até `deadline` ou a outra ponta fechar."""
+    f = _payload_file()
+    while time.perf_counter() < deadline:
+        try:
+            sent = sock.sendfile(f, 0, BUFFER_SIZE)
+        except OSError:
+            break
+        if not sent:
+            break
+        if counter is not None:
+            counter[slot] += sent
+
+def _receive_until(sock, deadline, counter=None, slot=0):
+    """Lê para um buffer reaproveitado (recv_into, sem alocar) até `deadline` ou o fim da conexão."""
+    view = memoryview(bytearray(BUFFER_SIZE))
+    while time.perf_counter() < deadline:
+        try:
+            n = sock.recv_into(view)
+        except socket.timeout:
+            continue
+        except OSError:
+            break
+        if not n:
+            break
+        if counter is not None:
+            counter[slot] += n
+
+def _recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+# Servidor
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock = self.request
+        sock.settimeout(MAX_DURATION + 10)
+        try:
+            header = _recv_exact(sock, HEADER.size)
+            if header is None: # Conexão só para medir a latência
+                return
+            magic, mode, duration = HEADER.unpack(header)
+            if magic != MAGIC:
+                return
+            deadline = time.perf_counter() + min(duration, MAX_DURATION)
+            if mode == b"D":
+                _send_until(sock, deadline)
+            elif mode == b"U":
+                _receive_until(sock, deadline + 5) # O cliente fecha ao terminar
+        except (OSError, struct.error):
+            pass
+
+class ThroughputServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT):
+        super().__init__((host, port), _Handler)
+
+_background = {}
+_background_lock = threading.Lock()
+
+def start_background_server(host="127.0.0.1", port=DEFAULT_PORT):
+    """
+    Sobe o servidor numa thread deste processo (uma vez por endereço) e o retorna.
+
+    Por padrão só aceita conexões locais: o servidor não tem autenticação, e
+    ouvir em todas as redes (0.0.0.0) deve ser uma escolha explícita.
+    """
+    with _background_lock:
+        server = _background.get((host, port))
+        if server is None:
+            server = _background[(host, port)] = ThroughputServer(host, port)
+            threading.Thread(target=server.serve_forever, name="throughput-server", daemon=True).start()
+        return server
+
+# Cliente
+
+def measure_latency(host, port=DEFAULT_PORT, count=5, timeout=3.0):
+    """Latência em ms: mediana do tempo de conexão TCP (um RTT do handshake)."""
+    rtts = []
+    for _ in range(count):
+        start = time.perf_counter()
+        with socket.create_connection((host, port), timeout=timeout):
+            rtts.append((time.perf_counter() - start) * 1000)
+    return statistics.median(rtts)
+
+def measure(host, port=DEFAULT_PORT, direction="download", streams=4, duration=10.0, warmup=WARMUP, interval=0.5,
+            timeout=5.0):
+    """
+    Mede a vazão num sentido com `streams` conexões em paralelo.
+
+    Os primeiros `warmup` s (slow start do TCP, buffers enchendo) entram nas
+    amostras mas não na média. As amostras são a vazão de cada intervalo de
+    `interval` s.
+    """
+    warmup = warmup if warmup < duration else 0.0
+    mode = b"D" if direction == "download" else b"U"
+    socks = [socket.create_connection((host, port), timeout=timeout) for _ in range(streams)]
+    counter = [0] * streams # Um contador por conexão: cada thread só escreve no seu
+    start = time.perf_counter()
+    deadline = start + duration
+    work = _receive_until if mode == b"D" else _send_until
+    threads = []
+    for i, sock in enumerate(socks):
+        sock.sendall(HEADER.pack(MAGIC, mode, duration))
+        threads.append(threading.Thread(target=work, args=(sock, deadline, counter, i), daemon=True))
+    for thread in threads:
+        thread.start()
+
+    samples = []
+    last_time, last_bytes = start, 0
+    warm_time, warm_bytes = start, 0
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(max(0.0, min(last_time + interval, deadline) - time.perf_counter()))
+            now, total = time.perf_counter(), sum(counter)
+            if now > last_time:
+                samples.append((now - start, (total - last_bytes) * 8 / (now - last_time) / 1e6, now - start <= warmup))
+            if now - start <= warmup:
+                warm_time, warm_bytes = now, total
+            last_time, last_bytes = now, total
+            if now >= deadline:
+                break
+    finally:
+        # shutdown acorda as threads paradas no recv; só então os sockets são fechados
+        for sock in socks:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        for thread in threads:
+            thread.join(timeout)
+        for sock in socks:
+            sock.close()
+
+    elapsed = last_time - warm_time
+    mbps = (last_bytes - warm_bytes) * 8 / elapsed / 1e6 if elapsed > 0 else 0.0
+    return ThroughputResult(direction, streams, mbps, last_bytes, last_time - start, samples)
+
+def run_test(host, port=DEFAULT_PORT, streams=4, duration=10.0, warmup=WARMUP):
+    """
+    Teste completo contra um servidor próprio, no formato do SpeedTest.
+
+    Retorna (download Mbps, upload Mbps, ping ms, "host:porta", detalhes),
+    com `detalhes` = {"download": ThroughputResult, "upload": ThroughputResult}.
+    """
+    ping = measure_latency(host, port)
+    download = measure(host, port, "download", streams, duration, warmup)
+    upload = measure(host, port, "upload", streams, duration, warmup)
+    return download.mbps, upload.mbps, ping, f"{host}:{port}", {"download": download, "upload": upload}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("host", nargs="?", help="Servidor a medir (modo cliente)")
+    parser.add_argument("--server", action="store_true", help="Roda como servidor")
+    parser.add_argument("--bind", default="0.0.0.0", help="Endereço do servidor (padrão: todas as redes)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--streams", type=int, default=4, help="Conexões em paralelo")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos por sentido")
+    parser.add_argument("--warmup", type=float, default=WARMUP, help="Segundos iniciais fora da média")
+    args = parser.parse_args()
+
+    if args.server:
+        print(f"Servidor de vazão em {args.bind}:{args.port}")
+        with ThroughputServer(args.bind, args.port) as server:
+            server.serve_forever()
+        return
+    if not args.host:
+        parser.error("informe o host ou use --server")
+    print(f"Ping: {measure_latency(args.host, args.port):.2f} ms")
+    for direction in ("download", "upload"):
+        result = measure(args.host, args.port, direction, args.streams, args.duration, args.warmup)
+        for t, mbps, warm in result.samples:
+            print(f"  {direction:8s} {t:6.2f} s {mbps:10.1f} Mbps{'  (aquecimento)' if warm else ''}")
+        print(f"{direction.capitalize()}: {result.mbps:.1f} Mbps com {result.streams} conexões "
+              f"({result.bytes / 1e6:.0f} MB em {result.seconds:.1f} s)")
+
+if __name__ == "__main__":
+    main()
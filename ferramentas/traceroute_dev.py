@@ -2,11 +2,136 @@ import streamlit as st
 import platform
 import subprocess
 import re
-import pandas as pd
-import time
 import shutil
+import socket
+from datetime import datetime
+import pandas as pd
+from ferramentas.live_ui import LiveTable, iter_with_idle
+from ferramentas.ping import resolve
+from ferramentas.resolver import default_resolver
+from ferramentas.traceroute_engine import collect_hops, monitor_path, trace_stream
+
+# Sondagens por salto, como no traceroute do sistema
+CONSULTAS = 3
+
+def _linha(hop, nomes):
+    """Converte um salto de collect_hops na linha exibida na tabela."""
+    ip = hop["ips"][0] if hop["ips"] else None
+    latencias = "  ".join(f"{rtt:.3f} ms" if rtt is not None else "*" for rtt in hop["rtts_ms"])
+    if hop["kind"] == "unreachable":
+        latencias += "  !" # Um roteador recusou o pacote (rede/host inalcançável)
+    return {
+        "Hop": hop["ttl"],
+        "Hostname": nomes.get(ip, "N/A") if ip else "N/A",
+        "IP": ", ".join(hop["ips"]) or "*",
+        "Latency": latencias if ip else "Timeout",
+    }
+
+def _guardar_nome(nomes, ip, futuro):
+    try:
+        nomes[ip] = futuro.result() or ip
+    except OSError:
+        pass
+
+def _ms(valor):
+    return round(valor, 2) if valor is not None else None
+
+def _linhas_mtr(monitor, nomes):
+    """Uma linha por salto do monitoramento contínuo, no formato do mtr."""
+    linhas = []
+    for ttl in sorted(monitor.hops):
+        hop = monitor.hops[ttl]
+        linhas.append({
+            "Hop": ttl,
+            "Hostname": nomes.get(hop.ip, hop.ip) if hop.ip else "???",
+            "IP": hop.ip or "*",
+            "Perda (%)": round(hop.loss_pct, 1),
+            "Enviados": hop.sent,
+            "Último (ms)": _ms(hop.last),
+            "Média (ms)": _ms(hop.avg),
+            "Melhor (ms)": _ms(hop.best),
+            "Pior (ms)": _ms(hop.worst),
+            "Desvio (ms)": _ms(hop.stddev),
+        })
+    return linhas
+
+def _mudancas(monitor):
+    return [{
+        "Horário": datetime.fromtimestamp(m.timestamp).strftime("%H:%M:%S"),
+        "Hop": m.ttl,
+        "Antes": m.old_ip or "-",
+        "Depois": m.new_ip or "-",
+    } for m in reversed(monitor.changes)]
+
+def _render_mtr(monitor, nomes, tabela, mudancas):
+    tabela.dataframe(pd.DataFrame(_linhas_mtr(monitor, nomes)), use_container_width=True, hide_index=True)
+    if monitor.changes:
+        mudancas.dataframe(pd.DataFrame(_mudancas(monitor)), use_container_width=True, hide_index=True)
+    else:
+        mudancas.caption("Nenhuma mudança detectada até agora.")
 
 def traceroute_dev():
+    def rastrear(destino, max_saltos=30, metodo="auto", timeout=2.0):
+        """
+        Traceroute pelo próprio processo, com todos os TTLs sondados ao mesmo tempo.
+
+        Levanta PermissionError quando o método não pode ser usado neste
+        sistema (ex: sem socket raw), para cair no comando traceroute.
+        """
+        try:
+            family, ip = resolve(destino)
+        except socket.gaierror:
+            return None, f"Erro: Não foi possível resolver o destino {destino}."
+        respostas = []
+        nomes = {}
+        table = LiveTable(static=True, formatter=lambda hop: _linha(hop, nomes))
+        try:
+            for resposta in trace_stream(ip, family, max_saltos, CONSULTAS, timeout, metodo):
+                respostas.append(resposta)
+                table.rows = collect_hops(respostas, CONSULTAS)
+                table.touch()
+        except OSError as e:
+            if isinstance(e, PermissionError):
+                raise
+            return None, f"Erro: {str(e)}"
+
+        # Nomes só depois das sondagens, resolvidos em paralelo, para não atrasar o rastreamento
+        ips = [hop["ips"][0] for hop in table.rows if hop["ips"]]
+        nomes.update((ip, nome or ip) for ip, nome in default_resolver.reverse_many(ips).items())
+        table.dirty = True
+        table.flush()
+        return table.rows, None
+
+    def monitorar(destino, max_saltos, metodo, timeout, intervalo, janela):
+        """Reenvia as sondagens a cada `intervalo` s até o usuário clicar em Parar."""
+        try:
+            family, ip = resolve(destino)
+            rodadas = monitor_path(ip, family, max_saltos, intervalo, timeout, metodo, window=janela)
+        except socket.gaierror:
+            st.error(f"Erro: Não foi possível resolver o destino {destino}.")
+            return
+        except OSError as e:
+            st.error(f"Erro: {str(e)}")
+            return
+
+        # Fica na sessão para a tabela sobreviver ao botão Parar
+        nomes = st.session_state.mtr_nomes = {}
+        status = st.empty()
+        tabela = st.empty()
+        st.markdown("**Mudanças de caminho**")
+        mudancas = st.empty()
+        for monitor, novas in rodadas:
+            st.session_state.mtr_monitor = monitor
+            for hop in monitor.hops.values():
+                if hop.ip and hop.ip not in nomes:
+                    nomes[hop.ip] = hop.ip # Até o nome chegar, mostra o IP
+                    default_resolver.submit_reverse(hop.ip).add_done_callback(
+                        lambda futuro, ip=hop.ip: _guardar_nome(nomes, ip, futuro))
+            for mudanca in novas:
+                st.toast(f"Salto {mudanca.ttl}: {mudanca.old_ip or 'nenhum'} → {mudanca.new_ip or 'nenhum'}")
+            status.text(f"Rodada {monitor.rounds} • {destino} ({ip}) • {default_resolver.summary()}")
+            _render_mtr(monitor, nomes, tabela, mudancas)
+
     def contar_saltos(destino, max_saltos=30):
         sistema = platform.system().lower()
         
@@ -20,24 +145,22 @@ def traceroute_dev():
         if not comando:
             return None, f"Erro: Comando '{cmd_name}' não encontrado no sistema. Certifique-se de que está instalado."
         
+        # -d/-n: sem DNS reverso no comando, que faz uma consulta por vez; os
+        # nomes são resolvidos em paralelo no final
         if sistema == "windows":
-            comando = [comando, "-h", str(max_saltos), destino]
+            comando = [comando, "-d", "-h", str(max_saltos), destino]
             encoding = "cp850"
         else:
-            comando = [comando, "-m", str(max_saltos), destino]
+            comando = [comando, "-n", "-m", str(max_saltos), destino]
             encoding = "utf-8"
 
         try:
             processo = subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding=encoding)
             
-            placeholder = st.empty()
-            hops = []
+            table = LiveTable(static=True)
+            hops = table.rows
             
-            while True:
-                linha = processo.stdout.readline()
-                if not linha and processo.poll() is not None:
-                    break
-                
+            for linha in iter_with_idle(processo.stdout, table.flush):
                 if re.match(r"^\s*\d+", linha):
                     hop_num = re.match(r"^\s*(\d+)", linha).group(1)
                     
@@ -54,19 +177,22 @@ def traceroute_dev():
                         else:
                             hops.append({"Hop": hop_num, "Hostname": "N/A", "IP": "N/A", "Latency": "Timeout"})
                     else:
-                        match = re.search(r"(\S+)\s+\((\d+\.\d+\.\d+\.\d+)\)\s+(\d+\.\d+\s+ms|\*)", linha)
+                        match = re.search(r"(\d+\.\d+\.\d+\.\d+)\s+(\d+\.\d+\s+ms)", linha)
                         if match:
-                            hostname, ip, latency = match.groups()
-                            latency = latency if latency != "*" else "Timeout"
-                            hops.append({"Hop": hop_num, "Hostname": hostname, "IP": ip, "Latency": latency})
+                            ip, latency = match.groups()
+                            hops.append({"Hop": hop_num, "Hostname": ip, "IP": ip, "Latency": latency})
                         else:
                             hops.append({"Hop": hop_num, "Hostname": "N/A", "IP": "N/A", "Latency": "Timeout"})
                     
                     if hops:
-                        df = pd.DataFrame(hops)
-                        placeholder.table(df)
-                        time.sleep(0.1)
+                        table.touch()
 
+            nomes = default_resolver.reverse_many(hop["IP"] for hop in hops if hop["IP"] != "N/A")
+            for hop in hops:
+                hop["Hostname"] = nomes.get(hop["IP"]) or hop["Hostname"]
+            table.dirty = True
+            table.flush()
+            processo.wait()
             if processo.returncode != 0:
                 erro = processo.stderr.read()
                 return hops, f"Erro ao executar o comando:\n{erro}"
@@ -80,14 +206,54 @@ def traceroute_dev():
 
     destino = st.text_input("Destino:", value="google.com")
     max_saltos = st.number_input("Máximo de saltos:", min_value=1, max_value=255, value=30)
+    col1, col2 = st.columns(2)
+    metodo = col1.selectbox("Método", ["auto", "udp", "icmp", "tcp", "sistema"],
+                            help="auto/udp/icmp/tcp sondam todos os saltos ao mesmo tempo pelo próprio processo; "
+                                 "sistema executa o comando traceroute/tracert.")
+    timeout = col2.number_input("Timeout (s)", min_value=0.2, max_value=10.0, value=2.0, step=0.1)
+    continuo = st.checkbox("Modo contínuo (MTR)",
+                           help="Sonda o caminho de novo a cada intervalo e acumula perda e latência por salto.")
+    if continuo:
+        col1, col2 = st.columns(2)
+        intervalo = col1.number_input("Intervalo entre rodadas (s)", min_value=0.2, max_value=60.0, value=1.0, step=0.1)
+        janela = col2.number_input("Rodadas nas estatísticas", min_value=10, max_value=10000, value=100,
+                                   help="As estatísticas de cada salto cobrem só as últimas rodadas, "
+                                        "então a memória não cresce com a duração.")
 
     if st.button("Executar Traceroute"):
+        if continuo:
+            if metodo == "sistema":
+                st.error("O modo contínuo usa o traceroute do próprio processo; escolha outro método.")
+                return
+            # Clicar em Parar reexecuta o script, o que interrompe o monitoramento
+            st.button("⏹️ Parar")
+            monitorar(destino, max_saltos, metodo, timeout, intervalo, int(janela))
+            return
+
         with st.spinner("Executando traceroute em tempo real..."):
-            hops, erro = contar_saltos(destino, max_saltos)
+            if metodo == "sistema":
+                hops, erro = contar_saltos(destino, max_saltos)
+            else:
+                try:
+                    hops, erro = rastrear(destino, max_saltos, metodo, timeout)
+                except PermissionError as e:
+                    st.info(f"{e} Usando o comando traceroute do sistema.")
+                    hops, erro = contar_saltos(destino, max_saltos)
             
             if erro:
                 st.error(erro)
             elif hops:
                 st.success(f"Traceroute concluído! Número de saltos até {destino}: {len(hops)}")
+                if hops[-1].get("kind") == "timeout":
+                    st.warning(f"O destino não respondeu dentro de {max_saltos} saltos.")
             else:
-                st.warning("Nenhum salto detectado. Verifique o destino ou sua conexão.")
\ No newline at end of file
+                st.warning("Nenhum salto detectado. Verifique o destino ou sua conexão.")
+        st.caption(default_resolver.summary())
+    elif continuo and "mtr_monitor" in st.session_state:
+        # Resultado do último monitoramento (ex: depois de clicar em Parar)
+        monitor = st.session_state.mtr_monitor
+        st.text(f"Monitoramento parado após {monitor.rounds} rodada(s).")
+        tabela = st.empty()
+        st.markdown("**Mudanças de caminho**")
+        mudancas = st.empty()
+        _render_mtr(monitor, st.session_state.mtr_nomes, tabela, mudancas)
\ No newline at end of file
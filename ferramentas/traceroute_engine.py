@@ -0,0 +1,622 @@
+# ferramentas/traceroute_engine.py
+import errno
+import math
+import selectors
+import socket
+import struct
+import time
+from collections import deque
+from typing import NamedTuple, Optional
+
+from ferramentas.ping import ICMP_ECHO, UDP_PROBE_PORT, IcmpProber, resolve
+
+# O traceroute do sistema sonda um TTL por vez e espera cada salto responder
+# (ou estourar o timeout). Aqui as sondagens de todos os TTLs saem de uma vez
+# e as respostas ICMP são correlacionadas de volta a cada sondagem, então o
+# rastreamento termina em cerca de um RTT mais o timeout.
+
+# Constantes de IP_RECVERR (Linux); o módulo socket nem sempre as expõe
+IP_RECVERR = getattr(socket, "IP_RECVERR", 11)
+IPV6_RECVERR = getattr(socket, "IPV6_RECVERR", 25)
+SO_EE_ORIGIN_ICMP = 2
+SO_EE_ORIGIN_ICMP6 = 3
+
+# Tipos ICMP "tempo excedido" e "destino inalcançável" para IPv4 e IPv6
+ICMP_TIME_EXCEEDED = {socket.AF_INET: 11, socket.AF_INET6: 3}
+ICMP_UNREACHABLE = {socket.AF_INET: 3, socket.AF_INET6: 1}
+ICMP_PROTO = {socket.AF_INET: socket.IPPROTO_ICMP, socket.AF_INET6: socket.IPPROTO_ICMPV6}
+
+# Carga das sondagens UDP (o conteúdo não importa, só o cabeçalho é citado no ICMP)
+UDP_PAYLOAD = bytes(32)
+
+class IcmpMessage(NamedTuple):
+    kind: str # "ttl" (tempo excedido), "unreachable" ou "echo" (resposta de eco)
+    proto: int # Protocolo da sondagem citada (ou ICMP, para respostas de eco)
+    key: tuple # (porta de origem, porta de destino) para UDP/TCP; (identificador, sequência) para ICMP
+
+class TraceReply(NamedTuple):
+    ttl: int
+    query: int # Índice da sondagem dentro do salto (0 .. queries-1)
+    source: Optional[str] # IP de quem respondeu, None se ninguém respondeu
+    rtt: Optional[float] # Segundos
+    kind: str # "ttl", "reached" (chegou ao destino), "unreachable" (roteador recusou) ou "timeout"
+
+def parse_icmp(data, family=socket.AF_INET):
+    """
+    Interpreta um pacote lido de um socket raw ICMP.
+
+    Retorna None para mensagens que não interessam ao traceroute. Em IPv4 o
+    pacote começa pelo cabeçalho IP; em IPv6 o kernel entrega só o ICMPv6.
+    """
+    if family == socket.AF_INET:
+        if len(data) < 20:
+            return None
+        data = data[(data[0] & 0x0F) * 4:]
+    if len(data) < 8:
+        return None
+    icmp_type = data[0]
+    if icmp_type == ICMP_ECHO[family][1]:
+        return IcmpMessage("echo", ICMP_PROTO[family], struct.unpack("!HH", data[4:8]))
+    if icmp_type == ICMP_TIME_EXCEEDED[family]:
+        kind = "ttl"
+    elif icmp_type == ICMP_UNREACHABLE[family]:
+        kind = "unreachable"
+    else:
+        return None
+
+    # A mensagem de erro cita o cabeçalho IP da sondagem e os 8 primeiros bytes do seu transporte
+    inner = data[8:]
+    if family == socket.AF_INET:
+        if len(inner) < 20:
+            return None
+        proto = inner[9]
+        inner = inner[(inner[0] & 0x0F) * 4:]
+    else:
+        if len(inner) < 40:
+            return None
+        proto = inner[6] # Próximo cabeçalho; as sondagens não usam cabeçalhos de extensão
+        inner = inner[40:]
+    if len(inner) < 8:
+        return None
+    if proto in (socket.IPPROTO_UDP, socket.IPPROTO_TCP):
+        return IcmpMessage(kind, proto, struct.unpack("!HH", inner[:4]))
+    if proto == ICMP_PROTO[family]:
+        return IcmpMessage(kind, proto, struct.unpack("!HH", inner[4:8]))
+    return None
+
+def _kind(family, icmp_type):
+    return "ttl" if icmp_type == ICMP_TIME_EXCEEDED[family] else "unreachable"
+
+def _set_ttl(sock, family, ttl):
+    if family == socket.AF_INET6:
+        sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_UNICAST_HOPS, ttl)
+    else:
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, ttl)
+
+def _send(send, *args):
+    """
+    Envia uma sondagem por um socket com IP_RECVERR.
+
+    Com IP_RECVERR o kernel reporta no próximo envio o erro ICMP de uma
+    sondagem anterior; esse erro já está na fila de erros, então basta
+    reenviar. Um segundo erro é do próprio envio e é propagado.
+    """
+    try:
+        send(*args)
+    except OSError:
+        send(*args)
+
+def _enable_recverr(sock, family):
+    """Liga IP_RECVERR (só no Linux): os erros ICMP das sondagens vão para a fila de erros do socket."""
+    try:
+        if family == socket.AF_INET6:
+            sock.setsockopt(socket.IPPROTO_IPV6, IPV6_RECVERR, 1)
+        else:
+            sock.setsockopt(socket.IPPROTO_IP, IP_RECVERR, 1)
+        return True
+    except (OSError, AttributeError):
+        return False
+
+def _read_errqueue(sock):
+    """
+    Esvazia a fila de erros (MSG_ERRQUEUE) do socket.
+
+    Retorna uma lista de (destino original, dados originais, tipo ICMP, origem, instante):
+    o kernel devolve o endereço e a carga da sondagem junto com quem enviou o erro.
+    """
+    errors = []
+    while True:
+        try:
+            data, ancdata, _, address = sock.recvmsg(512, 512, socket.MSG_ERRQUEUE | socket.MSG_DONTWAIT)
+        except (BlockingIOError, InterruptedError):
+            return errors
+        received = time.perf_counter()
+        for _, _, cdata in ancdata:
+            if len(cdata) < 16:
+                continue
+            # struct sock_extended_err seguida do endereço de quem gerou o erro (SO_EE_OFFENDER)
+            _, origin, icmp_type, _, _, _, _ = struct.unpack_from("=IBBBBII", cdata)
+            offender = cdata[16:]
+            if origin == SO_EE_ORIGIN_ICMP and len(offender) >= 8:
+                source = socket.inet_ntop(socket.AF_INET, offender[4:8])
+            elif origin == SO_EE_ORIGIN_ICMP6 and len(offender) >= 24:
+                source = socket.inet_ntop(socket.AF_INET6, offender[8:24])
+            else:
+                continue
+            errors.append((address, data, icmp_type, source, received))
+
+class UdpProbes:
+    """Datagramas UDP para portas altas; a porta de destino (porta base + n) identifica a sondagem."""
+
+    method = "udp"
+
+    def __init__(self, ip, family, port=None):
+        self.ip = ip
+        self.family = family
+        self.port = port or UDP_PROBE_PORT
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.sock.bind(("::" if family == socket.AF_INET6 else "0.0.0.0", 0))
+        self.sport = self.sock.getsockname()[1]
+        self.sees_hops = _enable_recverr(self.sock, family)
+
+    def send(self, ttl, n):
+        _set_ttl(self.sock, self.family, ttl)
+        _send(self.sock.sendto, UDP_PAYLOAD, (self.ip, self.port + n))
+
+    def register(self, selector):
+        selector.register(self.sock, selectors.EVENT_READ)
+
+    def read(self, sock):
+        """Respostas que chegaram pelo próprio socket: lista de (n, tipo, origem, instante)."""
+        replies = []
+        if self.sees_hops:
+            for address, _, icmp_type, source, received in _read_errqueue(sock):
+                replies.append((address[1] - self.port, _kind(self.family, icmp_type), source, received))
+        while True:
+            try:
+                _, address = sock.recvfrom(512)
+            except (BlockingIOError, InterruptedError):
+                return replies
+            except OSError:
+                continue # Erro ICMP pendente no socket; os detalhes vêm da fila de erros
+            # O destino respondeu na porta UDP
+            replies.append((address[1] - self.port, "reached", address[0], time.perf_counter()))
+
+    def match(self, message):
+        """n da sondagem citada em uma mensagem lida do socket raw, ou None."""
+        if message.proto != socket.IPPROTO_UDP or message.key[0] != self.sport:
+            return None
+        return message.key[1] - self.port
+
+    def close(self):
+        self.sock.close()
+
+class IcmpProbes:
+    """Requisições de eco ICMP; a sequência identifica a sondagem."""
+
+    method = "icmp"
+
+    def __init__(self, ip, family, port=None):
+        self.ip = ip
+        self.family = family
+        self.prober = IcmpProber(ip, family, 0)
+        self.sock = self.prober.sock
+        self.sock.setblocking(False)
+        # Socket raw recebe os erros ICMP diretamente; o de datagrama depende de IP_RECVERR
+        self.errqueue = not self.prober.raw and _enable_recverr(self.sock, family)
+        self.sees_hops = self.prober.raw or self.errqueue
+
+    def send(self, ttl, n):
+        _set_ttl(self.sock, self.family, ttl)
+        _send(self.prober.send, n)
+
+    def register(self, selector):
+        selector.register(self.sock, selectors.EVENT_READ)
+
+    def read(self, sock):
+        replies = []
+        if self.errqueue:
+            for _, data, icmp_type, source, received in _read_errqueue(sock):
+                if len(data) >= 8: # A carga devolvida é a requisição de eco original
+                    replies.append((struct.unpack_from("!H", data, 6)[0], _kind(self.family, icmp_type),
+                                    source, received))
+        while True:
+            try:
+                data, address = sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return replies
+            except OSError:
+                continue
+            received = time.perf_counter()
+            source = address[0].split("%")[0]
+            seq = self.prober._parse(data)
+            if seq is not None:
+                replies.append((seq, "reached", source, received))
+            elif self.prober.raw:
+                message = parse_icmp(data, self.family)
+                n = self.match(message) if message is not None else None
+                if n is not None:
+                    replies.append((n, message.kind, source, received))
+
+    def match(self, message):
+        if message.kind == "echo" or message.proto != ICMP_PROTO[self.family] or message.key[0] != self.prober.ident:
+            return None
+        return message.key[1]
+
+    def close(self):
+        self.prober.close()
+
+class TcpProbes:
+    """
+    Um connect() TCP não bloqueante por sondagem; a porta de origem identifica a sondagem.
+
+    O connect só revela o destino (conexão aceita ou recusada): os saltos
+    intermediários exigem um socket raw ICMP (root/administrador).
+    """
+
+    method = "tcp"
+    sees_hops = False
+
+    def __init__(self, ip, family, port=None):
+        self.ip = ip
+        self.family = family
+        self.port = port or 80
+        self.pending = {} # socket -> n
+        self.by_port = {} # porta de origem -> n
+        self.selector = None
+
+    def send(self, ttl, n):
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        _set_ttl(sock, self.family, ttl)
+        error = sock.connect_ex((self.ip, self.port))
+        if error not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            sock.close()
+            return
+        self.pending[sock] = n
+        self.by_port[sock.getsockname()[1]] = n
+
+    def register(self, selector):
+        self.selector = selector
+        for sock in self.pending:
+            selector.register(sock, selectors.EVENT_WRITE)
+
+    def read(self, sock):
+        received = time.perf_counter()
+        n = self.pending.pop(sock)
+        error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        self.selector.unregister(sock)
+        sock.close()
+        # Conexão aceita ou RST: a sondagem chegou ao destino
+        if error in (0, errno.ECONNREFUSED):
+            return [(n, "reached", self.ip, received)]
+        return []
+
+    def match(self, message):
+        if message.proto != socket.IPPROTO_TCP or message.key[1] != self.port:
+            return None
+        return self.by_port.get(message.key[0])
+
+    def close(self):
+        for sock in self.pending:
+            sock.close()
+        self.pending.clear()
+
+PROBES = {"udp": UdpProbes, "icmp": IcmpProbes, "tcp": TcpProbes}
+
+def open_listener(family):
+    """Socket raw ICMP que recebe os erros de todos os roteadores (requer root/administrador)."""
+    sock = socket.socket(family, socket.SOCK_RAW, ICMP_PROTO[family])
+    sock.setblocking(False)
+    return sock
+
+def _read_listener(listener, probes):
+    replies = []
+    while True:
+        try:
+            data, address = listener.recvfrom(2048)
+        except (BlockingIOError, InterruptedError):
+            return replies
+        received = time.perf_counter()
+        message = parse_icmp(data, probes.family)
+        n = probes.match(message) if message is not None else None
+        if n is not None:
+            kind = "reached" if message.kind == "echo" else message.kind
+            replies.append((n, kind, address[0].split("%")[0], received))
+
+def open_probes(ip, family, method="auto", port=None):
+    """
+    Cria as sondagens do `method` ("auto" = UDP) e, quando elas não
+    enxergam os saltos sozinhas, o socket raw ICMP de escuta.
+
+    Levanta PermissionError se não houver como receber os erros ICMP (fora
+    do Linux sem privilégios); nesse caso resta o traceroute do sistema.
+    """
+    probes = PROBES["udp" if method == "auto" else method](ip, family, port)
+    listener = None
+    if not probes.sees_hops:
+        try:
+            listener = open_listener(family)
+        except PermissionError:
+            probes.close()
+            raise PermissionError(f"O traceroute {probes.method.upper()} precisa de socket raw ICMP "
+                                  "(root/administrador) neste sistema.") from None
+    return probes, listener
+
+def trace_probes(probes, listener=None, max_hops=30, queries=3, timeout=2.0, first_ttl=1):
+    """
+    Envia as sondagens de todos os TTLs e gera um TraceReply por resposta, na ordem de chegada.
+
+    Termina quando todas as sondagens até o destino responderam ou `timeout`
+    s depois do último envio; as que ficaram sem resposta saem no fim como "timeout".
+    As sondagens além do destino (que também chegam a ele) são descartadas.
+    """
+    selector = selectors.DefaultSelector()
+    pending = {} # n -> (ttl, consulta, instante do envio)
+    try:
+        # Em ordem de TTL: o destino recebe também as sondagens dos TTLs maiores
+        # e limita os ICMP que gera (net.ipv4.icmp_msgs_burst no Linux); assim as
+        # sondagens que chegam primeiro, e são respondidas, são as do salto dele
+        n = 0
+        for ttl in range(first_ttl, max_hops + 1):
+            for query in range(queries):
+                pending[n] = (ttl, query, time.perf_counter())
+                probes.send(ttl, n)
+                n += 1
+        probes.register(selector)
+        if listener is not None:
+            selector.register(listener, selectors.EVENT_READ)
+
+        deadline = time.perf_counter() + timeout
+        final_ttl = None
+        while pending:
+            if final_ttl is not None and all(ttl > final_ttl for ttl, _, _ in pending.values()):
+                break
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            for key, _ in selector.select(remaining):
+                if key.fileobj is listener:
+                    replies = _read_listener(listener, probes)
+                else:
+                    replies = probes.read(key.fileobj)
+                for n, kind, source, received in replies:
+                    probe = pending.pop(n, None)
+                    if probe is None: # Duplicada ou de outro processo
+                        continue
+                    ttl, query, sent = probe
+                    if kind == "unreachable" and source == probes.ip:
+                        kind = "reached" # Ex: porta UDP fechada no destino
+                    if kind != "ttl":
+                        final_ttl = ttl if final_ttl is None else min(final_ttl, ttl)
+                    if final_ttl is None or ttl <= final_ttl:
+                        yield TraceReply(ttl, query, source, received - sent, kind)
+
+        for ttl, query, _ in sorted(pending.values()):
+            if final_ttl is None or ttl <= final_ttl:
+                yield TraceReply(ttl, query, None, None, "timeout")
+    finally:
+        selector.close()
+
+def trace_stream(ip, family, max_hops=30, queries=3, timeout=2.0, method="auto", port=None):
+    """
+    Gerador de TraceReply para o destino `ip`; os sockets são fechados ao terminar.
+
+    A criação das sondagens acontece antes da primeira iteração, então
+    PermissionError (ver `open_probes`) é levantado já na chamada.
+    """
+    probes, listener = open_probes(ip, family, method, port)
+
+    def stream():
+        try:
+            yield from trace_probes(probes, listener, max_hops, queries, timeout)
+        finally:
+            probes.close()
+            if listener is not None:
+                listener.close()
+
+    return stream()
+
+def collect_hops(replies, queries=3):
+    """
+    Agrupa TraceReply por salto: lista ordenada por TTL de dicts com ttl,
+    ips (na ordem em que responderam), rtts_ms (um por consulta, None = sem
+    resposta) e kind (o do salto final, "ttl" nos intermediários).
+    """
+    hops = {}
+    final_ttl = None
+    for reply in replies:
+        hop = hops.setdefault(reply.ttl, {"ttl": reply.ttl, "ips": [], "rtts_ms": [None] * queries, "kind": "timeout"})
+        if reply.source is not None:
+            if reply.source not in hop["ips"]:
+                hop["ips"].append(reply.source)
+            hop["rtts_ms"][reply.query] = reply.rtt * 1000
+            if hop["kind"] in ("timeout", "ttl"):
+                hop["kind"] = reply.kind
+        if reply.kind in ("reached", "unreachable"):
+            final_ttl = reply.ttl if final_ttl is None else min(final_ttl, reply.ttl)
+    return [hops[ttl] for ttl in sorted(hops) if final_ttl is None or ttl <= final_ttl]
+
+def traceroute(host, max_hops=30, queries=3, timeout=2.0, method="auto", port=None):
+    """
+    Rastreia a rota até `host` sem o comando traceroute.
+
+    Retorna dict com host, ip, method, reached (se o destino respondeu) e
+    hops (ver `collect_hops`). Levanta socket.gaierror se o host não resolver
+    e PermissionError se o método não puder ser usado.
+    """
+    family, ip = resolve(host)
+    stream = trace_stream(ip, family, max_hops, queries, timeout, method, port)
+    hops = collect_hops(stream, queries)
+    return {
+        "host": host,
+        "ip": ip,
+        "method": "udp" if method == "auto" else method,
+        "reached": bool(hops) and hops[-1]["kind"] == "reached",
+        "hops": hops,
+    }
+
+
+class HopStats:
+    """
+    Estatísticas móveis de um salto sobre as últimas `window` sondagens.
+
+    Cada amostra entra e sai das somas (e das filas monotônicas de mínimo e
+    máximo) uma única vez, então atualizar custa O(1) amortizado e a memória
+    fica limitada à janela, por mais que o monitoramento dure.
+    """
+
+    def __init__(self, window=100):
+        self.window = window
+        self.samples = deque() # RTTs em ms da janela, None = perdido
+        self.sent = 0 # Sondagens desde o início, inclusive as que já saíram da janela
+        self.received = 0 # Respostas dentro da janela
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min_queue = deque() # (índice, rtt) com rtt crescente: a frente é o mínimo da janela
+        self.max_queue = deque() # (índice, rtt) com rtt decrescente: a frente é o máximo
+        self.last = None
+        self.ip = None
+        self.recent_ips = deque(maxlen=4) # IPs vistos por último (balanceamento de carga alterna entre eles)
+
+    def add(self, rtt_ms):
+        index = self.sent
+        self.sent += 1
+        self.samples.append(rtt_ms)
+        if rtt_ms is not None:
+            self.last = rtt_ms
+            self.received += 1
+            self.total += rtt_ms
+            self.total_sq += rtt_ms * rtt_ms
+            while self.min_queue and self.min_queue[-1][1] >= rtt_ms:
+                self.min_queue.pop()
+            self.min_queue.append((index, rtt_ms))
+            while self.max_queue and self.max_queue[-1][1] <= rtt_ms:
+                self.max_queue.pop()
+            self.max_queue.append((index, rtt_ms))
+
+        if len(self.samples) > self.window:
+            old = self.samples.popleft()
+            if old is not None:
+                self.received -= 1
+                self.total -= old
+                self.total_sq -= old * old
+            start = self.sent - self.window
+            while self.min_queue and self.min_queue[0][0] < start:
+                self.min_queue.popleft()
+            while self.max_queue and self.max_queue[0][0] < start:
+                self.max_queue.popleft()
+            if self.sent % self.window == 0:
+                # Somar e subtrair por horas acumula erro de arredondamento; uma
+                # soma exata a cada janela completa mantém o custo O(1) amortizado
+                received = [r for r in self.samples if r is not None]
+                self.total = math.fsum(received)
+                self.total_sq = math.fsum(r * r for r in received)
+
+    def see(self, ip):
+        """Registra quem respondeu; True se o IP é novo para o salto (mudança de caminho)."""
+        changed = self.ip is not None and ip not in self.recent_ips
+        self.ip = ip
+        if ip in self.recent_ips:
+            self.recent_ips.remove(ip)
+        self.recent_ips.append(ip)
+        return changed
+
+    @property
+    def loss_pct(self):
+        return 100.0 * (1 - self.received / len(self.samples)) if self.samples else 0.0
+
+    @property
+    def avg(self):
+        return self.total / self.received if self.received else None
+
+    @property
+    def best(self):
+        return self.min_queue[0][1] if self.min_queue else None
+
+    @property
+    def worst(self):
+        return self.max_queue[0][1] if self.max_queue else None
+
+    @property
+    def stddev(self):
+        if not self.received:
+            return None
+        mean = self.total / self.received
+        return math.sqrt(max(0.0, self.total_sq / self.received - mean * mean))
+
+class PathChange(NamedTuple):
+    timestamp: float # Epoch
+    ttl: int
+    old_ip: Optional[str] # None quando o salto passou a existir (o caminho ficou mais longo)
+    new_ip: Optional[str] # None quando o salto deixou de existir
+
+class PathMonitor:
+    """
+    Estado de um traceroute contínuo (estilo MTR): um HopStats por salto e
+    as últimas mudanças de caminho, ambos de tamanho limitado.
+    """
+
+    def __init__(self, window=100, max_changes=200):
+        self.window = window
+        self.hops = {} # ttl -> HopStats
+        self.changes = deque(maxlen=max_changes)
+        self.rounds = 0
+
+    def update(self, replies):
+        """Incorpora uma rodada de TraceReply (uma consulta por TTL); retorna as mudanças de caminho dela."""
+        now = time.time()
+        changes = []
+        replies = sorted(replies)
+        final_ttl = min((r.ttl for r in replies if r.kind in ("reached", "unreachable")), default=None)
+        reached = final_ttl is not None
+        if not reached:
+            # O destino não respondeu nesta rodada: considera até o salto mais
+            # distante que já respondeu, sem descartar os que ficaram em silêncio
+            final_ttl = max([r.ttl for r in replies if r.source is not None] + list(self.hops), default=0)
+        for reply in replies:
+            if reply.ttl > final_ttl:
+                continue
+            hop = self.hops.get(reply.ttl)
+            if hop is None:
+                hop = self.hops[reply.ttl] = HopStats(self.window)
+                if self.rounds and reply.source is not None:
+                    changes.append(PathChange(now, reply.ttl, None, reply.source))
+            hop.add(reply.rtt * 1000 if reply.rtt is not None else None)
+            if reply.source is not None:
+                old_ip = hop.ip
+                if hop.see(reply.source):
+                    changes.append(PathChange(now, reply.ttl, old_ip, reply.source))
+        if reached:
+            # O destino ficou mais perto: os saltos além dele deixaram de existir
+            for ttl in [t for t in self.hops if t > final_ttl]:
+                changes.append(PathChange(now, ttl, self.hops.pop(ttl).ip, None))
+        self.rounds += 1
+        self.changes.extend(changes)
+        return changes
+
+def monitor_path(ip, family, max_hops=30, interval=1.0, timeout=2.0, method="auto", port=None,
+                 window=100, monitor=None):
+    """
+    Traceroute contínuo: a cada `interval` s sonda todos os saltos de novo
+    (uma consulta por TTL) e gera (monitor, mudanças da rodada).
+
+    Não termina sozinho; o consumidor para quando quiser. Cada rodada abre
+    sockets novos, então respostas atrasadas de uma rodada não se misturam à seguinte.
+    """
+    monitor = monitor or PathMonitor(window)
+    # Falha já na chamada se o método não puder ser usado
+    probes, listener = open_probes(ip, family, method, port)
+    probes.close()
+    if listener is not None:
+        listener.close()
+
+    def rounds():
+        while True:
+            started = time.perf_counter()
+            replies = list(trace_stream(ip, family, max_hops, 1, timeout, method, port))
+            yield monitor, monitor.update(replies)
+            time.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+    return rounds()
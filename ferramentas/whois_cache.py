@@ -0,0 +1,227 @@
+# ferramentas/whois_cache.py
+import datetime
+import ipaddress
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import NamedTuple, Optional
+
+import whois
+from whois.exceptions import UnknownTldError, WhoisDomainNotFoundError, WhoisQuotaExceededError
+
+HOUR, DAY = 3600, 86400
+
+# Validade das respostas, pela idade do registro: domínios novos mudam com
+# frequência (DNS, registrante), os antigos quase nunca
+NEW_DOMAIN_AGE = 30 * DAY
+NEW_DOMAIN_TTL = HOUR
+YOUNG_DOMAIN_AGE = 365 * DAY
+YOUNG_DOMAIN_TTL = DAY
+OLD_DOMAIN_TTL = 7 * DAY
+RECENT_UPDATE = 7 * DAY # Registro alterado há pouco: validade de no máximo YOUNG_DOMAIN_TTL
+MIN_TTL = HOUR
+
+# Validade das falhas (cache negativo)
+NOT_FOUND_TTL = HOUR # Domínio não registrado ou TLD sem servidor WHOIS
+QUOTA_TTL = 15 * 60 # O servidor WHOIS recusou por limite de consultas
+ERROR_TTL = 5 * 60 # Falhas de rede e respostas vazias
+
+class WhoisResult(NamedTuple):
+    key: str # Domínio registrado (ou IP) usado como chave
+    record: Optional[dict] # Campos do WHOIS; None em falhas
+    error: Optional[str]
+    not_found: bool # Falha definitiva: domínio não registrado
+    fetched_at: float
+    expires_at: float
+    cached: bool # Veio do cache, sem consultar o servidor WHOIS
+
+def normalize(target):
+    """
+    Chave do cache para um domínio, URL ou IP.
+
+    IPs ficam na forma canônica; domínios e URLs viram o domínio registrado
+    (ex: "https://www.Google.com.br/x" → "google.com.br"), que é o que o
+    python-whois consulta de fato.
+    """
+    target = target.strip().rstrip(".")
+    try:
+        return ipaddress.ip_address(target).compressed
+    except ValueError:
+        pass
+    return whois.extract_domain(target).encode("idna").decode("ascii")
+
+def _dates(value):
+    values = value if isinstance(value, list) else [value]
+    return [v.timestamp() for v in values if isinstance(v, datetime.datetime)]
+
+def record_ttl(record, now=None):
+    """Validade (s) de um registro WHOIS, pela idade do domínio, pela última alteração e pela expiração."""
+    now = time.time() if now is None else now
+    created, updated, expires = (_dates(record.get(field)) for field in
+                                 ("creation_date", "updated_date", "expiration_date"))
+    if not created:
+        ttl = YOUNG_DOMAIN_TTL
+    elif now - min(created) < NEW_DOMAIN_AGE:
+        ttl = NEW_DOMAIN_TTL
+    elif now - min(created) < YOUNG_DOMAIN_AGE:
+        ttl = YOUNG_DOMAIN_TTL
+    else:
+        ttl = OLD_DOMAIN_TTL
+    if updated and now - max(updated) < RECENT_UPDATE:
+        ttl = min(ttl, YOUNG_DOMAIN_TTL)
+    if expires:
+        ttl = min(ttl, min(expires) - now) # A renovação vai alterar o registro
+    return max(ttl, MIN_TTL)
+
+def _encode(value):
+    if isinstance(value, datetime.datetime):
+        return {"$datetime": value.isoformat()}
+    return str(value)
+
+def _decode(obj):
+    if "$datetime" in obj:
+        return datetime.datetime.fromisoformat(obj["$datetime"])
+    return obj
+
+class WhoisCache:
+    """
+    Cache persistente (SQLite) das consultas WHOIS.
+
+    As respostas ficam em `whois_cache` pela chave de `normalize`, com
+    validade de `record_ttl`. Falhas também são guardadas, por menos tempo
+    (`NOT_FOUND_TTL`, `QUOTA_TTL`, `ERROR_TTL`), para que repetir uma
+    consulta que falhou não bata de novo no servidor e piore o bloqueio por
+    limite de consultas. Acima de `max_entries` entradas, saem primeiro as
+    vencidas e depois as usadas há mais tempo. Consultas simultâneas à
+    mesma chave aguardam a mesma consulta ao servidor.
+    """
+
+    def __init__(self, path="whois_cache.db", max_entries=5000, query=whois.whois):
+        self.max_entries = max_entries
+        self.query = query
+        # check_same_thread=False: usado por todas as sessões; o lock serializa o acesso à conexão
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS whois_cache (
+                    key TEXT PRIMARY KEY,
+                    record TEXT,
+                    error TEXT,
+                    not_found INTEGER,
+                    fetched_at REAL,
+                    expires_at REAL,
+                    last_access REAL
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_whois_cache_last_access ON whois_cache (last_access);
+            """)
+        self._pending = {} # chave -> Future das consultas em andamento
+        self.hits = 0 # Respostas do cache
+        self.negative_hits = 0 # Das quais, falhas guardadas
+        self.misses = 0 # Consultas ao servidor WHOIS
+        self.refreshes = 0 # Consultas forçadas pelo usuário
+        self.evictions = 0
+
+    def lookup(self, target, refresh=False, query=None):
+        """
+        WhoisResult de `target`; com `refresh`, ignora o cache e consulta o servidor.
+
+        `query` substitui a consulta ao servidor só nesta chamada (ex: com
+        limite de taxa e novas tentativas); respostas do cache não a chamam.
+        """
+        key = normalize(target)
+        now = time.time()
+        with self.lock:
+            if not refresh:
+                row = self.conn.execute("SELECT record, error, not_found, fetched_at, expires_at FROM whois_cache "
+                                        "WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+                if row is not None:
+                    with self.conn:
+                        self.conn.execute("UPDATE whois_cache SET last_access = ? WHERE key = ?", (now, key))
+                    self.hits += 1
+                    self.negative_hits += row[0] is None
+                    record = json.loads(row[0], object_hook=_decode) if row[0] is not None else None
+                    return WhoisResult(key, record, row[1], bool(row[2]), row[3], row[4], True)
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+                self.misses += 1
+                self.refreshes += refresh
+            else:
+                self.hits += 1 # Aguarda a consulta que já está em andamento
+        if not owner:
+            return future.result()
+        try:
+            result = self._fetch(key, query or self.query)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self._pending.pop(key, None)
+
+    def _fetch(self, key, query):
+        now = time.time()
+        record, error, not_found = None, None, False
+        try:
+            record = dict(query(key))
+            if not record.get("domain_name") and not record.get("registrar"):
+                # Alguns TLDs respondem "não encontrado" sem que o parser levante exceção
+                record, error, not_found, ttl = None, "Domínio não registrado", True, NOT_FOUND_TTL
+            else:
+                ttl = record_ttl(record, now)
+        except WhoisDomainNotFoundError:
+            error, not_found, ttl = "Domínio não registrado", True, NOT_FOUND_TTL
+        except UnknownTldError as e:
+            error, not_found, ttl = str(e), True, NOT_FOUND_TTL
+        except WhoisQuotaExceededError:
+            error, ttl = "Limite de consultas do servidor WHOIS excedido", QUOTA_TTL
+        except Exception as e:
+            error, ttl = str(e) or type(e).__name__, ERROR_TTL
+
+        data = json.dumps(record, default=_encode) if record is not None else None
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO whois_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              (key, data, error, not_found, now, now + ttl, now))
+            excess = self.conn.execute("SELECT COUNT(*) FROM whois_cache").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self.conn.execute("""
+                    DELETE FROM whois_cache WHERE key IN (
+                        SELECT key FROM whois_cache ORDER BY expires_at > ?, last_access LIMIT ?
+                    )
+                """, (now, excess))
+                self.evictions += excess
+        return WhoisResult(key, record, error, not_found, now, now + ttl, False)
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM whois_cache")
+
+    def stats(self):
+        with self.lock:
+            entries, negative = self.conn.execute(
+                "SELECT COUNT(*), COUNT(*) - COUNT(record) FROM whois_cache").fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+            "negative_entries": negative,
+        }
+
+    def summary(self):
+        """Resumo do cache para exibir na página."""
+        stats = self.stats()
+        return (f"Cache WHOIS: {stats['hit_rate']:.0%} de acertos ({stats['hits']} do cache, dos quais "
+                f"{stats['negative_hits']} falhas guardadas; {stats['misses']} consultas ao servidor, "
+                f"{stats['refreshes']} forçadas). {stats['entries']} domínios guardados "
+                f"({stats['negative_entries']} falhas), {stats['evictions']} descartados por limite de tamanho.")
@@ -1,9 +1,23 @@
 import streamlit as st
-import whois  
+import pandas as pd
 import requests
 import certifi
 import urllib3
 import datetime
+import ipaddress
+import itertools
+import queue
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from whois.exceptions import UnknownTldError, WhoisDomainNotFoundError
+from whois.whois import NICClient
+from ferramentas.live_ui import LiveTable, ThrottledProgress
+from ferramentas.resolver import default_resolver
+from ferramentas.whois_cache import WhoisCache, normalize
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -51,79 +65,457 @@ def format_date(date_obj):
         return date_obj.strftime("%Y-%m-%d %H:%M:%S %Z").strip()
     return "N/A"
 
+_cache = None
+_cache_lock = threading.Lock()
+
+def whois_cache():
+    """Cache WHOIS do processo, compartilhado por todas as sessões."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = WhoisCache()
+        return _cache
+
+def _join(value):
+    # O python-whois devolve uma string quando há um único valor e uma lista quando há vários
+    if not value:
+        return "N/A"
+    return value if isinstance(value, str) else ", ".join(value)
+
+def _hora(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp).strftime("%d/%m/%Y %H:%M")
+
+# Limites das consultas, valem para o processo todo (todas as sessões)
+WHOIS_RATE = 2.0 # Consultas por segundo a cada servidor WHOIS
+API_RATES = {"ipinfo.io": 10.0, "dns.google": 10.0} # Consultas por segundo a cada API
+MAX_BACKOFF = 16 # Depois de falhas seguidas, o intervalo entre consultas chega a até 16x o normal
+BULK_RETRIES = 2 # Novas tentativas de falhas temporárias no modo em lote
+BULK_WORKERS = 32 # Consultas WHOIS (e, à parte, de localização) simultâneas no modo em lote
+BULK_COLUMNS = ["Alvo", "Domínio", "Registrar", "Criado em", "Expira em", "WHOIS",
+                "IP", "País", "Região", "Cidade", "Organização"]
+
+class _KeyedRateLimiter:
+    """
+    Limita as consultas por segundo de cada chave (um servidor WHOIS, uma API).
+
+    Cada consulta reserva o próximo horário livre da sua chave antes de
+    dormir, como o `_RateLimiter` do Verificador de Portas, mas entre
+    threads. Falhas dobram o intervalo daquela chave (até `MAX_BACKOFF`
+    vezes) e sucessos o reduzem pela metade, então um servidor que começa a
+    recusar consultas é poupado por todas as threads ao mesmo tempo.
+    """
+
+    def __init__(self, rate, rates=None):
+        self.rate = rate
+        self.rates = rates or {}
+        self._lock = threading.Lock()
+        self._next_slot = {}
+        self._backoff = {}
+
+    def _interval(self, key):
+        return self._backoff.get(key, 1) / self.rates.get(key, self.rate)
+
+    def acquire(self, key):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(key, now))
+            self._next_slot[key] = slot + self._interval(key)
+        if slot > now:
+            time.sleep(slot - now)
+
+    def failure(self, key):
+        with self._lock:
+            self._backoff[key] = min(self._backoff.get(key, 1) * 2, MAX_BACKOFF)
+            self._next_slot[key] = max(self._next_slot.get(key, 0.0), time.monotonic() + self._interval(key))
+
+    def success(self, key):
+        with self._lock:
+            if self._backoff.get(key, 1) > 1:
+                self._backoff[key] /= 2
+
+_whois_limiter = _KeyedRateLimiter(WHOIS_RATE)
+_api_limiter = _KeyedRateLimiter(1.0, API_RATES)
+
+def _call_limited(limiter, key, call, retries=0, definitive=()):
+    """Chama `call` dentro do limite de `key`, tentando de novo até `retries` vezes em falhas não definitivas."""
+    for attempt in itertools.count():
+        limiter.acquire(key)
+        try:
+            result = call()
+        except definitive:
+            limiter.success(key) # O servidor respondeu
+            raise
+        except Exception:
+            limiter.failure(key)
+            if attempt >= retries:
+                raise
+            continue
+        limiter.success(key)
+        return result
+
+def _registry(key):
+    """Registro responsável pela chave do cache WHOIS: o TLD do domínio, ou "IP"."""
+    try:
+        ipaddress.ip_address(key)
+        return "IP"
+    except ValueError:
+        return key.rsplit(".", 1)[-1]
+
+IANA_HOST = "whois.iana.org"
+
+class _ServerChooser(NICClient):
+    """
+    `choose_server` do python-whois, com a consulta à IANA (TLDs sem servidor conhecido) guardada por TLD.
+
+    Threads que pedem o mesmo TLD ao mesmo tempo aguardam a mesma consulta,
+    e as consultas à IANA passam pelo limite de taxa do servidor WHOIS
+    (chave `IANA_HOST`), como as demais.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._iana = {} # TLD -> Future com o servidor WHOIS
+        self._lock = threading.Lock()
+
+    def findwhois_iana(self, tld):
+        with self._lock:
+            future = self._iana.get(tld)
+            owner = future is None
+            if owner:
+                future = self._iana[tld] = Future()
+        if not owner:
+            return future.result()
+        try:
+            server = _call_limited(_whois_limiter, IANA_HOST, partial(super().findwhois_iana, tld))
+        except BaseException as e:
+            with self._lock:
+                del self._iana[tld] # Falhas de rede não ficam guardadas
+            future.set_exception(e)
+            raise
+        future.set_result(server)
+        return server
+
+_server_chooser = _ServerChooser()
+
+def _whois_server(key):
+    """
+    Servidor WHOIS que o python-whois consulta primeiro para a chave, usado no limite de taxa.
+
+    Vários TLDs dividem o mesmo servidor (ex: os da Identity Digital e os da
+    CentralNic), então o limite vale por servidor e não por TLD. IPs ficam
+    juntos em "IP"; sem resposta da IANA, a chave é o TLD.
+    """
+    registry = _registry(key)
+    if registry == "IP":
+        return registry
+    try:
+        return _server_chooser.choose_server(key) or registry
+    except OSError:
+        return registry
+
+def _whois_query(key, retries=0):
+    # Só chamada nas faltas do cache: respostas do cache não gastam o limite do servidor
+    return _call_limited(_whois_limiter, _whois_server(key), partial(whois_cache().query, key), retries,
+                         definitive=(WhoisDomainNotFoundError, UnknownTldError))
+
+def _dns_google(alvo):
+    """IP do alvo pela API DNS do Google: (ip ou None, aviso ou None)."""
+    url_dns_google = f"https://dns.google/resolve?name={alvo}&type=A"
+    aviso = None
+    try:
+        ip_resp = requests.get(url_dns_google, timeout=5, verify=certifi.where())
+    except requests.exceptions.SSLError:
+        aviso = "Falha na verificação SSL para dns.google. Tentando sem verificação (não recomendado para produção)."
+        ip_resp = requests.get(url_dns_google, timeout=5, verify=False)
+    ip_resp.raise_for_status()
+    ip_json = ip_resp.json()
+    if ip_json and "Answer" in ip_json and ip_json["Answer"]:
+        return ip_json["Answer"][0]["data"], aviso
+    return None, aviso
+
+def _ipinfo(ip, retries=0):
+    def call():
+        geo = get_ipinfo(ip)
+        if not geo.get("Sucesso"):
+            raise RuntimeError(geo.get("Erro", "Desconhecido"))
+        return geo
+    try:
+        return _call_limited(_api_limiter, "ipinfo.io", call, retries)
+    except RuntimeError as e:
+        return {"Sucesso": False, "Erro": str(e)}
+
+def _locate(alvo, retries=0, geo=None):
+    """
+    Etapas de DNS e localização de um alvo, independentes do WHOIS.
+
+    Retorna um dict com "ip", "avisos", "erro" (falha na consulta ao DNS do
+    Google) e "geo" (o dict de `get_ipinfo`). `geo` substitui a consulta ao
+    ipinfo.io (ex: memorizada por IP).
+    """
+    info = {"ip": None, "avisos": [], "erro": None, "geo": None}
+    try:
+        # DNS do sistema primeiro, pelo cache compartilhado com as outras ferramentas
+        info["ip"] = default_resolver.forward(alvo, socket.AF_INET)[1]
+    except (OSError, ValueError): # ValueError: nome malformado, ex: "a..b"
+        try:
+            info["ip"], aviso = _call_limited(_api_limiter, "dns.google", partial(_dns_google, alvo), retries)
+            if aviso:
+                info["avisos"].append(aviso)
+        except Exception as e:
+            info["erro"] = f"Erro ao resolver IP via DNS Google: {e}"
+    if info["ip"]:
+        info["geo"] = (geo or partial(_ipinfo, retries=retries))(info["ip"])
+    return info
+
+def _show_whois(resultado):
+    if resultado.record is None:
+        st.error(f"Erro na consulta WHOIS: {resultado.error}")
+    else:
+        w = resultado.record
+        st.write(f"**Domínio**: {resultado.key}")
+        st.write(f"**Registrar**: {w.get('registrar') or 'N/A'}")
+
+        creation_date = format_date(w.get("creation_date"))
+        updated_date = format_date(w.get("updated_date"))
+        expiration_date = format_date(w.get("expiration_date"))
+
+        st.write(f"**Criado em**: {creation_date}")
+        st.write(f"**Atualizado em**: {updated_date}")
+        st.write(f"**Expira em**: {expiration_date}")
+        st.write(f"**Registrante**: {w.get('name') or 'N/A'}")
+        st.write(f"**Email(s)**: {_join(w.get('emails'))}")
+        st.write(f"**Servidores DNS**: {_join(w.get('name_servers'))}")
+
+        status = w.get("status")
+        if status:
+            st.write("**Status:**")
+            for status_item in ([status] if isinstance(status, str) else status):
+                st.write(f"- {status_item}")
+        else:
+            st.write("**Status**: N/A")
+
+    origem = "do cache" if resultado.cached else "do servidor WHOIS"
+    st.caption(f"Resposta {origem}, obtida em {_hora(resultado.fetched_at)} e válida até "
+               f"{_hora(resultado.expires_at)}.")
+
+def _show_location(alvo, info):
+    for aviso in info["avisos"]:
+        st.warning(aviso)
+    if info["ip"]:
+        st.info(f"**IP Resolvido para {alvo}:** {info['ip']}")
+    elif info["erro"]:
+        st.error(info["erro"])
+    else:
+        st.warning(f"Não foi possível resolver o IP para o domínio: {alvo}")
+    st.caption(default_resolver.summary())
+
+    geo = info["geo"]
+    if geo is None:
+        st.info("Não foi possível realizar a consulta de localização sem um IP resolvido.")
+    elif geo.get("Sucesso"):
+        col1, col2, col3 = st.columns(3)
+        col1.metric("País", geo["País"])
+        col2.metric("Região", geo["Região"])
+        col3.metric("Cidade", geo["Cidade"])
+
+        st.markdown(f"**ISP / Organização:** {geo['Organização']}")
+        st.markdown(f"**Hostname:** {geo['Hostname']}")
+        if "Aviso" in geo:
+            st.warning(geo["Aviso"])
+    else:
+        st.warning(f"Não foi possível obter dados de localização para o IP {info['ip']}. Erro: {geo.get('Erro', 'Desconhecido')}")
+
+def _single_lookup(alvo, atualizar):
+    """Consulta um alvo: o WHOIS e a sequência DNS → localização rodam ao mesmo tempo."""
+    cache = whois_cache()
+    with st.spinner("Consultando informações..."), ThreadPoolExecutor(max_workers=2) as executor:
+        whois_future = executor.submit(cache.lookup, alvo, atualizar, _whois_query)
+        locate_future = executor.submit(_locate, alvo)
+
+        # Dados WHOIS
+        st.subheader("📑 Informações WHOIS")
+        try:
+            _show_whois(whois_future.result())
+        except Exception as e:
+            st.error(f"Erro na consulta WHOIS: {e}")
+        st.caption(cache.summary())
+
+        st.markdown("---") # Separator for better readability
+
+        # Dados geográficos via IP
+        st.subheader("🌎 Localização do IP/Domínio")
+        try:
+            _show_location(alvo, locate_future.result())
+        except Exception as e:
+            st.error(f"Erro na consulta de localização: {e}")
+
+def parse_targets(lines):
+    """Alvos de uma lista (um por linha; de CSV, a primeira coluna; de URLs, o host), sem repetidos nem cabeçalho."""
+    targets = OrderedDict()
+    for line in lines:
+        token = line.replace(";", ",").split(",")[0].strip().strip('"')
+        token = token.split("://", 1)[-1].split("/", 1)[0] # URL: só o host
+        if not token or token.startswith("#"):
+            continue
+        if "." not in token and ":" not in token: # Cabeçalho ("dominio") ou nome sem domínio
+            continue
+        targets[token] = None
+    return list(targets)
+
+def _interleave_by_registry(targets):
+    """
+    Alterna os alvos entre os registros, para que um registro lento não segure os outros na fila.
+
+    Agrupa pelo TLD, que não exige consultar a IANA antes de começar; o
+    limite de taxa, feito nas threads, é que usa o servidor de cada TLD.
+    """
+    groups = OrderedDict()
+    for alvo in targets:
+        try:
+            registry = _registry(normalize(alvo))
+        except ValueError:
+            registry = None
+        groups.setdefault(registry, []).append(alvo)
+    return [alvo for group in itertools.zip_longest(*groups.values()) for alvo in group if alvo is not None]
+
+def bulk_lookup(targets, workers=BULK_WORKERS, retries=BULK_RETRIES):
+    """
+    WHOIS, DNS e localização de muitos alvos, gerando (alvo, etapa, dados) conforme cada etapa termina.
+
+    A etapa "whois" traz um WhoisResult (ou a exceção da consulta) e a
+    etapa "geo" o dict de `_locate`. As duas rodam em pools separados, então
+    a fila do WHOIS (limitada por servidor) não atrasa a localização
+    (limitada por API), e vice-versa. Falhas temporárias são tentadas de
+    novo até `retries` vezes, com recuo no limite do servidor ou da API, e
+    IPs repetidos são localizados uma única vez.
+    """
+    events = queue.Queue()
+    cache = whois_cache()
+    query = partial(_whois_query, retries=retries)
+    geo_by_ip = {}
+    geo_lock = threading.Lock()
+
+    def geo(ip):
+        with geo_lock:
+            future = geo_by_ip.get(ip)
+            owner = future is None
+            if owner:
+                future = geo_by_ip[ip] = Future()
+        if owner:
+            try:
+                future.set_result(_ipinfo(ip, retries))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    def whois_stage(alvo):
+        try:
+            events.put((alvo, "whois", cache.lookup(alvo, query=query)))
+        except Exception as e:
+            events.put((alvo, "whois", e))
+
+    def geo_stage(alvo):
+        try:
+            events.put((alvo, "geo", _locate(alvo, retries, geo)))
+        except Exception as e:
+            events.put((alvo, "geo", {"ip": None, "avisos": [], "erro": str(e), "geo": None}))
+
+    whois_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="whois-bulk")
+    geo_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="geo-bulk")
+    ordered = _interleave_by_registry(targets)
+    for alvo in ordered:
+        whois_pool.submit(whois_stage, alvo)
+        geo_pool.submit(geo_stage, alvo)
+    try:
+        for _ in range(2 * len(ordered)):
+            yield events.get()
+    finally:
+        # Se a página for interrompida, as consultas que ainda não começaram são descartadas
+        whois_pool.shutdown(wait=False, cancel_futures=True)
+        geo_pool.shutdown(wait=False, cancel_futures=True)
+
+def _whois_columns(resultado):
+    if isinstance(resultado, Exception):
+        return {"WHOIS": f"Erro: {resultado}"}
+    columns = {"Domínio": resultado.key, "WHOIS": "cache" if resultado.cached else "servidor"}
+    if resultado.record is None:
+        columns["WHOIS"] = f"Erro: {resultado.error}"
+    else:
+        columns.update({
+            "Registrar": resultado.record.get("registrar") or "N/A",
+            "Criado em": format_date(resultado.record.get("creation_date")),
+            "Expira em": format_date(resultado.record.get("expiration_date")),
+        })
+    return columns
+
+def _geo_columns(info):
+    geo = info["geo"]
+    if geo is None:
+        return {"IP": f"Erro: {info['erro']}" if info["erro"] else "não resolvido"}
+    if not geo.get("Sucesso"):
+        return {"IP": info["ip"], "País": f"Erro: {geo.get('Erro', 'Desconhecido')}"}
+    return {"IP": info["ip"], "País": geo["País"], "Região": geo["Região"], "Cidade": geo["Cidade"],
+            "Organização": geo["Organização"]}
+
+def _bulk_page(lines):
+    """Consulta uma lista de alvos e preenche a tabela conforme as etapas terminam."""
+    alvos = parse_targets(lines)
+    if not alvos:
+        st.warning("Nenhum alvo informado.")
+        return
+    st.info(f"Consultando {len(alvos)} alvo(s): WHOIS até {WHOIS_RATE:g}/s por servidor, "
+            f"localização até {API_RATES['ipinfo.io']:g}/s no ipinfo.io...")
+    progress = ThrottledProgress(2 * len(alvos))
+    rows = {alvo: {**dict.fromkeys(BULK_COLUMNS, ""), "Alvo": alvo} for alvo in alvos}
+    table = LiveTable(rows)
+    done = 0
+    for alvo, etapa, dados in bulk_lookup(alvos):
+        rows[alvo].update(_whois_columns(dados) if etapa == "whois" else _geo_columns(dados))
+        done += 1
+        progress.update(done, f"{done // 2} de {len(alvos)} alvos; último: {alvo} ({etapa})")
+        table.touch()
+    progress.finish(f"{len(alvos)} alvos consultados.")
+    table.flush()
+    st.session_state.whois_lote = pd.DataFrame(list(rows.values()), columns=BULK_COLUMNS)
+
 def whois_lookup():
     st.title("🔍 Consulta WHOIS + Localização")
-    alvo = st.text_input("Digite um domínio ou IP para análise", "google.com")
 
-    if st.button("Consultar"):
-        with st.spinner("Consultando informações..."):
-            # Dados WHOIS
-            st.subheader("📑 Informações WHOIS")
-            try:
-                w = whois.whois(alvo)
-                st.write(f"**Domínio**: {alvo}")
-                st.write(f"**Registrar**: {w.registrar if w.registrar else 'N/A'}")
-                
-                creation_date = format_date(w.creation_date)
-                updated_date = format_date(w.updated_date)
-                expiration_date = format_date(w.expiration_date)
-
-                st.write(f"**Criado em**: {creation_date}")
-                st.write(f"**Atualizado em**: {updated_date}")
-                st.write(f"**Expira em**: {expiration_date}")
-                st.write(f"**Registrante**: {w.name if w.name else 'N/A'}")
-                st.write(f"**Email(s)**: {', '.join(w.emails) if w.emails else 'N/A'}")
-                st.write(f"**Servidores DNS**: {', '.join(w.name_servers) if w.name_servers else 'N/A'}")
-                
-                if w.status:
-                    st.write("**Status:**")
-                    for status_item in w.status:
-                        st.write(f"- {status_item}")
-                else:
-                    st.write("**Status**: N/A")
+    modo = st.radio("Alvos", ["Único", "Vários"], horizontal=True,
+                    help="Vários alvos aceitam uma lista colada ou enviada (txt ou csv, primeira coluna).")
 
-            except Exception as e:
-                st.error(f"Erro na consulta WHOIS: {e}")
-                # Do not return here, as we still want to try IP lookup
-            
-            st.markdown("---") # Separator for better readability
-
-            # Dados geográficos via IP
-            st.subheader("🌎 Localização do IP/Domínio")
-            ip_resolvido = None
-            try:
-                url_dns_google = f"https://dns.google/resolve?name={alvo}&type=A"
-                try:
-                    ip_resp = requests.get(url_dns_google, timeout=5, verify=certifi.where())
-                except requests.exceptions.SSLError:
-                    st.warning("Falha na verificação SSL para dns.google. Tentando sem verificação (não recomendado para produção).")
-                    ip_resp = requests.get(url_dns_google, timeout=5, verify=False)
-                    
-                ip_resp.raise_for_status()
-                ip_json = ip_resp.json()
-
-                if ip_json and "Answer" in ip_json and ip_json["Answer"]:
-                    ip_resolvido = ip_json["Answer"][0]["data"]
-                    st.info(f"**IP Resolvido para {alvo}:** {ip_resolvido}")
-                else:
-                    st.warning(f"Não foi possível resolver o IP para o domínio: {alvo}")
+    if modo == "Único":
+        alvo = st.text_input("Digite um domínio ou IP para análise", "google.com")
 
-            except Exception as e:
-                st.error(f"Erro ao resolver IP via DNS Google: {e}")
-
-            if ip_resolvido:
-                geo = get_ipinfo(ip_resolvido)
-                if geo.get("Sucesso"):
-                    col1, col2, col3 = st.columns(3)
-                    col1.metric("País", geo["País"])
-                    col2.metric("Região", geo["Região"])
-                    col3.metric("Cidade", geo["Cidade"])
-                    
-                    st.markdown(f"**ISP / Organização:** {geo['Organização']}")
-                    st.markdown(f"**Hostname:** {geo['Hostname']}")
-                    if "Aviso" in geo:
-                        st.warning(geo["Aviso"])
-                else:
-                    st.warning(f"Não foi possível obter dados de localização para o IP {ip_resolvido}. Erro: {geo.get('Erro', 'Desconhecido')}")
-            else:
-                st.info("Não foi possível realizar a consulta de localização sem um IP resolvido.")
\ No newline at end of file
+        col_consultar, col_atualizar = st.columns([3, 1])
+        consultar = col_consultar.button("Consultar", use_container_width=True)
+        atualizar = col_atualizar.button("🔄 Forçar atualização", use_container_width=True,
+                                         help="Ignora o cache e consulta o servidor WHOIS de novo")
+        if consultar or atualizar:
+            _single_lookup(alvo, atualizar)
+        return
+
+    texto = st.text_area("Domínios ou IPs (um por linha)", "google.com\ngithub.com\n8.8.8.8")
+    arquivo = st.file_uploader("Ou envie uma lista de domínios/IPs", type=["txt", "csv"])
+
+    if st.button("Consultar Todos"):
+        lines = texto.splitlines()
+        if arquivo is not None:
+            lines += arquivo.getvalue().decode("utf-8", errors="ignore").splitlines()
+        _bulk_page(lines)
+    elif "whois_lote" in st.session_state:
+        # Resultado da última consulta, mantido para as exportações (o clique em um botão reexecuta a página)
+        st.dataframe(st.session_state.whois_lote, use_container_width=True)
+
+    if "whois_lote" in st.session_state:
+        lote = st.session_state.whois_lote
+        agora = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        col_csv, col_json = st.columns(2)
+        col_csv.download_button("📥 Baixar CSV", data=lote.to_csv(index=False).encode("utf-8"),
+                                file_name=f"whois_{agora}.csv", mime="text/csv", use_container_width=True)
+        col_json.download_button("📥 Baixar JSON",
+                                 data=lote.to_json(orient="records", force_ascii=False, indent=2).encode("utf-8"),
+                                 file_name=f"whois_{agora}.json", mime="application/json",
+                                 use_container_width=True)
+    st.caption(whois_cache().summary())
+    st.caption(default_resolver.summary())
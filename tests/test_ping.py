@@ -0,0 +1,22 @@
+# tests/test_ping.py
+import pytest
+
+from ferramentas import ping as ping_module
+
+
+@pytest.mark.parametrize("host", ["a..b", "x" * 64 + ".com"])
+def test_ping_nome_malformado(host):
+    resultado = ping_module.ping(host, count=1)
+    assert resultado["success"] is False
+    assert resultado["error"] == f"Não foi possível resolver o host {host}."
+
+
+def test_ping_erro_de_valor_na_resolucao(monkeypatch):
+    # Mesmo que a resolução levante ValueError (UnicodeError do getaddrinfo), o ping devolve o dict de erro
+    def resolve(host):
+        raise UnicodeError("label too long")
+
+    monkeypatch.setattr(ping_module, "resolve", resolve)
+    resultado = ping_module.ping("a..b", count=1)
+    assert resultado["success"] is False
+    assert "Não foi possível resolver" in resultado["error"]